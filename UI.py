@@ -1,9 +1,9 @@
 import maya.cmds as cmds
 
 try:
-    from PySide2 import QtWidgets, QtCore
+    from PySide2 import QtWidgets, QtCore, QtGui
 except ImportError:
-    from PySide6 import QtWidgets, QtCore
+    from PySide6 import QtWidgets, QtCore, QtGui
 
 try:
     from shiboken2 import wrapInstance  # Maya 2024 and earlier
@@ -11,8 +11,13 @@ except ImportError:
     from shiboken6 import wrapInstance  # Maya 2025 and later
 
 import maya.OpenMayaUI as omui
+import concurrent.futures
+import contextlib
 import importlib
 import VT_SimpleMuscle.lib as sm
+import VT_SimpleMuscle.guide_io as guide_io
+import VT_SimpleMuscle.profiler as profiler
+import VT_SimpleMuscle.push_io as push_io
 importlib.reload(sm)
 
 
@@ -31,6 +36,11 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
         self.setWindowFlags(QtCore.Qt.Window)
         self.setMinimumWidth(300)
 
+        # one scene index shared by every button, refreshed once per click
+        self.scene_index = sm.MuscleSceneIndex()
+        # reads import files off the main thread
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
         # Create the tab widget
         self.tab_widget = QtWidgets.QTabWidget(self)
 
@@ -38,6 +48,8 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
 
         self.create_push_joint_tab()
 
+        self.create_scene_tab()
+
         # Main layout
         muscle_layout = QtWidgets.QVBoxLayout(self)
         muscle_layout.addWidget(self.tab_widget)
@@ -114,13 +126,15 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
         # Third Section: Build Muscle Rig
         section_3_layout = QtWidgets.QVBoxLayout()
         section_3_title = QtWidgets.QLabel(
-            "3. Build Muscle Rigs\nEither builds selected guides or all guides")
+            "3. Build Muscle Rigs\nEither builds selected guides or all guides\nRebuild Changed only rebuilds rigs whose guides were edited")
         section_3_title.setAlignment(QtCore.Qt.AlignLeft)
         section_3_layout.addWidget(section_3_title)
 
         build_layout = QtWidgets.QHBoxLayout()
         build_button = QtWidgets.QPushButton("Build")
         build_layout.addWidget(build_button)
+        rebuild_button = QtWidgets.QPushButton("Rebuild Changed")
+        build_layout.addWidget(rebuild_button)
 
         section_3_layout.addLayout(build_layout)
 
@@ -165,6 +179,8 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
         utility_layout.addWidget(connect_button)
         delete_button=QtWidgets.QPushButton("Delete Muscle Rigs")
         utility_layout.addWidget(delete_button)
+        rig_costs_button = QtWidgets.QPushButton("Rig Costs")
+        utility_layout.addWidget(rig_costs_button)
 
         utility2_layout = QtWidgets.QHBoxLayout()
         select_jnts_button = QtWidgets.QPushButton("Select Skin Joints")
@@ -173,9 +189,29 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
         utility2_layout.addWidget(mirror_settings_button)
         print_script_button = QtWidgets.QPushButton('Print Script')
         utility2_layout.addWidget(print_script_button)
+        build_report_button = QtWidgets.QPushButton('Build Report')
+        utility2_layout.addWidget(build_report_button)
+
+        lod_layout = QtWidgets.QHBoxLayout()
+        lod_layout.addWidget(QtWidgets.QLabel("Rig LOD:"))
+        self.lod_dropdown = QtWidgets.QComboBox()
+        self.lod_dropdown.addItems(sm.LOD_LEVELS)
+        lod_layout.addWidget(self.lod_dropdown)
+        lod_button = QtWidgets.QPushButton("Set LOD")
+        lod_layout.addWidget(lod_button)
 
         section_5_layout.addLayout(utility_layout)
         section_5_layout.addLayout(utility2_layout)
+        section_5_layout.addLayout(lod_layout)
+
+        cache_layout = QtWidgets.QHBoxLayout()
+        bake_cache_button = QtWidgets.QPushButton("Bake Muscle Cache")
+        cache_layout.addWidget(bake_cache_button)
+        load_cache_button = QtWidgets.QPushButton("Load Muscle Cache")
+        cache_layout.addWidget(load_cache_button)
+        flex_preview_button = QtWidgets.QPushButton("Flex Preview")
+        cache_layout.addWidget(flex_preview_button)
+        section_5_layout.addLayout(cache_layout)
 
         muscle_layout.addLayout(section_5_layout)
 
@@ -204,6 +240,7 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
         create_muscle_button.clicked.connect(self.create_muscle)
         mirror_guide_button.clicked.connect(self.mirror_click)
         build_button.clicked.connect(self.build_all_click)
+        rebuild_button.clicked.connect(self.rebuild_changed_click)
         connect_button.clicked.connect(self.parent_click)
         disconnect_button.clicked.connect(self.unparent_click)
         delete_button.clicked.connect(self.delete_all)
@@ -213,6 +250,12 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
         select_jnts_button.clicked.connect(self.select_joints)
         mirror_settings_button.clicked.connect(self.mirror_settings)
         print_script_button.clicked.connect(self.print_muscle_script_click)
+        build_report_button.clicked.connect(self.build_report_click)
+        rig_costs_button.clicked.connect(self.rig_costs_click)
+        lod_button.clicked.connect(self.set_lod_click)
+        bake_cache_button.clicked.connect(self.bake_cache_click)
+        load_cache_button.clicked.connect(self.load_cache_click)
+        flex_preview_button.clicked.connect(self.flex_preview_click)
 
         self.tab_widget.addTab(muscle_tab, 'Simple Muscles')
 
@@ -231,6 +274,9 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
         self.push_name_input.setText('Elbow_L')
         push_layout.addWidget(self.push_name_input)
 
+        self.push_lean_checkbox = QtWidgets.QCheckBox('Lean (no reader transforms or constraints)')
+        push_layout.addWidget(self.push_lean_checkbox)
+
         push_build_button = QtWidgets.QPushButton('Build Push Joint Rig')
         push_layout.addWidget(push_build_button)
 
@@ -315,43 +361,183 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
 
         # Connect button signals to functions
         push_build_button.clicked.connect(self.push_build_click)
-        mirror_button.clicked.connect(sm.mirror_push_rigs)
-        mirror_settings_button.clicked.connect(sm.mirror_all_push_rig_settings)
+        mirror_button.clicked.connect(self.mirror_push_click)
+        mirror_settings_button.clicked.connect(self.mirror_push_settings_click)
         print_button.clicked.connect(self.print_push_script_click)
         export_button.clicked.connect(self.show_save_push_dialog)
         import_button.clicked.connect(self.show_import_push_dialog)
 
         self.tab_widget.addTab(pushjoint_tab, 'Push Joints')
 
+    def create_scene_tab(self):
+        # live list of everything the tool made, kept up to date by a MuscleSceneWatcher
+        scene_tab = QtWidgets.QWidget()
+        scene_layout = QtWidgets.QVBoxLayout(scene_tab)
+
+        filter_layout = QtWidgets.QHBoxLayout()
+        self.scene_filter_input = QtWidgets.QLineEdit()
+        self.scene_filter_input.setPlaceholderText("Filter by name")
+        filter_layout.addWidget(self.scene_filter_input)
+        rescan_button = QtWidgets.QPushButton("Rescan")
+        filter_layout.addWidget(rescan_button)
+        scene_layout.addLayout(filter_layout)
+
+        self.scene_model = QtGui.QStandardItemModel(0, 2, self)
+        self.scene_model.setHorizontalHeaderLabels(['Name', 'Attributes'])
+        self.scene_roots = {}
+        for category, label in [('guides', 'Guides'), ('rigs', 'Rigs'), ('skin_joints', 'Skin Joints'),
+                                ('push_bases', 'Push Rigs')]:
+            root = QtGui.QStandardItem(label)
+            root.setEditable(False)
+            self.scene_model.appendRow([root, QtGui.QStandardItem('')])
+            self.scene_roots[category] = root
+        # (category, node): name item, so changes don't have to search the model
+        self.scene_items = {}
+
+        self.scene_proxy = QtCore.QSortFilterProxyModel(self)
+        self.scene_proxy.setSourceModel(self.scene_model)
+        self.scene_proxy.setRecursiveFilteringEnabled(True)
+        self.scene_proxy.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+
+        self.scene_tree = QtWidgets.QTreeView()
+        self.scene_tree.setModel(self.scene_proxy)
+        self.scene_tree.setUniformRowHeights(True)
+        self.scene_tree.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.scene_tree.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        scene_layout.addWidget(self.scene_tree)
+
+        self.scene_filter_input.textChanged.connect(self.scene_proxy.setFilterFixedString)
+        rescan_button.clicked.connect(self.rescan_click)
+        self.scene_tree.selectionModel().selectionChanged.connect(self.scene_selection_changed)
+
+        self.scene_watcher = sm.MuscleSceneWatcher()
+        self.scene_watcher.start()
+        self.scene_timer = QtCore.QTimer(self)
+        self.scene_timer.timeout.connect(self.update_scene_tree)
+        self.scene_timer.start(250)
+
+        self.tab_widget.addTab(scene_tab, 'Scene')
+
+    def update_scene_tree(self):
+        # apply what changed in the scene since the last tick
+        if not self.scene_watcher.has_changes:
+            return
+        changes = self.scene_watcher.flush()
+        self.scene_tree.setUpdatesEnabled(False)
+        try:
+            if changes['reset']:
+                self.scene_items = {}
+                for category, root in self.scene_roots.items():
+                    root.removeRows(0, root.rowCount())
+                    for node in self.scene_watcher.index.get(category):
+                        self.add_scene_item(category, node)
+            for key in changes['removed']:
+                item = self.scene_items.pop(key, None)
+                if item is not None:
+                    self.scene_roots[key[0]].removeRow(item.row())
+            for category, node in changes['added']:
+                self.add_scene_item(category, node)
+            for key in changes['changed']:
+                if key in self.scene_items:
+                    item = self.scene_items[key]
+                    self.scene_roots[key[0]].child(item.row(), 1).setText(self.scene_item_text(*key))
+            for category, root in self.scene_roots.items():
+                root.setText(f"{root.text().split(' (')[0]} ({root.rowCount()})")
+        finally:
+            self.scene_tree.setUpdatesEnabled(True)
+
+    def add_scene_item(self, category, node):
+        name_item = QtGui.QStandardItem(node)
+        name_item.setEditable(False)
+        self.scene_roots[category].appendRow([name_item, QtGui.QStandardItem(self.scene_item_text(category, node))])
+        self.scene_items[(category, node)] = name_item
+
+    def scene_item_text(self, category, node):
+        return '  '.join(f'{attr}: {value}' for attr, value in self.scene_watcher.get_key_attrs(category, node))
+
+    def scene_selection_changed(self, *args):
+        # select the picked nodes in maya
+        nodes = []
+        for index in self.scene_tree.selectionModel().selectedRows(0):
+            item = self.scene_model.itemFromIndex(self.scene_proxy.mapToSource(index))
+            if item.parent() is not None and cmds.objExists(item.text()):
+                nodes.append(item.text())
+        if nodes:
+            cmds.select(nodes)
+
+    def rescan_click(self):
+        self.scene_watcher.reset()
+        self.update_scene_tree()
+
+    def stop_watching(self):
+        self.scene_timer.stop()
+        self.scene_watcher.stop()
+
+    def closeEvent(self, event):
+        self.stop_watching()
+        super(VTSimpleMuscleUI, self).closeEvent(event)
+
     def create_horizontal_line(self):
         line = QtWidgets.QFrame()
         line.setFrameShape(QtWidgets.QFrame.HLine)
         line.setFrameShadow(QtWidgets.QFrame.Sunken)
         return line
 
+    def get_scene_index(self):
+        # the scene may have changed since the last click
+        self.scene_index.invalidate()
+        return self.scene_index
+
+    def run_steps(self, title, steps):
+        # run a lib iter_* generator a step at a time without blocking Maya
+        ProgressDialog(title, steps, self).start()
+
+    def run_in_background(self, title, read, then):
+        # call read on a worker thread and then(result) back on the main thread, for file
+        # parsing that doesn't touch the scene
+        future = self.executor.submit(read)
+        timer = QtCore.QTimer(self)
+
+        def poll():
+            if not future.done():
+                return
+            timer.stop()
+            timer.deleteLater()
+            try:
+                result = future.result()
+            except (IOError, ValueError) as e:
+                cmds.warning(f'{title} failed: {e}')
+                return
+            then(result)
+        timer.timeout.connect(poll)
+        timer.start(50)
+
     def mirror_click(self):
-        sm.mirror_guides()
+        self.run_steps("Mirroring Guides", sm.iter_mirror_guides(self.get_scene_index()))
 
     def build_all_click(self):
-        sm.build_all_rigs()
+        self.run_steps("Building Muscle Rigs", sm.iter_build_all_rigs(self.get_scene_index()))
+
+    def rebuild_changed_click(self):
+        sm.rebuild_changed_rigs(self.get_scene_index())
 
     def parent_click(self):
-        sm.parent_def_joints()
+        sm.parent_def_joints(self.get_scene_index())
 
     def unparent_click(self):
-        sm.unparent_def_joints()
+        sm.unparent_def_joints(self.get_scene_index())
 
     def bake_click(self):
-        sm.bake_to_guides()
+        sm.bake_to_guides(self.get_scene_index())
 
     def delete_all(self):
-        sm.delete_all_rigs()
+        self.run_steps("Deleting Muscle Rigs", sm.iter_delete_all_rigs(self.get_scene_index()))
 
     def select_joints(self):
-        sm.select_def_joints()
+        sm.select_def_joints(self.get_scene_index())
 
     def mirror_settings(self):
-        sm.mirror_rig_settings()
+        sm.mirror_rig_settings(self.get_scene_index())
 
     def create_muscle(self):
         muscle_name = self.muscle_name_input.text()
@@ -372,18 +558,24 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
             self,
             "Export Muscle Guides",
             "",
-            "Maya ASCII (*.ma)"
+            "Maya ASCII (*.ma);;Guide JSON (*.json)"
         )
-        sm.export_guides(file_path)
+        sm.export_guides(file_path, self.get_scene_index())
 
     def show_import_dialog(self):
         file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
             self,
             "Import Muscle Guides",
             "",
-            "Maya ASCII (*.ma)"
+            "Maya ASCII (*.ma);;Guide JSON (*.json)"
         )
-        sm.import_guides(file_path)
+        if not file_path:
+            return
+        if not file_path.endswith('.json'):
+            sm.import_guides(file_path)
+            return
+        self.run_in_background("Importing Guides", lambda: guide_io.read_guides(file_path),
+                               lambda guides: self.run_steps("Importing Guides", sm.iter_create_guides(guides)))
 
     def show_save_push_dialog(self):
         # Show save file dialog
@@ -393,7 +585,7 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
             "",
             "JSON (*.json)"
         )
-        sm.export_push_rigs(file_path)
+        sm.export_push_rigs(file_path, self.get_scene_index())
 
     def show_import_push_dialog(self):
         file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
@@ -402,27 +594,272 @@ class VTSimpleMuscleUI(QtWidgets.QWidget):
             "",
             "JSON (*.json)"
         )
-        sm.import_push_rigs(file_path)
+        if not file_path:
+            return
+        lean = self.push_lean_checkbox.isChecked()
+        self.run_in_background("Importing Push Rigs", lambda: push_io.read_push_rigs(file_path),
+                               lambda result: self.run_steps("Importing Push Rigs",
+                                                             sm.iter_import_push_rigs(result[0], result[1], lean)))
 
     def print_muscle_script_click(self):
         print('\n\n########################\nimport VT_SimpleMuscle.lib as sml\ncmds.file("path\\to\\your\\file.ma", i=True)\nsml.build_all_rigs()')
 
+    def build_report_click(self):
+        report = sm.get_build_report()
+        if not report:
+            cmds.warning('Build some muscle rigs first, there is no build report yet')
+            return
+        BuildReportDialog(report, self).show()
+
+    def rig_costs_click(self):
+        # prints the per muscle cost table over the playback range
+        sm.analyze_rig_costs(self.get_scene_index())
+
+    def set_lod_click(self):
+        # selected guides or rigs, or every rig when nothing is selected
+        selection = cmds.ls(sl=True) or None
+        sm.set_muscle_lod(self.lod_dropdown.currentText(), selection, self.get_scene_index())
+
+    def bake_cache_click(self):
+        # one cache file per character over the playback range
+        directory = QtWidgets.QFileDialog.getExistingDirectory(self, "Bake Muscle Cache To")
+        if directory:
+            sm.bake_muscle_cache(directory, index=self.get_scene_index())
+
+    def load_cache_click(self):
+        file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self,
+            "Load Muscle Cache",
+            "",
+            "Muscle Cache (*.npy)"
+        )
+        if file_path:
+            sm.load_muscle_cache(file_path, self.get_scene_index())
+
+    def flex_preview_click(self):
+        selection = cmds.ls(sl=True)
+        surface = sm.get_muscle_surface(selection[0]) if selection else ''
+        if not cmds.objExists(f'{surface}.factor'):
+            cmds.warning('Select the guide, rig or surface of a built muscle')
+            return
+        FlexPreviewDialog(surface, self.get_scene_index(), self).show()
+
     ######################################
 
     def push_build_click(self):
         name = self.push_name_input.text()
-        sm.create_push_joints(cmds.ls(sl=True)[0], name)
+        sm.create_push_joints(cmds.ls(sl=True)[0], name, self.push_lean_checkbox.isChecked())
+
+    def mirror_push_click(self):
+        sm.mirror_push_rigs(self.get_scene_index())
+
+    def mirror_push_settings_click(self):
+        sm.mirror_all_push_rig_settings(self.get_scene_index())
 
     def print_push_script_click(self):
         print('\n\n########################\nimport VT_SimpleMuscle.lib as sml\nfile_path = "path\\to\\your\\file.json"\nsml.import_push_rigs(file_path)')
 
+# Progress bar for a lib iter_* generator of (done, total, name) steps. A zero interval QTimer
+# runs one step each time Qt is idle so Maya keeps redrawing, cancel stops between steps
+class ProgressDialog(QtWidgets.QDialog):
+    def __init__(self, title, steps, parent=None):
+        super(ProgressDialog, self).__init__(parent)
+        self.steps = steps
+        self.title = title
+        self.cancelled = False
+        self.batch = None
+        self.setWindowTitle(title)
+        self.setMinimumWidth(360)
+        # the steps share the tool's scene index, keep other buttons from running in between
+        self.setWindowModality(QtCore.Qt.ApplicationModal)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.label = QtWidgets.QLabel("Starting...")
+        layout.addWidget(self.label)
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        layout.addWidget(self.cancel_button)
+        self.cancel_button.clicked.connect(self.cancel_click)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.step)
+
+    def start(self):
+        # one batch_build for the whole run, so the evaluation manager is switched off once and a
+        # single undo reverts everything done before finishing or cancelling
+        self.batch = contextlib.ExitStack()
+        self.batch.enter_context(sm.batch_build(f'VT_SimpleMuscle {self.title}'))
+        self.show()
+        self.timer.start()
+
+    def step(self):
+        if self.cancelled:
+            self.finish()
+            return
+        try:
+            done, total, name = next(self.steps)
+        except StopIteration:
+            self.finish()
+            return
+        except Exception:
+            self.finish()
+            raise
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.label.setText(f"{done} / {total}  {name or ''}")
+
+    def cancel_click(self):
+        self.cancel_button.setEnabled(False)
+        self.label.setText("Stopping after this step...")
+        self.cancelled = True
+
+    def finish(self):
+        self.timer.stop()
+        try:
+            # runs the generator's cleanup, eg invalidating the scene index
+            self.steps.close()
+        finally:
+            if self.batch is not None:
+                batch, self.batch = self.batch, None
+                batch.close()
+            self.close()
+
+    def closeEvent(self, event):
+        # closing the window cancels like the button does
+        if self.timer.isActive():
+            self.cancelled = True
+            event.ignore()
+            return
+        super(ProgressDialog, self).closeEvent(event)
+
+# Per stage timings of the last build_all_rigs
+class BuildReportDialog(QtWidgets.QDialog):
+    def __init__(self, report, parent=None):
+        super(BuildReportDialog, self).__init__(parent)
+        self.report = report
+        self.setWindowTitle("VT_SimpleMuscle Build Report")
+        self.setMinimumWidth(560)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        rows = profiler.summary_rows(report)
+        muscles = len([m for m in report['muscles'] if m])
+        layout.addWidget(QtWidgets.QLabel(f"{muscles} muscles, sorted by time spent in each stage itself"))
+
+        table = QtWidgets.QTableWidget(len(rows), 6)
+        table.setHorizontalHeaderLabels(['Stage', 'Calls', 'Total s', 'Self s', 'Commands', 'Nodes'])
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                text = f'{value:.3f}' if isinstance(value, float) else str(value)
+                table.setItem(row, column, QtWidgets.QTableWidgetItem(text))
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+
+        save_button = QtWidgets.QPushButton("Save JSON")
+        layout.addWidget(save_button)
+        save_button.clicked.connect(self.save_click)
+
+    def save_click(self):
+        file_path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self,
+            "Save Build Report",
+            "",
+            "JSON (*.json)"
+        )
+        if file_path:
+            profiler.write_report(file_path, self.report)
+
+# bulge/sink/triggerLength tuning with the offset range each joint would get over the
+# recorded frames, updated from the factor cache without touching the scene
+class FlexPreviewDialog(QtWidgets.QDialog):
+    def __init__(self, surface, scene_index, parent=None):
+        super(FlexPreviewDialog, self).__init__(parent)
+        self.surface = surface
+        self.scene_index = scene_index
+        self.setWindowTitle(f"VT_SimpleMuscle Flex Preview - {surface}")
+        self.setMinimumWidth(420)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.range_label = QtWidgets.QLabel()
+        layout.addWidget(self.range_label)
+
+        settings_layout = QtWidgets.QFormLayout()
+        self.spin_boxes = {}
+        for attr in ['bulge', 'sink', 'triggerLength']:
+            spin_box = QtWidgets.QDoubleSpinBox()
+            spin_box.setDecimals(3)
+            spin_box.setSingleStep(0.05)
+            spin_box.setRange(0.0, 1.0 if attr == 'triggerLength' else 1000.0)
+            spin_box.setValue(cmds.getAttr(f'{surface}.{attr}'))
+            spin_box.valueChanged.connect(self.update_table)
+            settings_layout.addRow(attr, spin_box)
+            self.spin_boxes[attr] = spin_box
+        layout.addLayout(settings_layout)
+
+        self.table = QtWidgets.QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(['Skin Joint', 'Min Offset', 'Max Offset'])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        record_button = QtWidgets.QPushButton("Record Playback Range")
+        button_layout.addWidget(record_button)
+        apply_button = QtWidgets.QPushButton("Apply")
+        button_layout.addWidget(apply_button)
+        layout.addLayout(button_layout)
+
+        record_button.clicked.connect(self.record_click)
+        apply_button.clicked.connect(self.apply_click)
+        self.update_table()
+
+    def update_table(self):
+        cache = sm.get_factor_cache()
+        if cache is None or self.surface not in cache.factors:
+            self.range_label.setText("No recorded factors, record the playback range first")
+            self.table.setRowCount(0)
+            return
+        low, high = cache.factor_range(self.surface)
+        self.range_label.setText(f"factor {low:.3f} to {high:.3f} over {len(cache.frames)} frames")
+
+        offsets = sm.preview_flex_offsets(self.surface, *[self.spin_boxes[a].value()
+                                                          for a in ['bulge', 'sink', 'triggerLength']])
+        self.table.setRowCount(len(offsets))
+        for row, (joint, (low, high)) in enumerate(offsets.items()):
+            for column, text in enumerate([joint, f'{low:.3f}', f'{high:.3f}']):
+                self.table.setItem(row, column, QtWidgets.QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+
+    def record_click(self):
+        self.scene_index.invalidate()
+        sm.record_surface_factors(index=self.scene_index)
+        self.update_table()
+
+    def apply_click(self):
+        for attr, spin_box in self.spin_boxes.items():
+            cmds.setAttr(f'{self.surface}.{attr}', spin_box.value())
+
 # Function to show the UI
+# the open UI, its scene callbacks are removed before a new one is made
+_ui = None
+
 def show_ui():
+    global _ui
+    if _ui is not None:
+        try:
+            _ui.stop_watching()
+        except RuntimeError:
+            # the widget was already deleted with its callbacks stopped
+            pass
+        _ui = None
     if cmds.window("VTSimpleMuscleUI", exists=True):
         cmds.deleteUI("VTSimpleMuscleUI", wnd=True)
 
     try:
         ui = VTSimpleMuscleUI()
+        _ui = ui
         ui.show()
         print("UI displayed successfully.")
     except Exception as e:
@@ -0,0 +1,416 @@
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import VT_SimpleMuscle.profiler as profiler
+import VT_SimpleMuscle.sides as sides
+
+# Alternate backend for create_curves/create_surface and joints_on_surface/create_flex. The
+# surface is made directly from its CVs and the muscle network is first planned with the same
+# node names and connections the maya.cmds builder makes, then committed with a single
+# MDagModifier.doIt() instead of one string command per node, attr and connection.
+# API edits are not recorded in Maya's undo queue so this is meant for batch and
+# headless builds, it refuses to build while the undo queue is on (see check_undo).
+
+
+class MusclePlan(object):
+    # nodes are referred to by the name they are planned with, attrs use cmds style
+    # 'node.attr[0].child' strings so the plan reads like the maya.cmds builder
+
+    def __init__(self):
+        self.nodes = []
+        self.attrs = []
+        self.values = []
+        self.connections = []
+
+    def create_node(self, node_type, name, parent=None):
+        self.nodes.append((node_type, name, parent))
+        return name
+
+    def add_attr(self, node, long_name, attr_type, default=None, hidden=False, keyable=False, min=None, max=None,
+                 short_name=None):
+        self.attrs.append((node, long_name, short_name or long_name, attr_type, default, hidden, keyable, min, max))
+
+    def set_attr(self, plug, value):
+        self.values.append((plug, value))
+
+    def connect_attr(self, source, destination):
+        self.connections.append((source, destination))
+
+
+def check_undo():
+    # a half built rig would be left behind by undo, the api edits aren't in the undo queue
+    if cmds.undoInfo(q=True, state=True):
+        cmds.error('The OpenMaya build backend can not be undone, turn the undo queue off with '
+                   'cmds.undoInfo(stateWithoutFlush=False) or use the cmds backend instead')
+
+
+@profiler.stage
+def create_surface(joints, name_base, rig, type='Linear', dir='Z', offsetPercentLength=10):
+    # the surface lib.create_curves and lib.create_surface make, built from its CVs in one
+    # MFnNurbsSurface.create call. The curves were the joint positions offset by +/- 10% of the
+    # chain length along the first joint's Z, lofted, rebuilt to a single span and swapped so U
+    # runs down the chain, then reversed in U on the right side.
+    import VT_SimpleMuscle.lib as sm
+
+    degree = 1 if type == 'Linear' else 3
+    start = om.MPoint(cmds.xform(joints[0], q=True, rp=True, ws=True))
+    end = om.MPoint(cmds.xform(joints[1], q=True, rp=True, ws=True))
+    matrix = cmds.xform(joints[0], q=True, m=True, ws=True)
+    axis_index = {'X': 0, 'Y': 1, 'Z': 2}[dir]
+    offset = om.MVector(matrix[axis_index*4:axis_index*4+3])*(sm.get_chain_length(joints)*(offsetPercentLength*0.01))
+
+    right_side = sides.DEFAULT_RULES.side(name_base) == 'R'
+    cvs = om.MPointArray()
+    for i in range(degree+1):
+        u = i/degree
+        if right_side:
+            u = 1.0-u
+        point = start + (end-start)*u
+        # V runs from the + offset curve to the - offset curve
+        for j in range(degree+1):
+            cvs.append(point + offset*(1.0-2.0*(j/degree)))
+
+    knots = om.MDoubleArray([0.0]*degree + [1.0]*degree)
+    fn = om.MFnNurbsSurface()
+    transform = fn.create(cvs, knots, knots, degree, degree, om.MFnNurbsSurface.kOpen, om.MFnNurbsSurface.kOpen,
+                          False)
+    surface = om.MFnDependencyNode(transform).setName(f'{name_base}_surface')
+    shape = cmds.rename(cmds.listRelatives(surface, s=True, f=True)[0], f'{surface}Shape')
+
+    # turn on origins
+    cmds.setAttr(f'{shape}.dispOrigin', 1)
+    cmds.setAttr(f'{shape}.normalsDisplayScale', 0.1)
+
+    cmds.parent(surface, rig)
+    return surface
+
+@profiler.stage
+def joints_on_surface(surface, base_name, rig, num_joints=1, parent=None, right_side=False, bulge=None, sink=None,
+                      triggerLength=None, flex_network='per_joint'):
+    plan = MusclePlan()
+    surfaceShape = cmds.listRelatives(surface, s=True)[0]
+    section_size = 1/(num_joints+1)
+
+    follicle_positions = []
+    for i in range(num_joints):
+        follicle_positions.append((i + 1) * section_size)
+    if right_side:
+        # reverse for the right side since the surface is reversed
+        follicle_positions.reverse()
+
+    skin_joints = []
+    for i in range(num_joints):
+        folTrans = plan.create_node('transform', f'{base_name}_follicle_{i+1}Trans', rig)
+        folShape = plan.create_node('follicle', f'{base_name}_follicle_{i+1}', folTrans)
+        plan.set_attr(f'{folTrans}.visibility', False)
+        plan.connect_attr(f'{surfaceShape}.local', f'{folShape}.inputSurface')
+        plan.connect_attr(f'{surfaceShape}.worldMatrix[0]', f'{folShape}.inputWorldMatrix')
+        plan.connect_attr(f'{folShape}.outRotate', f'{folTrans}.rotate')
+        plan.connect_attr(f'{folShape}.outTranslate', f'{folTrans}.translate')
+        plan.set_attr(f'{folShape}.parameterV', 0.5)
+        plan.set_attr(f'{folShape}.parameterU', follicle_positions[i])
+
+        joint = plan.create_node('joint', f'{base_name}_{i+1}_skin_jnt')
+        skin_joints.append(joint)
+        plan_parent_constraint(plan, folTrans, joint, rig)
+
+        plan.add_attr(joint, 'isMuscleJoint', 'bool', default=True, hidden=True)
+        plan.add_attr(joint, 'parent', 'string')
+        if parent:
+            plan.set_attr(f'{joint}.parent', parent)
+
+    plan_flex(plan, surface, surfaceShape, skin_joints, base_name, rig, follicle_positions, triggerLength, flex_network)
+    # maya picks another name when a planned one is taken, carry on with the names it used
+    names = commit(plan)
+    skin_joints = [names[joint] for joint in skin_joints]
+
+    # the rest length and default bulge/sink need the evaluated arc length of the new network
+    length = cmds.getAttr(f'{surface}.length')
+    finish = MusclePlan()
+    finish.set_attr(f"{names[f'{base_name}_scale_multiply']}.input2", length)
+    finish.set_attr(f'{surface}.bulge', length*0.18 if bulge == None else bulge)
+    finish.set_attr(f'{surface}.sink', (length*0.18)*0.5 if sink == None else sink)
+    commit(finish)
+    return skin_joints
+
+def plan_parent_constraint(plan, target, constrained, parent):
+    # the same node and wiring parentConstraint -mo 0 makes for a single transform target
+    constraint = plan.create_node('parentConstraint', f'{constrained}_parentConstraint1', parent)
+    weight = f'{target}W0'
+    plan.add_attr(constraint, weight, 'double', default=1.0, keyable=True, min=0.0, short_name='w0')
+
+    for source, destination in [('translate', 'targetTranslate'),
+                                ('rotatePivot', 'targetRotatePivot'),
+                                ('rotatePivotTranslate', 'targetRotateTranslate'),
+                                ('rotate', 'targetRotate'),
+                                ('rotateOrder', 'targetRotateOrder'),
+                                ('scale', 'targetScale'),
+                                ('parentMatrix[0]', 'targetParentMatrix')]:
+        plan.connect_attr(f'{target}.{source}', f'{constraint}.target[0].{destination}')
+    plan.connect_attr(f'{constraint}.{weight}', f'{constraint}.target[0].targetWeight')
+
+    for source, destination in [('parentInverseMatrix[0]', 'constraintParentInverseMatrix'),
+                                ('rotatePivot', 'constraintRotatePivot'),
+                                ('rotatePivotTranslate', 'constraintRotateTranslate'),
+                                ('rotateOrder', 'constraintRotateOrder'),
+                                ('jointOrient', 'constraintJointOrient')]:
+        plan.connect_attr(f'{constrained}.{source}', f'{constraint}.{destination}')
+
+    for axis in ['X', 'Y', 'Z']:
+        plan.connect_attr(f'{constraint}.constraintTranslate{axis}', f'{constrained}.translate{axis}')
+        plan.connect_attr(f'{constraint}.constraintRotate{axis}', f'{constrained}.rotate{axis}')
+    return constraint
+
+@profiler.stage
+def plan_flex(plan, surface, surfaceShape, joints, base_name, rig, follicle_positions, triggerLength,
+              flex_network='per_joint'):
+    import VT_SimpleMuscle.lib as sm
+
+    arclengthTrans = plan.create_node('transform', unique_name('arcLengthDimension'), rig)
+    arclength = plan.create_node('arcLengthDimension', f'{base_name}_arcLength', arclengthTrans)
+    plan.set_attr(f'{arclengthTrans}.visibility', False)
+    plan.set_attr(f'{arclength}.uParamValue', 1.0)
+
+    plan.add_attr(surface, 'length', 'float', hidden=True)
+    plan.connect_attr(f'{surfaceShape}.worldSpace[0]', f'{arclength}.nurbsGeometry')
+    plan.connect_attr(f'{arclength}.arcLength', f'{surface}.length')
+
+    #divide current length by the orig length to get a stretch factor and multiply by scale factor
+    scale_reader = 'Scale_Constrain_To_Rig'
+    if not cmds.objExists(scale_reader):
+        plan.create_node('transform', scale_reader)
+    divide = plan.create_node('multiplyDivide', f'{base_name}_divide')
+    plan.set_attr(f'{divide}.operation', 2)
+    plan.connect_attr(f'{surface}.length', f'{divide}.input1X')
+
+    scale_multiply = plan.create_node('multDoubleLinear', f'{base_name}_scale_multiply')
+    plan.connect_attr(f'{scale_reader}.scaleX', f'{scale_multiply}.input1')
+    plan.connect_attr(f'{scale_multiply}.output', f'{divide}.input2X')
+    plan.add_attr(surface, 'factor', 'float', hidden=True)
+    plan.connect_attr(f'{divide}.outputX', f'{surface}.factor')
+
+    plan.add_attr(surface, 'bulge', 'float', keyable=True)
+    plan.add_attr(surface, 'sink', 'float', keyable=True)
+
+    if triggerLength == None:
+        triggerLength_value = 0.6
+    else:
+        triggerLength_value = triggerLength
+    plan.add_attr(surface, 'triggerLength', 'float', default=triggerLength_value, keyable=True, min=0.0, max=1.0)
+
+    offset_values = sm.offset_factor_values(follicle_positions)
+    for i in range(len(joints)):
+        plan.add_attr(surface, joints[i], 'float', default=offset_values[i], hidden=True)
+
+    if flex_network == 'shared':
+        plan_shared_flex(plan, surface, joints, base_name)
+    elif flex_network == 'node':
+        plan_node_flex(plan, surface, joints, base_name)
+    else:
+        plan_per_joint_flex(plan, surface, joints)
+
+    # add normalized driver value to drive corrective shapes with
+    plan.add_attr(surface, 'shapeDriver', 'float', keyable=True)
+    shape_remap = plan.create_node('remapValue', f'{base_name}_shape_remap')
+    plan.connect_attr(f'{surface}.triggerLength', f'{shape_remap}.inputMax')
+    plan.set_attr(f'{shape_remap}.inputMin', 1.0)
+    plan.connect_attr(f'{surface}.factor', f'{shape_remap}.inputValue')
+    plan.connect_attr(f'{shape_remap}.outValue', f'{surface}.shapeDriver')
+
+def plan_per_joint_flex(plan, surface, joints):
+    for i in range(len(joints)):
+        # above stretch factor of 1.0
+        remapAbove = plan.create_node('remapValue', f'{joints[i]}_remapAboveZero')
+        plan.set_attr(f'{remapAbove}.inputMin', 1.0)
+        plan.set_attr(f'{remapAbove}.outputMin', 0.0)
+
+        zeroMinueSink = plan.create_node('plusMinusAverage', f'{joints[i]}_zeroMinusSink')
+        plan.set_attr(f'{zeroMinueSink}.input1D[0]', 0.0)
+        plan.connect_attr(f'{surface}.sink', f'{zeroMinueSink}.input1D[1]')
+        plan.set_attr(f'{zeroMinueSink}.operation', 2)
+
+        sinkTimesMult = plan.create_node('multDoubleLinear', f'{joints[i]}_sinkTimesMult')
+        plan.connect_attr(f'{zeroMinueSink}.output1D', f'{sinkTimesMult}.input1')
+        plan.connect_attr(f'{surface}.{joints[i]}', f'{sinkTimesMult}.input2')
+
+        onePlusTrigger = plan.create_node('addDoubleLinear', f'{joints[i]}onePlusTrigger')
+        plan.connect_attr(f'{surface}.triggerLength', f'{onePlusTrigger}.input1')
+        plan.set_attr(f'{onePlusTrigger}.input2', 1.0)
+
+        plan.connect_attr(f'{sinkTimesMult}.output', f'{remapAbove}.outputMax')
+        plan.connect_attr(f'{onePlusTrigger}.output', f'{remapAbove}.inputMax')
+        plan.connect_attr(f'{surface}.factor', f'{remapAbove}.inputValue')
+
+        # below a stretch factor of 1.0
+        remapBelow = plan.create_node('remapValue', f'{joints[i]}_remapBelowZero')
+        plan.set_attr(f'{remapBelow}.inputMax', 1.0)
+        plan.set_attr(f'{remapBelow}.outputMax', 0.0)
+        plan.connect_attr(f'{surface}.triggerLength', f'{remapBelow}.inputMin')
+
+        bulgeTimesMult = plan.create_node('multDoubleLinear', f'{joints[i]}_bulgeTimesMult')
+        plan.connect_attr(f'{surface}.bulge', f'{bulgeTimesMult}.input1')
+        plan.connect_attr(f'{surface}.{joints[i]}', f'{bulgeTimesMult}.input2')
+        plan.connect_attr(f'{bulgeTimesMult}.output', f'{remapBelow}.outputMin')
+        plan.connect_attr(f'{surface}.factor', f'{remapBelow}.inputValue')
+
+        # setup condition node
+        condition = plan.create_node('condition', f'{joints[i]}_condition')
+        plan.connect_attr(f'{surface}.factor', f'{condition}.firstTerm')
+        plan.set_attr(f'{condition}.secondTerm', 1.0)
+        plan.set_attr(f'{condition}.operation', 3)
+        plan.connect_attr(f'{remapBelow}.outValue', f'{condition}.colorIfFalseR')
+        plan.connect_attr(f'{remapAbove}.outValue', f'{condition}.colorIfTrueR')
+
+        plan.connect_attr(f'{condition}.outColorR', f'{joints[i]}_parentConstraint1.target[0].targetOffsetTranslateZ')
+
+def plan_shared_flex(plan, surface, joints, base_name):
+    # the network lib.create_shared_flex builds, one remap chain per muscle
+    import VT_SimpleMuscle.lib as sm
+
+    negSink = plan.create_node('multDoubleLinear', f'{base_name}_negSink')
+    plan.connect_attr(f'{surface}.sink', f'{negSink}.input1')
+    plan.set_attr(f'{negSink}.input2', -1.0)
+
+    onePlusTrigger = plan.create_node('addDoubleLinear', f'{base_name}_onePlusTrigger')
+    plan.connect_attr(f'{surface}.triggerLength', f'{onePlusTrigger}.input1')
+    plan.set_attr(f'{onePlusTrigger}.input2', 1.0)
+
+    # above stretch factor of 1.0
+    remapAbove = plan.create_node('remapValue', f'{base_name}_remapAboveZero')
+    plan.set_attr(f'{remapAbove}.inputMin', 1.0)
+    plan.set_attr(f'{remapAbove}.outputMin', 0.0)
+    plan.connect_attr(f'{onePlusTrigger}.output', f'{remapAbove}.inputMax')
+    plan.connect_attr(f'{negSink}.output', f'{remapAbove}.outputMax')
+    plan.connect_attr(f'{surface}.factor', f'{remapAbove}.inputValue')
+
+    # below a stretch factor of 1.0
+    remapBelow = plan.create_node('remapValue', f'{base_name}_remapBelowZero')
+    plan.set_attr(f'{remapBelow}.inputMax', 1.0)
+    plan.connect_attr(f'{surface}.triggerLength', f'{remapBelow}.inputMin')
+    plan.connect_attr(f'{surface}.bulge', f'{remapBelow}.outputMin')
+    plan.connect_attr(f'{remapAbove}.outValue', f'{remapBelow}.outputMax')
+    plan.connect_attr(f'{surface}.factor', f'{remapBelow}.inputValue')
+
+    for i, group in enumerate(sm.shared_flex_groups(joints)):
+        weights = plan.create_node('multiplyDivide', f'{base_name}_weights_{i+1}')
+        for axis, joint in zip(['X', 'Y', 'Z'], group):
+            plan.connect_attr(f'{remapBelow}.outValue', f'{weights}.input1{axis}')
+            plan.connect_attr(f'{surface}.{joint}', f'{weights}.input2{axis}')
+            plan.connect_attr(f'{weights}.output{axis}', f'{joint}_parentConstraint1.target[0].targetOffsetTranslateZ')
+
+def plan_node_flex(plan, surface, joints, base_name):
+    # the muscleFlex node lib.create_node_flex makes
+    import VT_SimpleMuscle.lib as sm
+
+    sm.load_flex_plugin()
+    flex_node = plan.create_node('muscleFlex', f'{base_name}_muscleFlex')
+    for attr in ['factor', 'bulge', 'sink', 'triggerLength']:
+        plan.connect_attr(f'{surface}.{attr}', f'{flex_node}.{attr}')
+
+    for i in range(len(joints)):
+        plan.connect_attr(f'{surface}.{joints[i]}', f'{flex_node}.weight[{i}]')
+        plan.connect_attr(f'{flex_node}.offset[{i}]', f'{joints[i]}_parentConstraint1.target[0].targetOffsetTranslateZ')
+
+def unique_name(base):
+    # the name maya gives an unnamed node of this type, eg arcLengthDimension1
+    i = 1
+    while cmds.objExists(f'{base}{i}'):
+        i += 1
+    return f'{base}{i}'
+
+@profiler.stage
+def commit(plan):
+    # create, attribute, set and connect everything in the plan with one doIt
+    if not plan_is_supported():
+        cmds.error('The OpenMaya build backend needs centimeter working units, use the cmds backend instead')
+
+    modifier = om.MDagModifier()
+    objects = {}
+
+    for node_type, name, parent in plan.nodes:
+        if om.MNodeClass(node_type).hasAttribute('worldMatrix'):
+            parent_obj = get_object(parent, objects) if parent else om.MObject.kNullObj
+            obj = modifier.createNode(node_type, parent_obj)
+        else:
+            obj = om.MDGModifier.createNode(modifier, node_type)
+        modifier.renameNode(obj, name)
+        objects[name] = obj
+
+    # dynamic attrs are added straight away so the plugs below can be found before doIt
+    for node, long_name, short_name, attr_type, default, hidden, keyable, min, max in plan.attrs:
+        om.MFnDependencyNode(get_object(node, objects)).addAttribute(
+            create_attribute(long_name, short_name, attr_type, default, hidden, keyable, min, max))
+
+    for plug_name, value in plan.values:
+        plug = get_plug(plug_name, objects)
+        if isinstance(value, bool):
+            modifier.newPlugValueBool(plug, value)
+        elif isinstance(value, int):
+            modifier.newPlugValueInt(plug, value)
+        elif isinstance(value, str):
+            modifier.newPlugValueString(plug, value)
+        else:
+            modifier.newPlugValueDouble(plug, value)
+
+    for source, destination in plan.connections:
+        modifier.connect(get_plug(source, objects), get_plug(destination, objects))
+
+    modifier.doIt()
+
+    return dict((name, om.MFnDependencyNode(obj).name()) for name, obj in objects.items())
+
+def plan_is_supported():
+    # modifier connections don't get the unitConversion nodes connectAttr would add
+    return cmds.currentUnit(q=True, linear=True) == 'cm'
+
+def create_attribute(long_name, short_name, attr_type, default, hidden, keyable, min, max):
+    if attr_type == 'string':
+        fn = om.MFnTypedAttribute()
+        attr = fn.create(long_name, short_name, om.MFnData.kString)
+    else:
+        numeric_types = {'bool': om.MFnNumericData.kBoolean,
+                         'float': om.MFnNumericData.kFloat,
+                         'double': om.MFnNumericData.kDouble}
+        fn = om.MFnNumericAttribute()
+        attr = fn.create(long_name, short_name, numeric_types[attr_type], 0 if default is None else default)
+        if min is not None:
+            fn.setMin(min)
+        if max is not None:
+            fn.setMax(max)
+    fn.hidden = hidden
+    fn.keyable = keyable
+    return attr
+
+def get_object(name, objects):
+    if name in objects:
+        return objects[name]
+    selection = om.MSelectionList()
+    selection.add(name)
+    return selection.getDependNode(0)
+
+def get_plug(plug_name, objects):
+    node, path = plug_name.split('.', 1)
+    obj = get_object(node, objects)
+    fn = om.MFnDependencyNode(obj)
+    plug = None
+    for part in path.split('.'):
+        attr_name, _, index = part.partition('[')
+        if plug is None:
+            plug = fn.findPlug(attr_name, False)
+        else:
+            plug = get_child_plug(plug, fn.attribute(attr_name))
+        if index:
+            plug = plug.elementByLogicalIndex(int(index[:-1]))
+    return plug
+
+def get_child_plug(plug, attr):
+    # plug.child only takes direct children, walk down through the compounds in between, like
+    # targetOffsetTranslate between target[0] and targetOffsetTranslateZ
+    parents = []
+    parent = om.MFnAttribute(attr).parent
+    while not parent.isNull() and parent != plug.attribute():
+        parents.append(parent)
+        parent = om.MFnAttribute(parent).parent
+    for parent_attr in reversed(parents):
+        plug = plug.child(parent_attr)
+    return plug.child(attr)
@@ -0,0 +1,65 @@
+# Maya-free joint axis math for the push rigs. Rotations are 3x3 row vector matrices like
+# Maya's, so a point is transformed by p * M and rotate order xyz means Rx * Ry * Rz.
+import math
+
+AXES = ['X', 'Y', 'Z']
+ROTATE_ORDERS = ['xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx']
+
+
+def axis_matrix(axis, degrees):
+    c = math.cos(math.radians(degrees))
+    s = math.sin(math.radians(degrees))
+    if axis == 'x':
+        return [[1.0, 0.0, 0.0], [0.0, c, s], [0.0, -s, c]]
+    if axis == 'y':
+        return [[c, 0.0, -s], [0.0, 1.0, 0.0], [s, 0.0, c]]
+    return [[c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0]]
+
+def multiply(a, b):
+    return [[sum(a[i][k]*b[k][j] for k in range(3)) for j in range(3)] for i in range(3)]
+
+def euler_matrix(rotation, order=0):
+    # rotation in degrees, order is a rotateOrder index or a string like 'xyz'
+    if isinstance(order, int):
+        order = ROTATE_ORDERS[order]
+    matrix = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    for axis in order:
+        matrix = multiply(matrix, axis_matrix(axis, rotation['xyz'.index(axis)]))
+    return matrix
+
+def matrix_to_euler(matrix):
+    # xyz euler angles in degrees, what a transform with the default rotate order shows
+    cy = math.hypot(matrix[0][0], matrix[0][1])
+    if cy > 1e-8:
+        x = math.atan2(matrix[1][2], matrix[2][2])
+        y = math.atan2(-matrix[0][2], cy)
+        z = math.atan2(matrix[0][1], matrix[0][0])
+    else:
+        x = math.atan2(-matrix[2][1], matrix[1][1])
+        y = math.atan2(-matrix[0][2], cy)
+        z = 0.0
+    return [math.degrees(x), math.degrees(y), math.degrees(z)]
+
+def joint_local_rotation(rotate, jointOrient=(0, 0, 0), rotateAxis=(0, 0, 0), rotateOrder=0):
+    # a joint's local rotation, rotateAxis * rotate * jointOrient, as xyz euler angles
+    matrix = multiply(multiply(euler_matrix(rotateAxis), euler_matrix(rotate, rotateOrder)), euler_matrix(jointOrient))
+    return matrix_to_euler(matrix)
+
+def dominant_axis(values):
+    # 'X', 'Y' or 'Z' for the largest absolute value
+    abs_values = [abs(v) for v in values]
+    return AXES[abs_values.index(max(abs_values))]
+
+def hinge_axis(rotate, jointOrient=(0, 0, 0), rotateAxis=(0, 0, 0), rotateOrder=0):
+    return dominant_axis(joint_local_rotation(rotate, jointOrient, rotateAxis, rotateOrder))
+
+def aim_axis(child_translate):
+    return dominant_axis(child_translate)
+
+def push_axis(aim, hinge):
+    # the axis that is neither the aim nor the hinge
+    push = None
+    for axis in AXES:
+        if axis != aim and axis != hinge:
+            push = axis
+    return push
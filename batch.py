@@ -0,0 +1,171 @@
+# Headless batch builder. Takes a manifest of scenes to build muscle rigs in and runs each one
+# in its own mayapy process, a few at a time.
+#
+#   python -m VT_SimpleMuscle.batch manifest.json -j 4 --report report.json
+#
+# The manifest is a json list of jobs, or {"jobs": [...]}. Each job is
+#   {"scene": "char.ma", "guides": "char_guides.ma", "push_rigs": "char_push.json", "output": "char_rig.ma"}
+# or {"scene": "char.ma", "rig": "char_rig.json", ...} to build from a rig description, where
+# every key but one of scene/guides/rig is optional. If there is no output the scene is built
+# but not saved.
+#
+# Each worker is run as  <executable> <worker_script> --worker <job.json> <result.json>  so the
+# scheduler can be pointed at any program that follows that, eg a fake worker run with plain
+# python when there is no Maya install.
+import argparse
+import concurrent.futures
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+
+def default_executable():
+    return os.environ.get('MAYAPY', 'mayapy')
+
+def load_manifest(file_path):
+    with open(file_path, 'r') as json_file:
+        manifest = json.load(json_file)
+    if isinstance(manifest, dict):
+        manifest = manifest.get('jobs', [])
+
+    # relative paths are relative to the manifest
+    root = os.path.dirname(os.path.abspath(file_path))
+    jobs = []
+    for job in manifest:
+        if not job.get('scene') and not job.get('guides') and not job.get('rig'):
+            raise ValueError(f'manifest job {job} needs a scene, guides or rig file')
+        jobs.append(dict((key, os.path.join(root, value)) for key, value in job.items()
+                         if key in ['scene', 'guides', 'rig', 'push_rigs', 'output'] and value))
+    return jobs
+
+def run_manifest(jobs, processes=4, executable=None, worker_script=None, timeout=None):
+    # build every job in a pool of worker processes, returns one report entry per job in order
+    executable = executable or default_executable()
+    worker_script = worker_script or os.path.abspath(__file__)
+
+    with tempfile.TemporaryDirectory(prefix='vt_simplemuscle_batch_') as temp_dir:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(run_job, job, i, temp_dir, executable, worker_script, timeout)
+                       for i, job in enumerate(jobs)]
+            return [f.result() for f in futures]
+
+def run_job(job, number, temp_dir, executable, worker_script, timeout=None):
+    job_path = os.path.join(temp_dir, f'job_{number}.json')
+    result_path = os.path.join(temp_dir, f'result_{number}.json')
+    with open(job_path, 'w') as json_file:
+        json.dump(job, json_file)
+
+    report = {'job': job, 'status': 'error', 'seconds': 0.0, 'error': None, 'result': None}
+    start = time.perf_counter()
+    try:
+        process = subprocess.run([executable, worker_script, '--worker', job_path, result_path],
+                                 capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        report['seconds'] = time.perf_counter() - start
+        report['error'] = str(e)
+        return report
+    report['seconds'] = time.perf_counter() - start
+
+    if os.path.exists(result_path):
+        with open(result_path, 'r') as json_file:
+            report['result'] = json.load(json_file)
+    if process.returncode == 0 and report['result'] and not report['result'].get('error'):
+        report['status'] = 'ok'
+    else:
+        error = report['result'].get('error') if report['result'] else None
+        report['error'] = error or process.stderr[-4000:] or f'worker exited with {process.returncode}'
+    return report
+
+def print_report(reports):
+    failed = 0
+    total = 0.0
+    for report in reports:
+        total += report['seconds']
+        name = report['job'].get('scene') or report['job'].get('guides') or report['job'].get('rig')
+        muscles = report['result'].get('muscles', 0) if report['result'] else 0
+        print(f"{report['status']:<6}{report['seconds']:>9.2f}s {muscles:>5} muscles  {name}")
+        if report['status'] != 'ok':
+            failed += 1
+            print(f"    {report['error'].strip().splitlines()[-1] if report['error'] else ''}")
+    print(f'{len(reports)} files, {failed} failed, {total:.2f}s of worker time')
+
+def worker(job_path, result_path):
+    # runs inside mayapy
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = {}
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        import maya.cmds as cmds
+        import VT_SimpleMuscle.lib as sm
+
+        with open(job_path, 'r') as json_file:
+            job = json.load(json_file)
+
+        start = time.perf_counter()
+        if job.get('scene'):
+            cmds.file(job['scene'], open=True, force=True)
+        else:
+            cmds.file(new=True, force=True)
+        result['open_seconds'] = time.perf_counter() - start
+
+        timings = []
+        if job.get('guides'):
+            sm.import_guides(job['guides'])
+            # build_all_rigs only builds the selection if anything is selected
+            cmds.select(clear=True)
+            timings = sm.build_all_rigs()
+        if job.get('rig'):
+            rig_timings, push_report = sm.build_from_rig_description(job['rig'])
+            timings += rig_timings
+            result['push_rigs'] = push_report
+        result['muscles'] = len(timings)
+        result['timings'] = timings
+
+        if job.get('push_rigs'):
+            start = time.perf_counter()
+            sm.import_push_rigs(job['push_rigs'])
+            result['push_rig_seconds'] = time.perf_counter() - start
+
+        if job.get('output'):
+            cmds.file(rename=job['output'])
+            file_type = 'mayaBinary' if job['output'].endswith('.mb') else 'mayaAscii'
+            cmds.file(save=True, force=True, type=file_type)
+    except Exception:
+        result['error'] = traceback.format_exc()
+
+    with open(result_path, 'w') as json_file:
+        json.dump(result, json_file, indent=4)
+    return 1 if result.get('error') else 0
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Build VT_SimpleMuscle rigs for many scenes in mayapy')
+    parser.add_argument('manifest', nargs='?', help='json manifest of scenes to build')
+    parser.add_argument('-j', '--processes', type=int, default=4, help='number of mayapy processes to run at once')
+    parser.add_argument('--mayapy', default=None, help='maya python executable, defaults to $MAYAPY or mayapy')
+    parser.add_argument('--worker-script', default=None, help='script the executable runs for each job')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds before a worker is killed')
+    parser.add_argument('--report', default=None, help='write the per file report to this json file')
+    parser.add_argument('--worker', nargs=2, metavar=('JOB', 'RESULT'), help=argparse.SUPPRESS)
+    args = parser.parse_args(args)
+
+    if args.worker:
+        return worker(*args.worker)
+    if not args.manifest:
+        parser.error('a manifest is required')
+
+    reports = run_manifest(load_manifest(args.manifest), args.processes, args.mayapy, args.worker_script,
+                           args.timeout)
+    print_report(reports)
+    if args.report:
+        with open(args.report, 'w') as json_file:
+            json.dump(reports, json_file, indent=4)
+    return 0 if all(r['status'] == 'ok' for r in reports) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
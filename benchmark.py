@@ -0,0 +1,197 @@
+# Maya-free benchmark of rig construction. Runs the builder against fake_cmds at a few scene
+# sizes and reports the commands, nodes and wall time each operation takes.
+#
+#   python -m VT_SimpleMuscle.benchmark --sizes 1 10 100 1000 --output bench.json
+#   python -m VT_SimpleMuscle.benchmark --baseline bench.json --tolerance 0.05
+#
+# With a baseline it exits non zero when an operation runs more commands than the baseline did
+# (plus the tolerance), which is what CI checks. Wall times are reported but never fail a run,
+# they are too noisy on shared machines.
+import argparse
+import json
+import os
+import sys
+import time
+
+import VT_SimpleMuscle.fake_cmds as fake_cmds
+
+cmds = fake_cmds.install()
+
+import VT_SimpleMuscle.lib as lib
+
+
+DEFAULT_SIZES = [1, 10, 100, 1000]
+
+######################################
+# scene fixtures, not measured
+
+def make_skeleton():
+    return cmds.createNode('joint', n='spine')
+
+def make_guides(count, sides=('L',)):
+    guides = []
+    for i in range(count):
+        for side in sides:
+            guide = lib.create_guide(f'muscle{i}_{side}', 'spine', 3)[0]
+            cmds.setAttr(f'{guide}.translate', i, 5, 0)
+            guides.append(guide)
+    return guides
+
+def make_arms(count, sides=('L', 'R')):
+    elbows = []
+    for i in range(count):
+        for side in sides:
+            shoulder = cmds.createNode('joint', n=f'shoulder{i}_{side}')
+            elbow = cmds.createNode('joint', n=f'elbow{i}_{side}', p=shoulder)
+            wrist = cmds.createNode('joint', n=f'wrist{i}_{side}', p=elbow)
+            cmds.setAttr(f'{elbow}.translate', 10, 0, 0)
+            cmds.setAttr(f'{wrist}.translate', 10, 0, 0)
+            cmds.setAttr(f'{elbow}.rotate', 0, 0, 30)
+            elbows.append(elbow)
+    return elbows
+
+def make_push_rigs(count, lean=False):
+    make_arms(count)
+    for i in range(count):
+        lib.create_push_joints(f'elbow{i}_L', f'elbow{i}_L', lean)
+
+######################################
+# benchmarks, each is (prepare(size), run(size, state))
+
+def prepare_setup(size):
+    make_skeleton()
+    return [(g, cmds.listRelatives(g, c=True)[0]) for g in make_guides(size)]
+
+def run_setup(size, guides):
+    for joint, end_joint in guides:
+        lib.setup([joint, end_joint], 3, 'spine')
+
+def prepare_build_all_rigs(size):
+    make_skeleton()
+    make_guides(size)
+
+def run_build_all_rigs(size, state):
+    lib.build_all_rigs(batch=False, profile=False)
+
+def prepare_create_push_joints(size):
+    make_arms(size, sides=('L',))
+
+def run_create_push_joints(size, state, lean=False):
+    for i in range(size):
+        lib.create_push_joints(f'elbow{i}_L', f'elbow{i}_L', lean)
+
+def run_create_push_joints_lean(size, state):
+    run_create_push_joints(size, state, lean=True)
+
+def prepare_mirror_guides(size):
+    make_skeleton()
+    make_guides(size)
+
+def run_mirror_guides(size, state):
+    lib.mirror_guides()
+
+def prepare_mirror_rig_settings(size):
+    make_skeleton()
+    make_guides(size, sides=('L', 'R'))
+    lib.build_all_rigs(batch=False, profile=False)
+    for i in range(size):
+        cmds.setAttr(f'muscle{i}_L_surface.bulge', 2.0)
+
+def run_mirror_rig_settings(size, state):
+    lib.mirror_rig_settings()
+
+def run_mirror_push_rigs(size, state):
+    lib.mirror_push_rigs()
+
+def prepare_mirror_push_rig_settings(size):
+    make_push_rigs(size)
+    for i in range(size):
+        lib.create_push_joints(f'elbow{i}_R', f'elbow{i}_R')
+
+def run_mirror_all_push_rig_settings(size, state):
+    lib.mirror_all_push_rig_settings()
+
+BENCHMARKS = [
+    ('setup', prepare_setup, run_setup),
+    ('build_all_rigs', prepare_build_all_rigs, run_build_all_rigs),
+    ('create_push_joints', prepare_create_push_joints, run_create_push_joints),
+    ('create_push_joints_lean', prepare_create_push_joints, run_create_push_joints_lean),
+    ('mirror_guides', prepare_mirror_guides, run_mirror_guides),
+    ('mirror_rig_settings', prepare_mirror_rig_settings, run_mirror_rig_settings),
+    ('mirror_push_rigs', make_push_rigs, run_mirror_push_rigs),
+    ('mirror_all_push_rig_settings', prepare_mirror_push_rig_settings, run_mirror_all_push_rig_settings),
+]
+
+######################################
+
+def run_benchmark(name, prepare, run, size):
+    cmds.reset()
+    state = prepare(size)
+    cmds.calls.clear()
+    nodes = cmds.nodes_created
+    # the builder prints per muscle, keep that out of the results
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        start = time.perf_counter()
+        run(size, state)
+        seconds = time.perf_counter() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return {'benchmark': name, 'size': size, 'seconds': seconds, 'commands': cmds.command_count,
+            'nodes': cmds.nodes_created - nodes, 'calls': dict(cmds.calls)}
+
+def run_all(sizes=None, names=None):
+    results = []
+    for name, prepare, run in BENCHMARKS:
+        if names and name not in names:
+            continue
+        for size in sizes or DEFAULT_SIZES:
+            results.append(run_benchmark(name, prepare, run, size))
+    return results
+
+def compare(results, baseline, tolerance=0.0):
+    # the results that ran more commands than the baseline allows
+    allowed = dict(((r['benchmark'], r['size']), r['commands']) for r in baseline)
+    regressions = []
+    for result in results:
+        key = (result['benchmark'], result['size'])
+        if key in allowed and result['commands'] > allowed[key] * (1.0 + tolerance):
+            regressions.append((result, allowed[key]))
+    return regressions
+
+def print_results(results):
+    print(f"{'benchmark':<32}{'size':>7}{'cmds':>10}{'cmds/muscle':>13}{'nodes':>9}{'seconds':>10}")
+    for r in results:
+        print(f"{r['benchmark']:<32}{r['size']:>7}{r['commands']:>10}{r['commands'] / r['size']:>13.1f}"
+              f"{r['nodes']:>9}{r['seconds']:>10.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark rig construction against the fake maya.cmds')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='muscles per scene')
+    parser.add_argument('--only', nargs='+', help='benchmarks to run, default all')
+    parser.add_argument('--output', help='write the results to this json file')
+    parser.add_argument('--baseline', help='json results to fail against on command count regressions')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='allowed command count increase, 0.05 is 5%%')
+    args = parser.parse_args(argv)
+
+    results = run_all(args.sizes, args.only)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json.dump(results, json_file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as json_file:
+            regressions = compare(results, json.load(json_file), args.tolerance)
+        for result, allowed in regressions:
+            print(f"regression: {result['benchmark']} at {result['size']} ran {result['commands']} commands, "
+                  f"baseline {allowed}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# Maya-free store for the stretch factor of every muscle surface over a frame range, recorded by
+# lib.record_surface_factors. The offsets a flex network produces only depend on the factor and
+# the surface settings, so bulge/sink/triggerLength changes can be previewed from the recorded
+# factors without evaluating the scene. On disk it is a .npy structured array with one record per
+# frame, the frame number and a float32 factor per surface, like joint_cache.
+import VT_SimpleMuscle.flex as flex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FORMAT = 'VT_SimpleMuscle.factorCache'
+
+
+class FactorCache(object):
+
+    def __init__(self, frames, factors):
+        # factors is {surface: [factor per frame]}
+        self.frames = list(frames)
+        self.factors = dict((surface, list(values)) for surface, values in factors.items())
+        for surface, values in self.factors.items():
+            if len(values) != len(self.frames):
+                raise ValueError(f'{surface} has {len(values)} factors for {len(self.frames)} frames')
+
+    def factor_range(self, surface):
+        values = self.factors[surface]
+        return min(values), max(values)
+
+    def offset_range(self, surface, bulge, sink, triggerLength, weights):
+        # [(min, max)] Z offset of each joint over the recorded frames. The offset only moves
+        # away from 0 as the factor moves away from 1.0, so the extremes are at the smallest and
+        # largest factor, or 0 when the range crosses 1.0
+        low, high = self.factor_range(surface)
+        candidates = [flex.flex_offsets(low, bulge, sink, triggerLength, weights),
+                      flex.flex_offsets(high, bulge, sink, triggerLength, weights)]
+        if low <= 1.0 <= high:
+            candidates.append([0.0] * len(weights))
+        return [(min(values), max(values)) for values in zip(*candidates)]
+
+    def frame_offsets(self, surface, bulge, sink, triggerLength, weights):
+        # (frames, joints) array of every joint's offset at every recorded frame
+        return flex.flex_offsets_array(self.factors[surface], bulge, sink, triggerLength, weights)
+
+    def save(self, file_path):
+        require_numpy()
+        surfaces = list(self.factors)
+        dtype = np.dtype([('frame', '<f8')] + [(surface, '<f4') for surface in surfaces])
+        records = np.zeros(len(self.frames), dtype=dtype)
+        records['frame'] = self.frames
+        for surface in surfaces:
+            records[surface] = self.factors[surface]
+        np.save(file_path, records)
+
+    @classmethod
+    def load(cls, file_path):
+        require_numpy()
+        records = np.load(file_path, mmap_mode='r')
+        if records.dtype.names is None or records.dtype.names[0] != 'frame':
+            raise ValueError(f'{file_path} is not a {FORMAT} file')
+        return cls(records['frame'].tolist(),
+                   dict((surface, records[surface].tolist()) for surface in records.dtype.names[1:]))
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError('saving and loading VT_SimpleMuscle factor caches needs numpy')
@@ -0,0 +1,570 @@
+# In-memory stand in for the part of maya.cmds the rig builder uses, so the builder can be run
+# and benchmarked without Maya. It keeps track of nodes, attributes, connections and DAG
+# parenting and counts every command, but does no evaluation: attributes hold whatever was last
+# set on them and world positions only add up translates.
+#
+#   import VT_SimpleMuscle.fake_cmds as fake_cmds
+#   cmds = fake_cmds.install()
+#   import VT_SimpleMuscle.lib as sm
+#
+# install() has to run before lib is imported, it registers the fake as maya.cmds. It also
+# registers a maya.api.OpenMaya with just the plug reads and writes of sync_surface_settings and
+# the node added callback the profiler counts nodes with. Api calls aren't counted as commands.
+import collections
+import fnmatch
+import functools
+import sys
+import types
+
+# node types that get a transform parent when they are created on their own
+SHAPE_TYPES = ['follicle', 'arcLengthDimension', 'nurbsSurface', 'nurbsCurve', 'locator', 'mesh']
+DAG_TYPES = ['transform', 'joint'] + SHAPE_TYPES + ['parentConstraint', 'pointConstraint', 'orientConstraint']
+# compound attrs and their children
+COMPOUNDS = {
+    'translate': ['translateX', 'translateY', 'translateZ'],
+    'rotate': ['rotateX', 'rotateY', 'rotateZ'],
+    'scale': ['scaleX', 'scaleY', 'scaleZ'],
+    'jointOrient': ['jointOrientX', 'jointOrientY', 'jointOrientZ'],
+    'rotateAxis': ['rotateAxisX', 'rotateAxisY', 'rotateAxisZ'],
+}
+SHORT_NAMES = {'tx': 'translateX', 'ty': 'translateY', 'tz': 'translateZ', 'rx': 'rotateX', 'ry': 'rotateY',
+               'rz': 'rotateZ', 'sx': 'scaleX', 'sy': 'scaleY', 'sz': 'scaleZ', 'v': 'visibility'}
+DEFAULTS = {'scaleX': 1.0, 'scaleY': 1.0, 'scaleZ': 1.0, 'visibility': True, 'rotateOrder': 0}
+
+
+class FakeNode(object):
+
+    def __init__(self, name, node_type):
+        self.name = name
+        self.type = node_type
+        self.parent = None
+        self.children = []
+        self.attrs = {}
+        self.user_attrs = []
+
+
+class FakeCmds(types.ModuleType):
+
+    def __init__(self):
+        super(FakeCmds, self).__init__('maya.cmds')
+        self.reset()
+
+    def reset(self):
+        self.nodes = collections.OrderedDict()
+        self.connections = {}
+        # destination plugs each node is on either end of, so deletes don't scan every connection
+        self.node_plugs = collections.defaultdict(set)
+        self.name_counters = {}
+        self.selection = []
+        self.time = 1.0
+        self.undo_state = True
+        self.calls = collections.Counter()
+        self.nodes_created = 0
+        # {id: function} for the fake MDGMessage.addNodeAddedCallback
+        self.node_added_callbacks = {}
+        # nodes every scene has
+        self.nodes['time1'] = FakeNode('time1', 'time')
+
+    def __getattribute__(self, name):
+        # count every public command
+        attr = super(FakeCmds, self).__getattribute__(name)
+        if not name.startswith('_') and callable(attr) and name in FakeCmds.commands:
+            calls = super(FakeCmds, self).__getattribute__('calls')
+
+            @functools.wraps(attr)
+            def counted(*args, **kwargs):
+                calls[name] += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+    @property
+    def command_count(self):
+        return sum(self.calls.values())
+
+    ######################################
+    # helpers
+
+    def _node(self, name):
+        name = name.split('|')[-1]
+        if name not in self.nodes:
+            raise ValueError(f'No object matches name: {name}')
+        return self.nodes[name]
+
+    def _unique(self, name):
+        if name not in self.nodes:
+            return name
+        base = name.rstrip('0123456789')
+        i = self.name_counters.get(base, 1)
+        while f'{base}{i}' in self.nodes:
+            i += 1
+        self.name_counters[base] = i
+        return f'{base}{i}'
+
+    def _new(self, node_type, name=None, parent=None):
+        node = FakeNode(self._unique(name or f'{node_type}1'), node_type)
+        self.nodes[node.name] = node
+        self.nodes_created += 1
+        if parent:
+            self._reparent(node, self._node(parent))
+        for callback in list(self.node_added_callbacks.values()):
+            callback(node)
+        return node
+
+    def _reparent(self, node, parent):
+        if node.parent:
+            node.parent.children.remove(node)
+        node.parent = parent
+        if parent:
+            parent.children.append(node)
+
+    def _split(self, plug):
+        node, attr = plug.split('.', 1)
+        attr = SHORT_NAMES.get(attr, attr)
+        return self._node(node), attr
+
+    def _get(self, node, attr):
+        if attr in COMPOUNDS:
+            return [tuple(self._get(node, child) for child in COMPOUNDS[attr])]
+        return node.attrs.get(attr, DEFAULTS.get(attr, 0.0))
+
+    def _connect(self, source, destination):
+        if destination in self.connections:
+            self._disconnect(destination)
+        self.connections[destination] = source
+        self.node_plugs[source.split('.', 1)[0]].add(destination)
+        self.node_plugs[destination.split('.', 1)[0]].add(destination)
+
+    def _disconnect(self, destination):
+        source = self.connections.pop(destination, None)
+        if source is None:
+            return
+        for name in (source.split('.', 1)[0], destination.split('.', 1)[0]):
+            if name in self.node_plugs:
+                self.node_plugs[name].discard(destination)
+
+    def _world_position(self, node):
+        position = [0.0, 0.0, 0.0]
+        while node:
+            for i, attr in enumerate(COMPOUNDS['translate']):
+                position[i] += self._get(node, attr)
+            node = node.parent
+        return position
+
+    def _descendants(self, node):
+        result = []
+        for child in node.children:
+            result.append(child)
+            result.extend(self._descendants(child))
+        return result
+
+    def _names(self, nodes):
+        return [n.name for n in nodes] or None
+
+    ######################################
+    # commands
+
+    def createNode(self, node_type, n=None, name=None, p=None, parent=None, **kwargs):
+        name = n or name
+        parent = p or parent
+        if node_type in SHAPE_TYPES and not parent:
+            parent = self._new('transform', f'{node_type}1').name
+        return self._new(node_type, name, parent).name
+
+    def objExists(self, name):
+        node = name.split('.', 1)[0].split('|')[-1]
+        if node not in self.nodes:
+            return False
+        if '.' in name:
+            attr = SHORT_NAMES.get(name.split('.', 1)[1], name.split('.', 1)[1])
+            return attr in self.nodes[node].attrs or attr in COMPOUNDS
+        return True
+
+    def rename(self, old, new, **kwargs):
+        node = self._node(old)
+        old_name = node.name
+        del self.nodes[old_name]
+        node.name = self._unique(new)
+        self.nodes[node.name] = node
+
+        def renamed(plug):
+            plug_node, attr = plug.split('.', 1)
+            return f'{node.name}.{attr}' if plug_node == old_name else plug
+        for destination in self.node_plugs.pop(old_name, set()):
+            source = self.connections.pop(destination)
+            self._connect(renamed(source), renamed(destination))
+        return node.name
+
+    def delete(self, *names, **kwargs):
+        if kwargs.get('ch') or kwargs.get('constructionHistory'):
+            return
+        for name in flatten(names):
+            if not self.objExists(name):
+                continue
+            node = self._node(name)
+            for gone in [node] + self._descendants(node):
+                self.nodes.pop(gone.name, None)
+                for destination in self.node_plugs.pop(gone.name, set()):
+                    self._disconnect(destination)
+            self._reparent(node, None)
+
+    def parent(self, *args, **kwargs):
+        names = flatten(args)
+        if kwargs.get('w') or kwargs.get('world'):
+            children, parent = names, None
+        else:
+            children, parent = names[:-1], self._node(names[-1])
+        for name in children:
+            node = self._node(name)
+            if node.parent is parent:
+                raise RuntimeError(f'{name} is already a child of {parent.name if parent else "the world"}')
+            self._reparent(node, parent)
+        return children
+
+    def listRelatives(self, name, s=False, shapes=False, p=False, parent=False, c=False, children=False,
+                      ad=False, allDescendents=False, type=None, f=False, fullPath=False, **kwargs):
+        node = self._node(name)
+        if p or parent:
+            nodes = [node.parent] if node.parent else []
+        elif ad or allDescendents:
+            nodes = self._descendants(node)
+        elif s or shapes:
+            nodes = [n for n in node.children if n.type in SHAPE_TYPES]
+        else:
+            nodes = list(node.children)
+        if type:
+            types_ = [type] if isinstance(type, str) else type
+            nodes = [n for n in nodes if n.type in types_]
+        return self._names(nodes)
+
+    def ls(self, *names, sl=False, selection=False, type=None, r=False, showType=False, **kwargs):
+        if sl or selection:
+            result = [n for n in self.selection if n in self.nodes]
+        elif names:
+            result = []
+            for pattern in flatten(names):
+                if '.' in pattern:
+                    node_pattern, attr = pattern.split('.', 1)
+                    result.extend(f'{n.name}.{attr}' for n in self.nodes.values()
+                                  if fnmatch.fnmatchcase(n.name, node_pattern) and attr in n.attrs)
+                elif any(c in pattern for c in '*?['):
+                    result.extend(n for n in self.nodes if fnmatch.fnmatchcase(n, pattern.split('|')[-1]))
+                elif pattern.split('|')[-1] in self.nodes:
+                    result.append(pattern.split('|')[-1])
+        else:
+            result = list(self.nodes)
+        if type:
+            types_ = [type] if isinstance(type, str) else type
+            result = [n for n in result if self.nodes[n.split('.')[0]].type in types_]
+        if showType:
+            typed = []
+            for n in result:
+                typed += [n, self.nodes[n.split('.')[0]].type]
+            return typed
+        return result
+
+    def select(self, *names, clear=False, cl=False, **kwargs):
+        self.selection = [] if (clear or cl) else [n for n in flatten(names)]
+
+    def objectType(self, name, isType=None, **kwargs):
+        node_type = self._node(name).type
+        if isType:
+            return node_type == isType
+        return node_type
+
+    def addAttr(self, name, ln=None, longName=None, at=None, dt=None, dv=None, defaultValue=None, **kwargs):
+        node = self._node(name)
+        attr = ln or longName
+        if attr in node.attrs:
+            raise RuntimeError(f'Found a similar attribute {attr} on {node.name}')
+        default = dv if dv is not None else defaultValue
+        if default is None:
+            default = '' if dt == 'string' else {'bool': False, 'enum': 0, 'short': 0, 'long': 0}.get(at, 0.0)
+        node.attrs[attr] = default
+        node.user_attrs.append(attr)
+
+    def listAttr(self, name, ud=False, userDefined=False, **kwargs):
+        node = self._node(name)
+        return list(node.user_attrs if (ud or userDefined) else node.attrs) or None
+
+    def attributeQuery(self, attr, n=None, node=None, ex=False, exists=False, **kwargs):
+        return attr in self._node(n or node).attrs
+
+    def setAttr(self, plug, *values, type=None, **kwargs):
+        if not values:
+            # lock/keyable/channelBox flags only
+            return
+        node, attr = self._split(plug)
+        if attr in COMPOUNDS:
+            for child, value in zip(COMPOUNDS[attr], flatten(values)):
+                node.attrs[child] = value
+        else:
+            node.attrs[attr] = values[0]
+
+    def getAttr(self, plug, **kwargs):
+        node, attr = self._split(plug)
+        return self._get(node, attr)
+
+    def connectAttr(self, source, destination, f=False, force=False, **kwargs):
+        self._split(source)
+        self._split(destination)
+        self._connect(source, destination)
+
+    def disconnectAttr(self, source, destination, **kwargs):
+        if self.connections.get(destination) != source:
+            raise RuntimeError(f'There is no connection from {source} to {destination} to disconnect')
+        self._disconnect(destination)
+
+    def listConnections(self, plug, s=True, d=True, source=True, destination=True, p=False, plugs=False,
+                        **kwargs):
+        # a node lists the connections of all its plugs, a plug only its own
+        name = plug.split('.', 1)[0]
+        attr = plug.split('.', 1)[1] if '.' in plug else None
+        result = []
+        for destination_plug in sorted(self.node_plugs.get(name, ())):
+            source_plug = self.connections[destination_plug]
+            if d and destination and (source_plug == plug if attr else source_plug.split('.', 1)[0] == name):
+                result.append(destination_plug if p or plugs else destination_plug.split('.', 1)[0])
+            if s and source and (destination_plug == plug if attr else destination_plug.split('.', 1)[0] == name):
+                result.append(source_plug if p or plugs else source_plug.split('.', 1)[0])
+        return result or None
+
+    def xform(self, name, q=False, query=False, ws=False, rp=False, m=None, t=None, **kwargs):
+        node = self._node(name)
+        if q or query:
+            position = self._world_position(node) if ws else [self._get(node, a) for a in COMPOUNDS['translate']]
+            if m:
+                return [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0] + position + [1.0]
+            return position
+        if m:
+            t = m[12:15]
+        if t:
+            offset = self._world_position(node.parent) if (ws and node.parent) else [0.0, 0.0, 0.0]
+            for attr, value, parent_value in zip(COMPOUNDS['translate'], t, offset):
+                node.attrs[attr] = value - parent_value
+
+    def matchTransform(self, name, target, **kwargs):
+        node = self._node(name)
+        position = self._world_position(self._node(target))
+        self.xform(node.name, t=position, ws=True)
+
+    def duplicate(self, name, po=False, parentOnly=False, n=None, **kwargs):
+        source = self._node(name)
+        node = self._new(source.type, n or source.name, source.parent.name if source.parent else None)
+        node.attrs = dict(source.attrs)
+        node.user_attrs = list(source.user_attrs)
+        return [node.name]
+
+    def mirrorJoint(self, name, sr=None, searchReplace=None, **kwargs):
+        sr = sr or searchReplace or ['', '']
+        source = self._node(name)
+        created = []
+
+        def mirror(node, parent):
+            new = self._new(node.type, node.name.replace(sr[0], sr[1]) if sr[0] else node.name, parent)
+            new.attrs = dict(node.attrs)
+            new.user_attrs = list(node.user_attrs)
+            if 'translateX' in new.attrs and parent is None:
+                new.attrs['translateX'] = -new.attrs['translateX']
+            created.append(new.name)
+            for child in node.children:
+                mirror(child, new.name)
+        mirror(source, source.parent.name if source.parent else None)
+        return created
+
+    def curve(self, p=None, point=None, n=None, name=None, d=1, **kwargs):
+        transform = self._new('transform', n or name or 'curve1')
+        self._new('nurbsCurve', f'{transform.name}Shape', transform.name)
+        return transform.name
+
+    def loft(self, *curves, n=None, name=None, **kwargs):
+        transform = self._new('transform', n or name or 'loftedSurface1')
+        self._new('nurbsSurface', f'{transform.name}Shape', transform.name)
+        return [transform.name]
+
+    def rebuildSurface(self, *args, **kwargs):
+        return list(flatten(args))
+
+    def reverseSurface(self, *args, **kwargs):
+        return list(flatten(args))
+
+    def skinCluster(self, *args, **kwargs):
+        return [self._new('skinCluster', 'skinCluster1').name]
+
+    def _constraint(self, constraint_type, args):
+        names = flatten(args)
+        constrained = names[-1]
+        node = self._new(constraint_type, f'{constrained.split("|")[-1]}_{constraint_type}1', constrained)
+        for i, target in enumerate(names[:-1]):
+            node.attrs[f'{target}W{i}'] = 1.0
+        return [node.name]
+
+    def parentConstraint(self, *args, **kwargs):
+        return self._constraint('parentConstraint', args)
+
+    def pointConstraint(self, *args, **kwargs):
+        return self._constraint('pointConstraint', args)
+
+    def orientConstraint(self, *args, **kwargs):
+        return self._constraint('orientConstraint', args)
+
+    def warning(self, message, **kwargs):
+        pass
+
+    def error(self, message, **kwargs):
+        raise RuntimeError(message)
+
+    def undoInfo(self, q=False, query=False, state=None, stateWithoutFlush=None, **kwargs):
+        # only the queue on/off state, chunks aren't recorded
+        if q or query:
+            return self.undo_state
+        for value in (state, stateWithoutFlush):
+            if value is not None:
+                self.undo_state = bool(value)
+        return None
+
+    def refresh(self, **kwargs):
+        return None
+
+    def evaluationManager(self, q=False, query=False, mode=None, **kwargs):
+        if q or query:
+            return ['parallel']
+
+    def currentTime(self, *args, q=False, query=False, **kwargs):
+        if q or query:
+            return self.time
+        self.time = args[0]
+        return self.time
+
+    def playbackOptions(self, q=False, query=False, min=False, max=False, **kwargs):
+        if q or query:
+            return 1.0 if min else 24.0
+
+    def currentUnit(self, **kwargs):
+        return 'cm'
+
+    def pluginInfo(self, *args, **kwargs):
+        return True
+
+    def loadPlugin(self, *args, **kwargs):
+        return None
+
+    def file(self, *args, **kwargs):
+        raise RuntimeError('the fake maya.cmds has no scene files')
+
+    commands = None
+
+
+FakeCmds.commands = frozenset(name for name, value in vars(FakeCmds).items()
+                              if callable(value) and not name.startswith('_') and name not in ['reset'])
+
+def flatten(values):
+    result = []
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            result.extend(flatten(value))
+        else:
+            result.append(value)
+    return result
+
+def make_open_maya(cmds):
+    # a maya.api.OpenMaya module over the nodes of cmds
+    om = types.ModuleType('maya.api.OpenMaya')
+
+    class MObject(object):
+        def __init__(self, node=None):
+            self.node = node
+
+        def isNull(self):
+            return self.node is None
+
+    class MSelectionList(object):
+        def __init__(self):
+            self.nodes = []
+
+        def add(self, name):
+            self.nodes.append(cmds._node(name))
+            return self
+
+        def length(self):
+            return len(self.nodes)
+
+        def getDependNode(self, index):
+            return MObject(self.nodes[index])
+
+    class MPlug(object):
+        def __init__(self, node, attr):
+            self.node = node
+            self.attr = attr
+
+        def name(self):
+            return f'{self.node.name}.{self.attr}'
+
+        def asDouble(self):
+            return float(cmds._get(self.node, self.attr))
+
+        def setDouble(self, value):
+            self.node.attrs[self.attr] = value
+
+    class MFnDependencyNode(object):
+        def __init__(self, obj):
+            self.node = obj.node
+
+        def name(self):
+            return self.node.name
+
+        def hasAttribute(self, attr):
+            return attr in self.node.attrs
+
+        def findPlug(self, attr, want_networked):
+            if not self.hasAttribute(attr):
+                raise RuntimeError(f'{self.node.name} has no attribute {attr}')
+            return MPlug(self.node, attr)
+
+    class MDGModifier(object):
+        def __init__(self):
+            self.values = []
+
+        def newPlugValueDouble(self, plug, value):
+            self.values.append((plug, value))
+            return self
+
+        def doIt(self):
+            for plug, value in self.values:
+                plug.setDouble(value)
+
+    class MDGMessage(object):
+        @staticmethod
+        def addNodeAddedCallback(function, node_type='dependNode', client_data=None):
+            callback_id = len(cmds.node_added_callbacks) + 1
+            while callback_id in cmds.node_added_callbacks:
+                callback_id += 1
+            cmds.node_added_callbacks[callback_id] = lambda node: function(MObject(node), client_data)
+            return callback_id
+
+    class MMessage(object):
+        @staticmethod
+        def removeCallback(callback_id):
+            cmds.node_added_callbacks.pop(callback_id, None)
+
+    for cls in [MObject, MSelectionList, MPlug, MFnDependencyNode, MDGModifier, MDGMessage, MMessage]:
+        setattr(om, cls.__name__, cls)
+    return om
+
+def install():
+    # register a fresh FakeCmds as maya.cmds and return it. Call before importing lib
+    cmds = FakeCmds()
+    maya = sys.modules.get('maya')
+    if maya is None or getattr(maya, '__file__', None):
+        maya = types.ModuleType('maya')
+        maya.__path__ = []
+        sys.modules['maya'] = maya
+    maya.cmds = cmds
+    sys.modules['maya.cmds'] = cmds
+    api = types.ModuleType('maya.api')
+    api.__path__ = []
+    api.OpenMaya = make_open_maya(cmds)
+    maya.api = api
+    sys.modules['maya.api'] = api
+    sys.modules['maya.api.OpenMaya'] = api.OpenMaya
+    return cmds
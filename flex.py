@@ -0,0 +1,108 @@
+# Maya-free reference for the flex response create_flex wires up, so the math can be
+# evaluated and checked outside of Maya. Matches the remapValue/condition network and
+# the muscleFlex plugin node. The *_array functions are NumPy versions for evaluating
+# many muscles over many frames in one call.
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# the offset factor curve from calculate_offset_factor: keys at 0, 0.5 and 1.0 with values
+# 0, 1, 0, spline tangents, and the end tangents set to +/-2.7 degrees
+OFFSET_KEYS = (0.0, 0.5, 1.0)
+OFFSET_END_ANGLE = 2.7
+
+
+def remap(value, input_min, input_max, output_min, output_max):
+    # remapValue with its default linear 0-1 value curve, clamped at both ends
+    if input_max == input_min:
+        t = 0.0 if value < input_min else 1.0
+    else:
+        t = (value - input_min) / (input_max - input_min)
+    t = min(max(t, 0.0), 1.0)
+    return output_min + (output_max - output_min) * t
+
+def flex_offset(factor, bulge, sink, triggerLength, weight):
+    # Z offset of one skin joint for a stretch factor of current length / rest length
+    if factor >= 1.0:
+        # stretched, sink in up to 1 + triggerLength
+        return remap(factor, 1.0, 1.0 + triggerLength, 0.0, -sink * weight)
+    # compressed, bulge out down to triggerLength
+    return remap(factor, triggerLength, 1.0, bulge * weight, 0.0)
+
+def flex_offsets(factor, bulge, sink, triggerLength, weights):
+    return [flex_offset(factor, bulge, sink, triggerLength, w) for w in weights]
+
+def offset_weight(u):
+    # the calculate_offset_factor curve at one U position, 0 at the ends and 1 in the middle.
+    # A cubic hermite per key segment with the same tangents the animCurve had
+    u = min(max(u, OFFSET_KEYS[0]), OFFSET_KEYS[-1])
+    end_slope = math.tan(math.radians(OFFSET_END_ANGLE))
+    if u < OFFSET_KEYS[1]:
+        return hermite(u, OFFSET_KEYS[0], OFFSET_KEYS[1], 0.0, 1.0, end_slope, 0.0)
+    return hermite(u, OFFSET_KEYS[1], OFFSET_KEYS[2], 1.0, 0.0, 0.0, -end_slope)
+
+def offset_weights(positions):
+    return [offset_weight(u) for u in positions]
+
+def hermite(x, x0, x1, p0, p1, m0, m1):
+    dt = x1 - x0
+    s = (x - x0) / dt
+    s2 = s * s
+    s3 = s2 * s
+    return ((2*s3 - 3*s2 + 1) * p0 + (s3 - 2*s2 + s) * dt * m0 +
+            (-2*s3 + 3*s2) * p1 + (s3 - s2) * dt * m1)
+
+def require_numpy():
+    if np is None:
+        raise ImportError('the VT_SimpleMuscle flex *_array functions need numpy')
+
+def remap_array(value, input_min, input_max, output_min, output_max):
+    require_numpy()
+    value, input_min, input_max = np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in
+                                                        (value, input_min, input_max)])
+    span = input_max - input_min
+    flat = span == 0.0
+    t = np.where(flat, np.where(value < input_min, 0.0, 1.0),
+                 (value - input_min) / np.where(flat, 1.0, span))
+    t = np.clip(t, 0.0, 1.0)
+    return output_min + (np.asarray(output_max, dtype=float) - output_min) * t
+
+def stretch_factors(length, rest_length, scale=1.0):
+    # surface.factor, arcLength / (rest length * Scale_Constrain_To_Rig.scaleX)
+    require_numpy()
+    return np.asarray(length, dtype=float) / (np.asarray(rest_length, dtype=float) * np.asarray(scale, dtype=float))
+
+def flex_offsets_array(factor, bulge, sink, triggerLength, weights):
+    # factor is (frames, muscles), bulge/sink/triggerLength are (muscles,) and weights is
+    # (muscles, joints), padded with 0 for muscles with fewer joints. Anything that
+    # broadcasts that way works. Returns (frames, muscles, joints) Z offsets
+    require_numpy()
+    factor = np.asarray(factor, dtype=float)[..., None]
+    bulge = np.asarray(bulge, dtype=float)[..., None]
+    sink = np.asarray(sink, dtype=float)[..., None]
+    triggerLength = np.asarray(triggerLength, dtype=float)[..., None]
+    weights = np.asarray(weights, dtype=float)
+
+    above = remap_array(factor, 1.0, 1.0 + triggerLength, 0.0, -sink * weights)
+    below = remap_array(factor, triggerLength, 1.0, bulge * weights, 0.0)
+    return np.where(factor >= 1.0, above, below)
+
+def offset_weights_array(positions):
+    # offset_weights for an array of follicle U positions
+    require_numpy()
+    u = np.clip(np.asarray(positions, dtype=float), OFFSET_KEYS[0], OFFSET_KEYS[-1])
+    end_slope = math.tan(math.radians(OFFSET_END_ANGLE))
+
+    first = u < OFFSET_KEYS[1]
+    t0 = np.where(first, OFFSET_KEYS[0], OFFSET_KEYS[1])
+    dt = np.where(first, OFFSET_KEYS[1] - OFFSET_KEYS[0], OFFSET_KEYS[2] - OFFSET_KEYS[1])
+    p0 = np.where(first, 0.0, 1.0)
+    p1 = np.where(first, 1.0, 0.0)
+    # the middle key is flat, the end keys have the 2.7 degree tangents
+    m0 = np.where(first, end_slope, 0.0)
+    m1 = np.where(first, 0.0, -end_slope)
+
+    return hermite(u, t0, t0 + dt, p0, p1, m0, m1)
@@ -0,0 +1,75 @@
+# Maya-free reader and writer for the json guide format, so pipeline tools can diff and
+# validate guide files without Maya. lib.export_guides/import_guides use it for .json paths.
+#
+# {"format": "VT_SimpleMuscle.guides", "version": 1, "guides": [
+#     {"name": "Bicep_L", "matrix": [16 world space floats], "end": "Bicep_L_End",
+#      "endTranslate": [x, y, z], "parent": "Arm_L", "numJoints": 3, "surfType": 0,
+#      "bulge": 0.0, "sink": 0.0, "triggerLength": 0.0}, ...]}
+import json
+
+FORMAT = 'VT_SimpleMuscle.guides'
+VERSION = 1
+
+# key: (type, default), keys without a default are required
+GUIDE_KEYS = {
+    'name': (str, None),
+    'matrix': (list, None),
+    'end': (str, None),
+    'endTranslate': (list, None),
+    'parent': (str, ''),
+    'numJoints': (int, 1),
+    'surfType': (int, 0),
+    'bulge': (float, 0.0),
+    'sink': (float, 0.0),
+    'triggerLength': (float, 0.0),
+}
+
+
+def write_guides(file_path, guides):
+    document = {'format': FORMAT, 'version': VERSION, 'guides': [validate_guide(g) for g in guides]}
+    with open(file_path, 'w') as json_file:
+        json.dump(document, json_file, indent=4, sort_keys=True)
+
+def read_guides(file_path):
+    with open(file_path, 'r') as json_file:
+        document = json.load(json_file)
+    return load_guides(document)
+
+def load_guides(document):
+    if not isinstance(document, dict) or document.get('format') != FORMAT:
+        raise ValueError(f'not a {FORMAT} document')
+    version = document.get('version', 0)
+    if not isinstance(version, int) or isinstance(version, bool):
+        raise ValueError(f'{FORMAT} version {version!r} should be an int')
+    if version > VERSION:
+        raise ValueError(f'{FORMAT} version {version} is newer than this tool reads ({VERSION})')
+    return [validate_guide(g) for g in document.get('guides', [])]
+
+def validate_guide(guide):
+    # returns a clean copy of a guide entry with defaults filled in, raises ValueError if it's bad
+    if not isinstance(guide, dict):
+        raise ValueError(f'guide entry {guide!r} is not an object')
+    clean = {}
+    for key, (value_type, default) in GUIDE_KEYS.items():
+        if key not in guide:
+            if default is None:
+                raise ValueError(f'guide {guide.get("name", "?")} is missing "{key}"')
+            clean[key] = default
+            continue
+        value = guide[key]
+        if value_type is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, value_type) or isinstance(value, bool):
+            raise ValueError(f'guide {guide.get("name", "?")} "{key}" should be a {value_type.__name__}')
+        clean[key] = value
+
+    for key, size in [('matrix', 16), ('endTranslate', 3)]:
+        if len(clean[key]) != size or not all(isinstance(v, (int, float)) and not isinstance(v, bool)
+                                              for v in clean[key]):
+            raise ValueError(f'guide {clean["name"]} "{key}" should be {size} numbers')
+        clean[key] = [float(v) for v in clean[key]]
+    if clean['surfType'] not in (0, 1):
+        raise ValueError(f'guide {clean["name"]} "surfType" should be 0 (Linear) or 1 (Cubic)')
+    if clean['numJoints'] < 0:
+        raise ValueError(f'guide {clean["name"]} "numJoints" should not be negative')
+    return clean
@@ -0,0 +1,59 @@
+# Maya-free storage for baked skin joint motion. A cache is one .npy file per character holding
+# a structured array with one record per sampled frame: the frame number and the local
+# translate and rotate (degrees) of every joint as float32, one field per joint. np.load with
+# mmap_mode only pages in the frames that get read, so a muscleCache node can look a frame up
+# without loading the file.
+try:
+    import numpy as np
+    from numpy.lib import recfunctions
+except ImportError:
+    np = None
+
+FORMAT = 'VT_SimpleMuscle.jointCache'
+CHANNELS = ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ']
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError('VT_SimpleMuscle joint caches need numpy')
+
+def cache_dtype(joints):
+    require_numpy()
+    return np.dtype([('frame', '<f8')] + [(joint, '<f4', (len(CHANNELS),)) for joint in joints])
+
+def create_cache(file_path, joints, frame_count):
+    # an empty cache opened for writing, fill it with write_frame
+    require_numpy()
+    if len(set(joints)) != len(joints):
+        raise ValueError(f'{file_path} joint names have to be unique')
+    return np.lib.format.open_memmap(file_path, mode='w+', dtype=cache_dtype(joints), shape=(frame_count,))
+
+def write_frame(cache, index, frame, values):
+    # values is one row of CHANNELS per joint, in the order the cache was created with
+    cache[index] = (frame,) + tuple(tuple(row) for row in values)
+
+def open_cache(file_path):
+    require_numpy()
+    cache = np.load(file_path, mmap_mode='r')
+    if cache.dtype.names is None or cache.dtype.names[0] != 'frame' or not len(cache):
+        raise ValueError(f'{file_path} is not a {FORMAT} file')
+    return cache
+
+def cache_joints(cache):
+    return list(cache.dtype.names[1:])
+
+def frame_index(cache, frame):
+    # the sample closest to frame, frames outside the cached range hold the first or last sample
+    frames = cache['frame']
+    index = int(np.searchsorted(frames, frame))
+    if index >= len(frames):
+        return len(frames) - 1
+    if index > 0 and frame - frames[index - 1] < frames[index] - frame:
+        return index - 1
+    return index
+
+def frame_values(cache, frame):
+    # (joints, CHANNELS) float array for the sample closest to frame
+    index = frame_index(cache, frame)
+    values = recfunctions.structured_to_unstructured(cache[index:index+1][cache_joints(cache)])
+    return values.reshape(-1, len(CHANNELS))
@@ -1,23 +1,59 @@
 import maya.cmds as cmds
 
+import VT_SimpleMuscle.axes as axes
+import VT_SimpleMuscle.factor_cache as factor_cache
+import VT_SimpleMuscle.flex as flex
+import VT_SimpleMuscle.guide_io as guide_io
+import VT_SimpleMuscle.joint_cache as joint_cache
+import VT_SimpleMuscle.profiler as profiler
+import VT_SimpleMuscle.push_io as push_io
+import VT_SimpleMuscle.rig_description as rig_description
+import VT_SimpleMuscle.sides as sides
+
+import contextlib
+import fnmatch
+import hashlib
 import json
-
-
-def setup(joints, num_joints=1, parent=None, bulge=None, sink=None, triggerLength=None, type=0):
+import os
+import sys
+import time
+
+
+@profiler.stage
+def setup(joints, num_joints=1, parent=None, bulge=None, sink=None, triggerLength=None, type=0, backend='cmds',
+          flex_network='per_joint'):
+    return setup_rig(joints, num_joints, parent, bulge, sink, triggerLength, type, backend, flex_network)[1]
+
+def setup_rig(joints, num_joints=1, parent=None, bulge=None, sink=None, triggerLength=None, type=0, backend='cmds',
+              flex_network='per_joint'):
+    # setup, returns (rig, def_joints). maya names the rig {joint}_rig1 and so on if the name is taken
+    if backend == 'api':
+        import VT_SimpleMuscle.api_builder as api_builder
+        api_builder.check_undo()
     rig=create_rig_hierarchy(joints[0])
-    curves=create_curves(joints)
     typeName = 'Linear'
     if type == 1:
         typeName = 'Cubic'
-    surface = create_surface(curves, joints[0], rig, typeName)
-
-    if '_R' in joints[0]:
-        right_side = True
+    if backend == 'api':
+        # make the surface straight from its CVs, no temporary curves, skinClusters or loft
+        import VT_SimpleMuscle.api_builder as api_builder
+        surface = api_builder.create_surface(joints, joints[0], rig, typeName)
     else:
-        right_side = False
-    def_joints = joints_on_surface(surface, joints[0], rig, num_joints, parent, right_side, bulge, sink, triggerLength)
-    return (def_joints)
+        curves=create_curves(joints)
+        surface = create_surface(curves, joints[0], rig, typeName)
+
+    right_side = sides.DEFAULT_RULES.side(joints[0]) == 'R'
+    if backend == 'api':
+        # plan the follicle and flex network and commit it with one MDagModifier
+        import VT_SimpleMuscle.api_builder as api_builder
+        def_joints = api_builder.joints_on_surface(surface, joints[0], rig, num_joints, parent, right_side, bulge, sink,
+                                                   triggerLength, flex_network)
+    else:
+        def_joints = joints_on_surface(surface, joints[0], rig, num_joints, parent, right_side, bulge, sink, triggerLength,
+                                       flex_network)
+    return (rig, def_joints)
 
+@profiler.stage
 def create_curves(joints, dir='Z', offsetPercentLength = 10):
     joint_positions = []
     curves = []
@@ -49,6 +85,7 @@ def get_chain_length(joints):
         if val != 0.0:
             return val
 
+@profiler.stage
 def create_surface(curves, name_base, rig, type='Linear'):
     if type == 'Linear':
         degree = 1
@@ -65,7 +102,7 @@ def create_surface(curves, name_base, rig, type='Linear'):
     cmds.setAttr(f'{shape}.dispOrigin', 1)
     cmds.setAttr(f'{shape}.normalsDisplayScale', 0.1)
 
-    if '_R' in name_base:
+    if sides.DEFAULT_RULES.side(name_base) == 'R':
         cmds.reverseSurface(surface, ch=False, rpo=True, d=3)
         cmds.reverseSurface(surface, ch=False, rpo=True, d=1)
         cmds.reverseSurface(surface, ch=False, rpo=True, d=3)
@@ -78,7 +115,9 @@ def create_surface(curves, name_base, rig, type='Linear'):
     cmds.parent(surface, rig)
     return(surface)
 
-def joints_on_surface(surface, base_name, rig, num_joints=1, parent=None, right_side=False, bulge=None, sink=None, triggerLength=None):
+@profiler.stage
+def joints_on_surface(surface, base_name, rig, num_joints=1, parent=None, right_side=False, bulge=None, sink=None, triggerLength=None,
+                      flex_network='per_joint'):
     section_size = 1/(num_joints+1)
     surfaceShape = cmds.listRelatives(surface, s=True)[0]
 
@@ -119,10 +158,11 @@ def joints_on_surface(surface, base_name, rig, num_joints=1, parent=None, right_
         if parent:
             cmds.setAttr(f'{skin_joints[i]}.parent', parent, type='string')
 
-    create_flex(surface, skin_joints, base_name, rig, follicle_shapes, bulge, sink, triggerLength)
+    create_flex(surface, skin_joints, base_name, rig, follicle_shapes, bulge, sink, triggerLength, flex_network)
     return(skin_joints)
 
-def create_flex(surface, joints, base_name, rig, follicleShapes, bulge, sink, triggerLength):
+@profiler.stage
+def create_flex(surface, joints, base_name, rig, follicleShapes, bulge, sink, triggerLength, flex_network='per_joint'):
     surfaceShape = cmds.listRelatives(surface, s=True)[0]
     arclength = cmds.createNode('arcLengthDimension', n=f'{base_name}_arcLength')
     arclengthTrans = cmds.listRelatives(arclength, p=True)[0]
@@ -182,7 +222,24 @@ def create_flex(surface, joints, base_name, rig, follicleShapes, bulge, sink, tr
     #drive offset on joints
     calculate_offset_factor(joints, follicleShapes, surface)
 
-    # use a remap value node and some math nodes to drive the muscle flex and stretch
+    # use remap value nodes and some math nodes to drive the muscle flex and stretch
+    if flex_network == 'shared':
+        create_shared_flex(surface, joints, base_name)
+    elif flex_network == 'node':
+        create_node_flex(surface, joints, base_name)
+    else:
+        create_per_joint_flex(surface, joints)
+
+    # add normalized driver value to drive corrective shapes with
+    cmds.addAttr(surface, ln='shapeDriver', at='float', h=False, k=True)
+    shape_remap = cmds.createNode('remapValue', n=f'{base_name}_shape_remap')
+    cmds.connectAttr(f'{surface}.triggerLength', f'{shape_remap}.inputMax')
+    cmds.setAttr(f'{shape_remap}.inputMin', 1.0)
+    cmds.connectAttr(f'{surface}.factor', f'{shape_remap}.inputValue')
+    cmds.connectAttr(f'{shape_remap}.outValue', f'{surface}.shapeDriver')
+
+def create_per_joint_flex(surface, joints):
+    # a private remap/condition chain for every joint
     for i in range(len(joints)):
 
         # above stretch factor of 1.0
@@ -232,33 +289,83 @@ def create_flex(surface, joints, base_name, rig, follicleShapes, bulge, sink, tr
         constraint = f'{joints[i]}_parentConstraint1'
         cmds.connectAttr(f'{condition}.outColorR', f'{constraint}.target[0].targetOffsetTranslateZ')
 
-    # add normalized driver value to drive corrective shapes with
-    cmds.addAttr(surface, ln='shapeDriver', at='float', h=False, k=True)
-    shape_remap = cmds.createNode('remapValue', n=f'{base_name}_shape_remap')
-    cmds.connectAttr(f'{surface}.triggerLength', f'{shape_remap}.inputMax')
-    cmds.setAttr(f'{shape_remap}.inputMin', 1.0)
-    cmds.connectAttr(f'{surface}.factor', f'{shape_remap}.inputValue')
-    cmds.connectAttr(f'{shape_remap}.outValue', f'{surface}.shapeDriver')
+def create_shared_flex(surface, joints, base_name):
+    # the same response as create_per_joint_flex with the terms that only depend on the surface
+    # attrs built once per muscle. remapAbove outputs 0 below a factor of 1.0 and remapBelow
+    # clamps to its outputMax above it, so chaining them replaces the condition node and the
+    # per joint weights are applied three joints at a time by multiplyDivide nodes
+    negSink = cmds.createNode('multDoubleLinear', n=f'{base_name}_negSink')
+    cmds.connectAttr(f'{surface}.sink', f'{negSink}.input1')
+    cmds.setAttr(f'{negSink}.input2', -1.0)
+
+    onePlusTrigger = cmds.createNode('addDoubleLinear', n=f'{base_name}_onePlusTrigger')
+    cmds.connectAttr(f'{surface}.triggerLength', f'{onePlusTrigger}.input1')
+    cmds.setAttr(f'{onePlusTrigger}.input2', 1.0)
+
+    # above stretch factor of 1.0
+    remapAbove = cmds.createNode('remapValue', n=f'{base_name}_remapAboveZero')
+    cmds.setAttr(f'{remapAbove}.inputMin', 1.0)
+    cmds.setAttr(f'{remapAbove}.outputMin', 0.0)
+    cmds.connectAttr(f'{onePlusTrigger}.output', f'{remapAbove}.inputMax')
+    cmds.connectAttr(f'{negSink}.output', f'{remapAbove}.outputMax')
+    cmds.connectAttr(f'{surface}.factor', f'{remapAbove}.inputValue')
+
+    # below a stretch factor of 1.0
+    remapBelow = cmds.createNode('remapValue', n=f'{base_name}_remapBelowZero')
+    cmds.setAttr(f'{remapBelow}.inputMax', 1.0)
+    cmds.connectAttr(f'{surface}.triggerLength', f'{remapBelow}.inputMin')
+    cmds.connectAttr(f'{surface}.bulge', f'{remapBelow}.outputMin')
+    cmds.connectAttr(f'{remapAbove}.outValue', f'{remapBelow}.outputMax')
+    cmds.connectAttr(f'{surface}.factor', f'{remapBelow}.inputValue')
+
+    for i, group in enumerate(shared_flex_groups(joints)):
+        weights = cmds.createNode('multiplyDivide', n=f'{base_name}_weights_{i+1}')
+        for axis, joint in zip(['X', 'Y', 'Z'], group):
+            cmds.connectAttr(f'{remapBelow}.outValue', f'{weights}.input1{axis}')
+            cmds.connectAttr(f'{surface}.{joint}', f'{weights}.input2{axis}')
+            cmds.connectAttr(f'{weights}.output{axis}', f'{joint}_parentConstraint1.target[0].targetOffsetTranslateZ')
+
+def create_node_flex(surface, joints, base_name):
+    # one muscleFlex plugin node evaluates the offsets for every joint of the muscle
+    load_flex_plugin()
+    flex_node = cmds.createNode('muscleFlex', n=f'{base_name}_muscleFlex')
+    for attr in ['factor', 'bulge', 'sink', 'triggerLength']:
+        cmds.connectAttr(f'{surface}.{attr}', f'{flex_node}.{attr}')
 
-def calculate_offset_factor(joints, follicles, surface):
-    curve = cmds.createNode('animCurveTA')
-    cmds.setKeyframe(curve, t=0, v=0, itt='spline', ott='spline')
-    cmds.setKeyframe(curve, t=0.5, v=1, itt='spline', ott='spline')
-    cmds.setKeyframe(curve, t=1.0, v=0, itt='spline', ott='spline')
-    cmds.keyTangent(curve, e=True, a=True, t=(0, 0), oa=2.7, ow=1.0)
-    cmds.keyTangent(curve, e=True, a=True, t=(1.0, 1.0), oa=-2.7, ow=1.0)
+    for i in range(len(joints)):
+        cmds.connectAttr(f'{surface}.{joints[i]}', f'{flex_node}.weight[{i}]')
+        cmds.connectAttr(f'{flex_node}.offset[{i}]', f'{joints[i]}_parentConstraint1.target[0].targetOffsetTranslateZ')
 
+def load_flex_plugin():
+    if not cmds.pluginInfo('muscleFlex', q=True, loaded=True):
+        cmds.loadPlugin(os.path.join(os.path.dirname(__file__), 'plugins', 'muscleFlex.py'), quiet=True)
+
+def load_cache_plugin():
+    if not cmds.pluginInfo('muscleCache', q=True, loaded=True):
+        cmds.loadPlugin(os.path.join(os.path.dirname(__file__), 'plugins', 'muscleCache.py'), quiet=True)
+
+def shared_flex_groups(joints):
+    # one multiplyDivide weights three joints
+    return [joints[i:i+3] for i in range(0, len(joints), 3)]
+
+@profiler.stage
+def calculate_offset_factor(joints, follicles, surface):
+    positions = [cmds.getAttr(f'{f}.parameterU') for f in follicles]
+    values = offset_factor_values(positions)
     for i in range(len(joints)):
-        position = cmds.getAttr(f'{follicles[i]}.parameterU')
-        calc_value = cmds.keyframe('animCurveTA1', q=True, ev=True, t=(position,position))[0]
-        cmds.addAttr(surface, ln=f'{joints[i]}', at='float', h=True, k=False, dv=calc_value)
+        cmds.addAttr(surface, ln=f'{joints[i]}', at='float', h=True, k=False, dv=values[i])
 
-    cmds.delete(curve)
+def offset_factor_values(positions):
+    # bell shaped weight along the muscle, 0 at the ends and 1 in the middle. Evaluated
+    # directly instead of keying and querying a temporary animCurveTA
+    return flex.offset_weights(positions)
 
+@profiler.stage
 def create_rig_hierarchy(base_name):
     rig=cmds.createNode('transform', n=f'{base_name}_rig')
     cmds.setAttr(f'{rig}.inheritsTransform', 0)
     cmds.addAttr(f'{rig}', ln='muscleRig', at='bool', k=False, h=True)
+    add_lod_attr(rig)
     return (rig)
 
 def create_muscle(muscle_name, parent, number_jnts, type='Linear'):
@@ -269,7 +376,9 @@ def create_muscle(muscle_name, parent, number_jnts, type='Linear'):
         cmds.error('you need to enter a valid parent in the "Set Muscle Rig Parent" text field')
         return ()
 
+    return create_guide(muscle_name, parent, number_jnts, type)
 
+def create_guide(muscle_name, parent, number_jnts, type='Linear', end_translate=(10, 0, 0)):
     jointA = cmds.createNode('joint', n=muscle_name)
     cmds.setAttr(f'{jointA}.radius', 2)
     cmds.setAttr(f'{jointA}.displayLocalAxis', True)
@@ -295,60 +404,112 @@ def create_muscle(muscle_name, parent, number_jnts, type='Linear'):
     jointB = cmds.createNode('joint', n=f'{muscle_name}_End')
     cmds.setAttr(f'{jointB}.radius', 2)
     cmds.parent(jointB, jointA)
-    cmds.setAttr(f'{jointB}.translateX', 10)
+    cmds.setAttr(f'{jointB}.translate', *end_translate)
 
     # lock and hide attrs on end bone
     for attr in ['.ty', '.tz', '.rx', '.ry', '.rz', '.sx', '.sy', '.sz', '.visibility', '.radius']:
         cmds.setAttr(f'{jointB}{attr}', k=False, cb=False, l=True)
-
-def mirror_guides():
-    to_mirror = []
+    return (jointA, jointB)
+
+def mirror_guides(index=None, rules=None):
+    index = get_scene_index(index)
+    rules = sides.get_rules(rules)
+    pairs = index.side_pairs('guides', rules)
+    for guide in get_guides_to_mirror(index, pairs):
+        mirror_guide(guide, pairs[guide], rules)
+
+    index.invalidate()
+
+def iter_mirror_guides(index=None, rules=None):
+    # mirror_guides one guide per step, yields (guides mirrored, total, guide)
+    index = get_scene_index(index)
+    rules = sides.get_rules(rules)
+    pairs = index.side_pairs('guides', rules)
+    to_mirror = get_guides_to_mirror(index, pairs)
+    try:
+        for i, guide in enumerate(to_mirror):
+            mirror_guide(guide, pairs[guide], rules)
+            yield i + 1, len(to_mirror), guide
+    finally:
+        index.invalidate()
+
+def get_guides_to_mirror(index, pairs):
+    # the selected left side guides, or all of them if nothing is selected
     selection = cmds.ls(sl=True)
     if selection:
-        for item in selection:
-            if check_for_attr(item, 'parent', 'joint'):
-                to_mirror.append(item)
+        return [g for g in index.filter(selection, 'guides') if g in pairs]
+    return list(pairs)
+
+def mirror_guide(guide, right_name, rules):
+    left_token, right_token = rules.tokens_for(guide)
+    right_guide = cmds.mirrorJoint(guide, sr=[left_token, right_token], myz=True, mb=True)[0]
+    # mirrorJoint replaces the token anywhere in the name, fix up names it got wrong
+    if right_guide != right_name:
+        right_guide = cmds.rename(right_guide, right_name)
+    for child, right_child in zip(cmds.listRelatives(guide, c=True, type='joint') or [],
+                                  cmds.listRelatives(right_guide, c=True, type='joint') or []):
+        if right_child != rules.mirror(child):
+            cmds.rename(f'{right_guide}|{right_child}', rules.mirror(child))
+
+    # mirror parent attr
+    parent_right = rules.mirror(cmds.getAttr(f'{guide}.parent'))
+    if cmds.objExists(parent_right):
+        cmds.setAttr(f'{right_guide}.parent', parent_right, type='string')
     else:
-        all_joints = cmds.ls(type='joint')
-        for joint in all_joints:
-            if '_L' or '_l' in joint and check_for_attr(joint, 'parent', 'joint'):
-                to_mirror.append(joint)
-
-    for guide in to_mirror:
-        if '_L' in guide:
-            right_guide = cmds.mirrorJoint(guide, sr =['_L','_R'], myz=True, mb=True)[0]
-        elif '_l' in guide:
-            right_guide = cmds.mirrorJoint(guide, sr=['_l', '_r'], myz=True, mb=True)[0]
-
-        # mirror parent attr
-        parent_left = cmds.getAttr(f'{guide}.parent')
-        if '_L' in guide:
-            parent_right = parent_left.replace('_L','_R')
-        elif '_l' in guide:
-            parent_right = parent_left.replace('_l', '_r')
-
-        if cmds.objExists(parent_right):
-            cmds.setAttr(f'{right_guide}.parent', parent_right, type='string')
-        else:
-            print(f"the right side parent for {right_guide} doesnt exist. Setting to nothing")
-            cmds.setAttr(f'{right_guide}.parent', '', type='string')
-
-def mirror_rig_settings():
-    objs = cmds.ls('*_surface')
-    to_mirror = []
-    for o in objs:
-
-        if '_L' in o and check_for_attr(o, 'bulge'):
-            to_mirror.append(o)
-
-    for surface in to_mirror:
-        bulge = cmds.getAttr(f'{surface}.bulge')
-        sink = cmds.getAttr(f'{surface}.sink')
-        triggerLength = cmds.getAttr(f'{surface}.triggerLength')
-        right_surface = surface.replace('_L', '_R')
-        cmds.setAttr(f'{right_surface}.bulge', bulge)
-        cmds.setAttr(f'{right_surface}.sink', sink)
-        cmds.setAttr(f'{right_surface}.triggerLength', triggerLength)
+        print(f"the right side parent for {right_guide} doesnt exist. Setting to nothing")
+        cmds.setAttr(f'{right_guide}.parent', '', type='string')
+
+def mirror_rig_settings(index=None, rules=None, attrs=None, undoable=True):
+    # copy the surface settings of every left side muscle rig to its right side rig, the guides
+    # don't have to exist anymore
+    index = get_scene_index(index)
+    pairs = [(get_muscle_surface(rig), get_muscle_surface(right_rig))
+             for rig, right_rig in index.side_pairs('rigs', rules).items()]
+    report = sync_surface_settings(pairs, attrs, undoable=undoable)
+    for source, target, reason in report['unmatched']:
+        print(f'{source} settings were not mirrored to {target}: {reason}')
+    return report
+
+def sync_surface_settings(pairs, attrs=None, scale=None, undoable=True):
+    # copy attrs from source to target for every (source, target) node pair in one sweep, reading
+    # every plug through the api. scale is an optional {attr: multiplier}. With undoable=False
+    # the writes go through one MDGModifier, which is faster but can't be undone
+    import maya.api.OpenMaya as om
+    attrs = attrs or ['bulge', 'sink', 'triggerLength']
+    scale = scale or {}
+    report = {'synced': [], 'unmatched': []}
+
+    existing = set(cmds.ls([n for pair in pairs for n in pair]) or [])
+    selection = om.MSelectionList()
+    nodes = {}
+    for name in existing:
+        selection.add(name)
+        nodes[name] = om.MFnDependencyNode(selection.getDependNode(selection.length()-1))
+
+    writes = []
+    for source, target in pairs:
+        missing = [n for n in (source, target) if n not in existing]
+        if missing:
+            report['unmatched'].append((source, target, f"{', '.join(missing)} not found"))
+            continue
+        missing = [a for a in attrs if not (nodes[source].hasAttribute(a) and nodes[target].hasAttribute(a))]
+        if missing:
+            report['unmatched'].append((source, target, f"missing {', '.join(missing)}"))
+            continue
+        for attr in attrs:
+            value = nodes[source].findPlug(attr, False).asDouble()*scale.get(attr, 1.0)
+            writes.append((target, attr, value))
+        report['synced'].append((source, target))
+
+    if undoable:
+        for target, attr, value in writes:
+            cmds.setAttr(f'{target}.{attr}', value)
+    else:
+        modifier = om.MDGModifier()
+        for target, attr, value in writes:
+            modifier.newPlugValueDouble(nodes[target].findPlug(attr, False), value)
+        modifier.doIt()
+    return report
 
 def check_for_attr(toCheck, attr, type=None):
     attrs = cmds.listAttr(toCheck, ud=True)
@@ -364,6 +525,297 @@ def check_for_attr(toCheck, attr, type=None):
     else:
         return False
 
+class MuscleSceneIndex(object):
+    # classifies every node the tool creates with two batched ls calls instead of
+    # calling check_for_attr on every joint in the scene.
+    # category: (node type, custom attrs the node must have)
+    categories = {
+        'guides': ('joint', ('parent', 'numJoints')),
+        'rigs': ('transform', ('muscleRig',)),
+        'skin_joints': ('joint', ('isMuscleJoint',)),
+        'push_bases': ('joint', ('drvStart', 'drvEnd')),
+    }
+
+    def __init__(self):
+        # {category: {node: None}}, dicts keep the scene order and make removing a node cheap
+        self._nodes = {}
+        self._pairs = {}
+        self._dirty = True
+
+    def invalidate(self):
+        # call after anything that creates, deletes, renames or reparents rig nodes
+        self._dirty = True
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    def refresh(self):
+        # one ls for every node.attr match in all namespaces, one ls for their types
+        self._nodes = dict((category, {}) for category in self.categories)
+        self._pairs = {}
+        for node, categories in self.classify([f'*.{a}' for a in self.required_attrs()], r=True).items():
+            for category in categories:
+                self._nodes[category][node] = None
+        self._dirty = False
+        return self
+
+    def required_attrs(self):
+        attrs = set()
+        for node_type, required in self.categories.values():
+            attrs.update(required)
+        return sorted(attrs)
+
+    def classify(self, patterns, **kwargs):
+        # {node: [categories]} for the nodes with any of the custom attrs that match patterns
+        plugs = cmds.ls(patterns, **kwargs) or []
+        node_attrs = {}
+        for plug in plugs:
+            node, attr = plug.rsplit('.', 1)
+            node_attrs.setdefault(node, set()).add(attr)
+
+        node_types = {}
+        if node_attrs:
+            typed = cmds.ls(list(node_attrs), showType=True) or []
+            node_types = dict(zip(typed[::2], typed[1::2]))
+
+        return dict((node, [category for category, (node_type, required) in self.categories.items()
+                            if node_types.get(node) == node_type and attrs.issuperset(required)])
+                    for node, attrs in node_attrs.items())
+
+    def update_nodes(self, nodes):
+        # reclassify just these nodes instead of the whole scene, returns the (category, node)
+        # pairs that were added and removed
+        if self._dirty:
+            self.refresh()
+        existing = cmds.ls(nodes) or []
+        classified = {}
+        if existing:
+            classified = self.classify([f'{n}.{a}' for n in existing for a in self.required_attrs()])
+        added = []
+        removed = []
+        for node in nodes:
+            categories = classified.get(node, [])
+            for category, members in self._nodes.items():
+                if category in categories and node not in members:
+                    members[node] = None
+                    added.append((category, node))
+                elif category not in categories and node in members:
+                    del members[node]
+                    removed.append((category, node))
+        if added or removed:
+            self._pairs = {}
+        return added, removed
+
+    def remove_nodes(self, nodes):
+        # forget deleted nodes, returns the (category, node) pairs that were removed
+        removed = []
+        for category, members in self._nodes.items():
+            for node in nodes:
+                if node in members:
+                    del members[node]
+                    removed.append((category, node))
+        if removed:
+            self._pairs = {}
+        return removed
+
+    def categories_of(self, node):
+        if self._dirty:
+            self.refresh()
+        return [category for category, members in self._nodes.items() if node in members]
+
+    def get(self, category):
+        if self._dirty:
+            self.refresh()
+        return list(self._nodes[category])
+
+    def filter(self, nodes, category):
+        # keep the nodes that belong to a category, in the order given
+        if self._dirty:
+            self.refresh()
+        return [n for n in nodes if n in self._nodes[category]]
+
+    def is_a(self, node, category):
+        if self._dirty:
+            self.refresh()
+        return node in self._nodes[category]
+
+    def side_pairs(self, category, rules=None):
+        # {left node: right node name} for a category, worked out once per refresh
+        rules = sides.get_rules(rules)
+        if self._dirty:
+            self.refresh()
+        key = (category, id(rules))
+        if key not in self._pairs:
+            self._pairs[key] = rules.pair_map(list(self._nodes[category]))
+        return self._pairs[key]
+
+    @property
+    def guides(self):
+        return self.get('guides')
+
+    @property
+    def rigs(self):
+        return self.get('rigs')
+
+    @property
+    def skin_joints(self):
+        return self.get('skin_joints')
+
+    @property
+    def push_bases(self):
+        return self.get('push_bases')
+
+def get_scene_index(index=None):
+    # functions take an optional index so the UI can share one between operations
+    if index is None:
+        return MuscleSceneIndex()
+    return index
+
+class MuscleSceneWatcher(object):
+    # keeps its own MuscleSceneIndex up to date from OpenMaya callbacks instead of rescanning the
+    # scene. The callbacks only remember which joints and transforms were added, removed, renamed
+    # or had an attr set, flush() then classifies just those with a couple of batched queries.
+    # Call flush when Maya is idle, eg from a UI timer
+    node_types = ['joint', 'transform']
+    # attrs shown for each category, changes to them are reported by flush
+    key_attrs = {
+        'guides': ['numJoints', 'surfType', 'parent'],
+        'rigs': ['lod'],
+        'skin_joints': ['parent'],
+        'push_bases': ['joint', 'drvStart', 'drvEnd'],
+    }
+    enum_attrs = ['surfType', 'lod']
+
+    def __init__(self):
+        self.index = MuscleSceneIndex()
+        self._callbacks = []
+        # per node attr callbacks of the guides, rigs and push bases, by MObjectHandle hash
+        self._attr_callbacks = {}
+        self._pending = []
+        self._changed = []
+        self._removed = set()
+        self._reset = True
+
+    def start(self):
+        import maya.api.OpenMaya as om
+        self.stop()
+        for node_type in self.node_types:
+            self._callbacks.append(om.MDGMessage.addNodeAddedCallback(self._node_added, node_type))
+            self._callbacks.append(om.MDGMessage.addNodeRemovedCallback(self._node_removed, node_type))
+        self._callbacks.append(om.MNodeMessage.addNameChangedCallback(om.MObject(), self._name_changed))
+        for event in ['SceneOpened', 'NewSceneOpened']:
+            self._callbacks.append(om.MEventMessage.addEventCallback(event, self._scene_reset))
+        self.reset()
+
+    def stop(self):
+        import maya.api.OpenMaya as om
+        for callback in self._callbacks + list(self._attr_callbacks.values()):
+            om.MMessage.removeCallback(callback)
+        self._callbacks = []
+        self._attr_callbacks = {}
+
+    def reset(self):
+        # the next flush reads the whole scene again
+        self._reset = True
+
+    @property
+    def has_changes(self):
+        return bool(self._reset or self._pending or self._changed or self._removed)
+
+    ######################################
+    # callbacks, only record what happened
+
+    def _node_added(self, node, *args):
+        import maya.api.OpenMaya as om
+        # the name and custom attrs aren't final until the command that made the node is done
+        self._pending.append(om.MObjectHandle(node))
+
+    def _node_removed(self, node, *args):
+        self._removed.add(node_name(node))
+
+    def _name_changed(self, node, previous_name, *args):
+        import maya.api.OpenMaya as om
+        if not node.hasFn(om.MFn.kTransform) or not previous_name:
+            return
+        self._removed.add(previous_name)
+        self._pending.append(om.MObjectHandle(node))
+
+    def _attr_changed(self, message, plug, other_plug, *args):
+        import maya.api.OpenMaya as om
+        if message & om.MNodeMessage.kAttributeSet or message & om.MNodeMessage.kConnectionMade:
+            self._changed.append(om.MObjectHandle(plug.node()))
+
+    def _scene_reset(self, *args):
+        self.reset()
+
+    ######################################
+
+    def flush(self):
+        # apply what the callbacks recorded to the index. Returns {'reset': bool, 'added': [...],
+        # 'removed': [...], 'changed': [...]} with (category, node) pairs, after a reset every
+        # node should be read from the index again
+        changes = {'reset': False, 'added': [], 'removed': [], 'changed': []}
+        if self._reset:
+            self._pending = []
+            self._changed = []
+            self._removed = set()
+            self._reset = False
+            self.index.refresh()
+            self._watch_attrs([(c, n) for c in self.key_attrs for n in self.index.get(c)], reset=True)
+            changes['reset'] = True
+            return changes
+
+        pending = set(node_name(h.object()) for h in self._pending if h.isValid())
+        changed = set(node_name(h.object()) for h in self._changed if h.isValid())
+        removed = self._removed - pending
+        self._pending = []
+        self._changed = []
+        self._removed = set()
+
+        changes['removed'] = self.index.remove_nodes(removed)
+        if pending:
+            added, reclassified = self.index.update_nodes(sorted(pending))
+            changes['added'] = added
+            changes['removed'].extend(reclassified)
+        changes['changed'] = [(c, n) for n in sorted(changed - pending) for c in self.index.categories_of(n)]
+        self._watch_attrs(changes['added'])
+        return changes
+
+    def _watch_attrs(self, nodes, reset=False):
+        # attr changed callbacks on the nodes whose key attrs are shown, skin joints are left out,
+        # there can be thousands and their only key attr is set when they are built
+        import maya.api.OpenMaya as om
+        if reset:
+            for callback in self._attr_callbacks.values():
+                om.MMessage.removeCallback(callback)
+            self._attr_callbacks = {}
+        selection = om.MSelectionList()
+        for category, node in nodes:
+            if category == 'skin_joints':
+                continue
+            selection.add(node)
+        for i in range(selection.length()):
+            node = selection.getDependNode(i)
+            key = om.MObjectHandle(node).hashCode()
+            if key not in self._attr_callbacks:
+                self._attr_callbacks[key] = om.MNodeMessage.addAttributeChangedCallback(node, self._attr_changed)
+
+    def get_key_attrs(self, category, node):
+        # [(attr, value)] to show for a node, enums as their names
+        values = []
+        for attr in self.key_attrs[category]:
+            if cmds.objExists(f'{node}.{attr}'):
+                values.append((attr, cmds.getAttr(f'{node}.{attr}', asString=attr in self.enum_attrs)))
+        return values
+
+def node_name(node):
+    # the name the index uses for an MObject, the shortest unique path for dag nodes
+    import maya.api.OpenMaya as om
+    if node.hasFn(om.MFn.kDagNode):
+        return om.MDagPath.getAPathTo(node).partialPathName()
+    return om.MFnDependencyNode(node).name()
+
 def create_scale_reader():
     reader = 'Scale_Constrain_To_Rig'
     # check if one exists
@@ -373,111 +825,692 @@ def create_scale_reader():
         cmds.createNode('transform', n=reader)
         return (reader)
 
-def select_def_joints():
-    all_joints = cmds.ls(type='joint')
-    def_joints = []
-    for joint in all_joints:
-        if check_for_attr(joint, 'isMuscleJoint'):
-            def_joints.append(joint)
-    cmds.select(def_joints)
-
-def parent_def_joints():
-    all_joints = cmds.ls(type='joint')
-    for joint in all_joints:
-        if check_for_attr(joint, 'isMuscleJoint'):
-            try:
-                parent = cmds.getAttr(f'{joint}.parent')
-                cmds.parent(joint, parent)
-            except:
-                print(f'{joint} either has no parent set or is already a child of the parent')
-
-def unparent_def_joints():
-    all_joints = cmds.ls(type='joint')
-    for joint in all_joints:
-        if check_for_attr(joint, 'isMuscleJoint', 'joint'):
-            try:
-                cmds.parent(joint, w=True)
-            except:
-                print(f'{joint} is already a child of the world')
-
-def build_all_rigs():
-    # either builds on selected joints only or all joints
+def select_def_joints(index=None):
+    index = get_scene_index(index)
+    cmds.select(index.skin_joints)
+
+def parent_def_joints(index=None):
+    index = get_scene_index(index)
+    for joint in index.skin_joints:
+        try:
+            parent = cmds.getAttr(f'{joint}.parent')
+            cmds.parent(joint, parent)
+        except:
+            print(f'{joint} either has no parent set or is already a child of the parent')
+    # reparenting changes the dag paths of non unique names
+    index.invalidate()
+
+def unparent_def_joints(index=None):
+    index = get_scene_index(index)
+    for joint in index.skin_joints:
+        try:
+            cmds.parent(joint, w=True)
+        except:
+            print(f'{joint} is already a child of the world')
+    index.invalidate()
+
+def build_all_rigs(index=None, batch=True, backend='cmds', flex_network='per_joint', profile=True, skip_built=False):
+    # skip_built leaves guides that already have a {guide}_rig alone instead of building another
+    index = get_scene_index(index)
+    guides = get_guides_to_build(index, skip_built)
+
+    # per stage timings, command and node counts end up in get_build_report()
+    build_profiler = profiler.BuildProfiler(get_profiled_modules(backend)) if profile else None
+    with batch_build('VT_SimpleMuscle build_all_rigs', enabled=batch), profiler.profiling(build_profiler):
+        timings = list(iter_build_rigs(guides, backend, flex_network, build_profiler))
+
+    index.invalidate()
+    print_build_timings(timings)
+    return timings
+
+def iter_build_all_rigs(index=None, backend='cmds', flex_network='per_joint', profile=True, skip_built=False):
+    # build_all_rigs one muscle per step, yields (muscles built, total, guide) so the UI can
+    # show progress and stop between muscles. Run it inside one batch_build, like the UI's
+    # ProgressDialog does
+    index = get_scene_index(index)
+    guides = get_guides_to_build(index, skip_built)
+    build_profiler = profiler.BuildProfiler(get_profiled_modules(backend)) if profile else None
+    timings = []
+    try:
+        for joint, seconds in iter_build_rigs(guides, backend, flex_network, build_profiler):
+            timings.append((joint, seconds))
+            yield len(timings), len(guides), joint
+    finally:
+        index.invalidate()
+        print_build_timings(timings)
+
+def get_guides_to_build(index, skip_built=False):
+    # either builds on selected guides only or all guides
     selection = cmds.ls(sl=True, type='joint')
     if len(selection) == 0:
-        all_joints = cmds.ls(type='joint')
+        guides = index.guides
     else:
-        all_joints = selection
-
-    for joint in all_joints:
-        if check_for_attr(joint, 'parent'):
-            parent = cmds.getAttr(f'{joint}.parent')
-            num_joints = cmds.getAttr(f'{joint}.numJoints')
-            end_joint = cmds.listRelatives(joint, c=True)[0]
-
-            bulge = cmds.getAttr(f'{joint}.bulge')
-            sink = cmds.getAttr(f'{joint}.sink')
-            triggerLength = cmds.getAttr(f'{joint}.triggerLength')
-            type = cmds.getAttr(f'{joint}.surfType')
+        guides = index.filter(selection, 'guides')
+    if not skip_built:
+        return guides
+    to_build = []
+    for joint in guides:
+        if cmds.objExists(f'{joint}_rig'):
+            cmds.warning(f'{joint}_rig already exists skipping')
+            continue
+        to_build.append(joint)
+    return to_build
+
+def iter_build_rigs(guides, backend='cmds', flex_network='per_joint', build_profiler=None):
+    # build the guides one at a time, yields (guide, seconds). Every muscle is profiled on its own
+    # unless the caller already opened a profiler, the caller owns the batch_build
+    for joint in guides:
+        start = time.perf_counter()
+        with profiler.profiling(build_profiler):
+            with profiler.muscle(joint):
+                build_guide(joint, backend, flex_network)
+        yield joint, time.perf_counter() - start
+
+def get_profiled_modules(backend='cmds'):
+    modules = [sys.modules[__name__]]
+    if backend == 'api':
+        import VT_SimpleMuscle.api_builder as api_builder
+        modules.append(api_builder)
+    return modules
+
+def get_build_report():
+    # the stage report of the last profiled build_all_rigs, or None
+    return profiler.last_report
+
+def build_guide(joint, backend='cmds', flex_network='per_joint'):
+    parent = cmds.getAttr(f'{joint}.parent')
+    num_joints = cmds.getAttr(f'{joint}.numJoints')
+    end_joint = cmds.listRelatives(joint, c=True)[0]
+
+    bulge = cmds.getAttr(f'{joint}.bulge')
+    sink = cmds.getAttr(f'{joint}.sink')
+    triggerLength = cmds.getAttr(f'{joint}.triggerLength')
+    type = cmds.getAttr(f'{joint}.surfType')
+
+    if triggerLength == 0.0:
+        rig, def_joints = setup_rig([joint,end_joint], num_joints, parent, None, None, None, type=type, backend=backend,
+                                    flex_network=flex_network)
+    else:
+        rig, def_joints = setup_rig([joint, end_joint], num_joints, parent, bulge, sink, triggerLength, type=type,
+                                    backend=backend, flex_network=flex_network)
+
+    for j in def_joints:
+        try:
+            cmds.parent(j, parent)
+        except:
+            print(f"The parent for {j} named {parent} wasn't found. Rig was not parented")
+
+    # remember what the rig was built from so rebuild_changed_rigs can skip it
+    cmds.addAttr(rig, ln='guideHash', dt='string', h=True)
+    cmds.setAttr(f'{rig}.guideHash', guide_hash(joint), type='string')
+    return def_joints
+
+def guide_hash(joint):
+    # hash of everything the build reads from a guide
+    end_joint = cmds.listRelatives(joint, c=True)[0]
+    data = [[round(v, 5) for v in cmds.xform(joint, q=True, m=True, ws=True)],
+            [round(v, 5) for v in cmds.xform(end_joint, q=True, m=True, ws=True)]]
+    for attr in ['numJoints', 'surfType', 'bulge', 'sink', 'triggerLength']:
+        data.append(round(cmds.getAttr(f'{joint}.{attr}'), 5))
+    data.append(cmds.getAttr(f'{joint}.parent'))
+    return hashlib.sha1(json.dumps(data).encode('utf-8')).hexdigest()
+
+def rebuild_changed_rigs(index=None, batch=True, backend='cmds', flex_network='per_joint'):
+    # rebuild only the rigs whose guides changed since they were built, and build new guides
+    index = get_scene_index(index)
+    to_build = []
+    for joint in index.guides:
+        rig = f'{joint}_rig'
+        if not cmds.objExists(rig):
+            to_build.append(joint)
+        elif not cmds.attributeQuery('guideHash', n=rig, ex=True) or \
+                cmds.getAttr(f'{rig}.guideHash') != guide_hash(joint):
+            to_build.append(joint)
+
+    timings = []
+    with batch_build('VT_SimpleMuscle rebuild_changed_rigs', enabled=batch):
+        for joint in to_build:
+            start = time.perf_counter()
+            delete_rig(joint, index)
+            build_guide(joint, backend, flex_network)
+            timings.append((joint, time.perf_counter() - start))
+
+    index.invalidate()
+    print_build_timings(timings)
+    return timings
+
+def delete_rig(joint, index=None):
+    # delete the rig and skin joints built from one guide
+    index = get_scene_index(index)
+    rig = f'{joint}_rig'
+    if cmds.objExists(rig):
+        cmds.delete(rig)
+    prefix = f'{joint}_'
+    for skin_joint in index.skin_joints:
+        name = skin_joint.split('|')[-1]
+        if name.startswith(prefix) and name.endswith('_skin_jnt') and name[len(prefix):-len('_skin_jnt')].isdigit():
+            if cmds.objExists(skin_joint):
+                cmds.delete(skin_joint)
+
+# set while a batch_build block is running
+_in_batch_build = False
+
+@contextlib.contextmanager
+def batch_build(chunk_name='VT_SimpleMuscle build', enabled=True):
+    # record the whole build as one undo chunk and stop the viewport from redrawing and
+    # the evaluation manager from rebuilding its graph after every node that gets created.
+    # A batch_build inside another one does nothing
+    global _in_batch_build
+    if not enabled or _in_batch_build:
+        yield
+        return
 
-            if triggerLength == 0.0:
-                def_joints = setup([joint,end_joint], num_joints, parent, None, None, None, type=type)
-            else:
-                def_joints = setup([joint, end_joint], num_joints, parent, bulge, sink, triggerLength, type=type)
-
-            for j in def_joints:
-                try:
-                    cmds.parent(j, parent)
-                except:
-                    print(f"The parent for {j} named {parent} wasn't found. Rig was not parented")
-
-def delete_all_rigs():
-    all_transforms = cmds.ls(type='transform')
-    for t in all_transforms:
-        if cmds.objExists(t) and check_for_attr(t, 'muscleRig'):
+    cmds.undoInfo(openChunk=True, chunkName=chunk_name)
+    cmds.refresh(suspend=True)
+    em_mode = cmds.evaluationManager(q=True, mode=True)[0]
+    cmds.evaluationManager(mode='off')
+    _in_batch_build = True
+    try:
+        yield
+    finally:
+        cmds.evaluationManager(mode=em_mode)
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+        cmds.refresh(force=True)
+        _in_batch_build = False
+
+def print_build_timings(timings):
+    if not timings:
+        return
+    total = 0.0
+    for guide, seconds in timings:
+        total += seconds
+        print(f'{guide}: {seconds:.3f}s')
+    print(f'built {len(timings)} muscle rigs in {total:.3f}s')
+
+def iter_delete_all_rigs(index=None):
+    # delete_all_rigs one muscle per step, yields (rigs deleted, total, rig). Run it inside one
+    # batch_build
+    index = get_scene_index(index)
+    rigs = index.rigs
+    try:
+        for i, rig in enumerate(rigs):
+            delete_rig(rig[:-len('_rig')], index)
+            yield i + 1, len(rigs), rig
+        # skin joints whose rigs are already gone
+        for joint in index.skin_joints:
+            if cmds.objExists(joint):
+                cmds.delete(joint)
+    finally:
+        index.invalidate()
+
+def delete_all_rigs(index=None):
+    index = get_scene_index(index)
+    for t in index.rigs:
+        if cmds.objExists(t):
             cmds.delete(t)
-    all_joints = cmds.ls(type='joint')
-    for joint in all_joints:
-        if check_for_attr(joint, 'isMuscleJoint', 'joint'):
+    for joint in index.skin_joints:
+        if cmds.objExists(joint):
             cmds.delete(joint)
+    index.invalidate()
     return ()
 
-def export_guides(file_path):
-    to_export = []
-    all_joints = cmds.ls(type='joint')
-    for joint in all_joints:
-        if check_for_attr(joint, 'parent', 'joint') and check_for_attr(joint, 'numJoints', 'joint'):
-            to_export.append(joint)
+# utility node types the flex networks are built from
+FLEX_NODE_TYPES = ['remapValue', 'plusMinusAverage', 'multDoubleLinear', 'addDoubleLinear', 'condition',
+                   'multiplyDivide', 'muscleFlex', 'unitConversion']
+
+def get_rig_nodes(rig):
+    # {category: nodes} for everything one muscle rig evaluates
+    surface = f"{rig[:-len('_rig')]}_surface"
+    descendants = cmds.listRelatives(rig, ad=True) or []
+    constraints = cmds.ls(descendants, type='parentConstraint') or []
+    return {
+        'follicles': cmds.ls(descendants, type='follicle') or [],
+        'arcLengths': cmds.ls(descendants, type='arcLengthDimension') or [],
+        'constraints': constraints,
+        'flex': get_flex_nodes(surface) if cmds.objExists(surface) else [],
+        # constraints are named after the skin joint they drive, in build order
+        'skin_joints': sorted([c.rsplit('_parentConstraint', 1)[0] for c in constraints
+                               if cmds.objExists(c.rsplit('_parentConstraint', 1)[0])], key=skin_joint_number),
+    }
+
+def skin_joint_number(skin_joint):
+    # 3 for Bicep_L_3_skin_jnt
+    number = skin_joint.split('|')[-1][:-len('_skin_jnt')].rsplit('_', 1)[-1]
+    return int(number) if number.isdigit() else 0
+
+def get_flex_nodes(surface):
+    # the utility nodes connected to the surface, through other utility nodes
+    found = []
+    seen = set([surface])
+    to_visit = [surface]
+    while to_visit:
+        connected = [n for n in set(cmds.listConnections(to_visit.pop()) or []) if n not in seen]
+        seen.update(connected)
+        if connected:
+            flex_nodes = cmds.ls(connected, type=FLEX_NODE_TYPES) or []
+            found.extend(flex_nodes)
+            to_visit.extend(flex_nodes)
+    return found
+
+@contextlib.contextmanager
+def frozen_nodes(nodes, state=1):
+    # set nodeState on nodes for the block, 1 is hasNoEffect
+    states = [(n, cmds.getAttr(f'{n}.nodeState')) for n in nodes]
+    try:
+        for node in nodes:
+            cmds.setAttr(f'{node}.nodeState', state)
+        yield
+    finally:
+        for node, node_state in states:
+            cmds.setAttr(f'{node}.nodeState', node_state)
+
+def get_frames(start=None, end=None, step=1):
+    # the frames from start to end, defaults to the playback range
+    if start is None:
+        start = cmds.playbackOptions(q=True, min=True)
+    if end is None:
+        end = cmds.playbackOptions(q=True, max=True)
+    frames = []
+    frame = start
+    while frame <= end:
+        frames.append(frame)
+        frame += step
+    return frames
+
+def time_rig_evaluation(skin_joints, frames):
+    # pull every skin joint's matrix through the graph at each frame
+    start = time.perf_counter()
+    for frame in frames:
+        cmds.currentTime(frame, update=False)
+        for joint in skin_joints:
+            cmds.getAttr(f'{joint}.worldMatrix[0]')
+    return time.perf_counter() - start
+
+def analyze_rig_costs(index=None, start=None, end=None, step=1, evaluate=True):
+    # node counts and evaluation time of every muscle rig, most expensive first. A rig's time is
+    # how much longer its skin joints take to evaluate over the frame range with the rig on than
+    # with its nodes set to hasNoEffect
+    index = get_scene_index(index)
+    frames = get_frames(start, end, step)
+
+    costs = []
+    current_time = cmds.currentTime(q=True)
+    # time with the user's evaluation manager mode and outside an undo chunk, only the viewport
+    # redraw is left out. frozen_nodes puts every nodeState back, with the undo queue off so the
+    # toggles don't end up in it
+    undo_state = cmds.undoInfo(q=True, state=True)
+    cmds.undoInfo(stateWithoutFlush=False)
+    cmds.refresh(suspend=True)
+    try:
+        for rig in index.rigs:
+            nodes = get_rig_nodes(rig)
+            evaluated = nodes['follicles'] + nodes['arcLengths'] + nodes['constraints'] + nodes['flex']
+            cost = {'muscle': rig[:-len('_rig')], 'rig': rig, 'nodes': len(evaluated), 'seconds': None,
+                    'ms_per_frame': None}
+            for category in ['follicles', 'arcLengths', 'constraints', 'flex', 'skin_joints']:
+                cost[category] = len(nodes[category])
+
+            if evaluate and frames and nodes['skin_joints']:
+                enabled = time_rig_evaluation(nodes['skin_joints'], frames)
+                with frozen_nodes(evaluated):
+                    disabled = time_rig_evaluation(nodes['skin_joints'], frames)
+                cost['seconds'] = max(enabled - disabled, 0.0)
+                cost['ms_per_frame'] = cost['seconds'] / len(frames) * 1000.0
+            costs.append(cost)
+    finally:
+        cmds.currentTime(current_time, update=False)
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(stateWithoutFlush=undo_state)
+
+    costs = profiler.sort_costs(costs)
+    print(profiler.cost_table(costs))
+    return costs
+
+LOD_LEVELS = ['full', 'reduced', 'off']
+
+def add_lod_attr(rig):
+    if not cmds.objExists(f'{rig}.lod'):
+        cmds.addAttr(rig, ln='lod', at='enum', en=':'.join(LOD_LEVELS), h=False, k=False)
+        cmds.setAttr(f'{rig}.lod', cb=True)
+
+def set_muscle_lod(level, filter=None, index=None):
+    # switch muscle rigs to a level of detail. filter is a name pattern like '*_L', a list of
+    # guide or rig names, or None for every rig. Returns the rigs that were switched
+    index = get_scene_index(index)
+    rigs = filter_rigs(index.rigs, filter)
+    with batch_build('VT_SimpleMuscle set_muscle_lod'):
+        for rig in rigs:
+            set_rig_lod(rig, level)
+    return rigs
+
+def filter_rigs(rigs, filter=None):
+    if filter is None:
+        return list(rigs)
+    if isinstance(filter, str):
+        return [r for r in rigs if fnmatch.fnmatchcase(r, filter) or fnmatch.fnmatchcase(r[:-len('_rig')], filter)]
+    names = set(n.split('|')[-1] for n in filter)
+    return [r for r in rigs if r in names or r[:-len('_rig')] in names]
+
+def set_rig_lod(rig, level):
+    # full evaluates everything. reduced bypasses the flex network and freezes every other skin
+    # joint, keeping the first and last. off freezes the whole rig. Frozen nodes are set to
+    # hasNoEffect and every skin joint is put back to its rest offset first, so frozen joints
+    # hold their rest offset and follow their parent joint
+    level = LOD_LEVELS.index(level) if isinstance(level, str) else int(level)
+    nodes = get_rig_nodes(rig)
+    muscle = rig[:-len('_rig')]
+    set_rest_offsets(nodes['skin_joints'], level > 0)
+
+    frozen = set()
+    if level == 2:
+        frozen.update(nodes['follicles'] + nodes['arcLengths'] + nodes['constraints'] + nodes['flex'])
+    elif level == 1:
+        frozen.update(nodes['arcLengths'] + nodes['flex'])
+        for skin_joint in nodes['skin_joints'][1:-1:2]:
+            frozen.add(f'{skin_joint}_parentConstraint1')
+            frozen.add(f'{muscle}_follicle_{skin_joint_number(skin_joint)}')
+
+    for node in nodes['follicles'] + nodes['arcLengths'] + nodes['constraints'] + nodes['flex']:
+        cmds.setAttr(f'{node}.nodeState', 1 if node in frozen else 0)
+
+    add_lod_attr(rig)
+    cmds.setAttr(f'{rig}.lod', level)
+
+def set_rest_offsets(skin_joints, rest=True):
+    # rest disconnects the flex network from each skin joint's constraint offset and zeroes it,
+    # the offset of an unstretched muscle. The source plug is kept on the constraint so rest=False
+    # can connect it again
+    for skin_joint in skin_joints:
+        constraint = f'{skin_joint}_parentConstraint1'
+        offset = f'{constraint}.target[0].targetOffsetTranslateZ'
+        if rest:
+            sources = cmds.listConnections(offset, s=True, d=False, p=True) or []
+            if sources:
+                if not cmds.objExists(f'{constraint}.flexOffsetSource'):
+                    cmds.addAttr(constraint, ln='flexOffsetSource', dt='string', h=True)
+                cmds.setAttr(f'{constraint}.flexOffsetSource', sources[0], type='string')
+                cmds.disconnectAttr(sources[0], offset)
+            cmds.setAttr(offset, 0.0)
+            # evaluate the constraint at rest before it gets frozen
+            cmds.getAttr(f'{constraint}.constraintTranslate')
+        elif cmds.objExists(f'{constraint}.flexOffsetSource'):
+            source = cmds.getAttr(f'{constraint}.flexOffsetSource')
+            if source and cmds.objExists(source.split('.', 1)[0]) and \
+                    not cmds.listConnections(offset, s=True, d=False):
+                cmds.connectAttr(source, offset)
+            cmds.setAttr(f'{constraint}.flexOffsetSource', '', type='string')
+
+def get_muscle_lod(rig):
+    if not cmds.objExists(f'{rig}.lod'):
+        return LOD_LEVELS[0]
+    return LOD_LEVELS[cmds.getAttr(f'{rig}.lod')]
+
+def bake_muscle_cache(directory, start=None, end=None, step=1, index=None):
+    # sample the local translate and rotate of every skin joint over the frame range in one pass
+    # and write a joint cache per character, characters are the joints' namespaces.
+    # Returns {character: cache file}
+    index = get_scene_index(index)
+    characters = {}
+    for joint in index.skin_joints:
+        name = joint.split('|')[-1]
+        character = name.rsplit(':', 1)[0].replace(':', '_') if ':' in name else 'scene'
+        characters.setdefault(character, []).append(joint)
+    frames = get_frames(start, end, step)
+    if not characters or not frames:
+        cmds.warning('There are no skin joints or frames to cache')
+        return {}
+
+    files = dict((c, os.path.join(directory, f'{c}_muscleCache.npy')) for c in characters)
+    caches = dict((c, joint_cache.create_cache(files[c], joints, len(frames))) for c, joints in characters.items())
+    current_time = cmds.currentTime(q=True)
+    with batch_build('VT_SimpleMuscle bake_muscle_cache'):
+        try:
+            for i, frame in enumerate(frames):
+                cmds.currentTime(frame, update=False)
+                for character, joints in characters.items():
+                    values = [cmds.getAttr(f'{j}.translate')[0] + cmds.getAttr(f'{j}.rotate')[0] for j in joints]
+                    joint_cache.write_frame(caches[character], i, frame, values)
+        finally:
+            cmds.currentTime(current_time, update=False)
+            for cache in caches.values():
+                cache.flush()
+
+    for character, file_path in files.items():
+        print(f'cached {len(characters[character])} skin joints over {len(frames)} frames to {file_path}')
+    return files
+
+def load_muscle_cache(file_path, index=None):
+    # drive the cached skin joints from a muscleCache node and switch their rigs off.
+    # Returns the muscleCache node
+    index = get_scene_index(index)
+    load_cache_plugin()
+    joints = joint_cache.cache_joints(joint_cache.open_cache(file_path))
+    name = os.path.splitext(os.path.basename(file_path))[0]
+
+    with batch_build('VT_SimpleMuscle load_muscle_cache'):
+        cache_node = cmds.createNode('muscleCache', n=name)
+        cmds.setAttr(f'{cache_node}.cacheFile', file_path, type='string')
+        cmds.connectAttr('time1.outTime', f'{cache_node}.time')
+        for i, joint in enumerate(joints):
+            if not cmds.objExists(joint):
+                print(f'{joint} is in {file_path} but not in the scene. Skipping')
+                continue
+            for channel in joint_cache.CHANNELS:
+                cmds.connectAttr(f'{cache_node}.out{channel[0].upper()}{channel[1:]}[{i}]', f'{joint}.{channel}',
+                                 f=True)
+
+        # the rigs no longer drive anything
+        for rig in get_cached_rigs(joints, index):
+            set_rig_lod(rig, 'off')
+    return cache_node
+
+def unload_muscle_cache(cache_node, index=None):
+    # give the skin joints back to their constraints and turn their rigs back on
+    index = get_scene_index(index)
+    joints = joint_cache.cache_joints(joint_cache.open_cache(cmds.getAttr(f'{cache_node}.cacheFile')))
+    with batch_build('VT_SimpleMuscle unload_muscle_cache'):
+        cmds.delete(cache_node)
+        for joint in joints:
+            constraint = f'{joint}_parentConstraint1'
+            if not cmds.objExists(constraint):
+                continue
+            for channel in joint_cache.CHANNELS:
+                cmds.connectAttr(f'{constraint}.constraint{channel[0].upper()}{channel[1:]}', f'{joint}.{channel}',
+                                 f=True)
+        for rig in get_cached_rigs(joints, index):
+            set_rig_lod(rig, 'full')
+
+def get_cached_rigs(joints, index):
+    # the rigs that built the cached skin joints, Bicep_L_rig for Bicep_L_3_skin_jnt
+    cached = set(j[:-len('_skin_jnt')].rsplit('_', 1)[0] for j in joints)
+    return [r for r in index.rigs if r[:-len('_rig')] in cached]
+
+# surface factors from the last record_surface_factors or load_surface_factors, for previews
+_factor_cache = None
+
+def record_surface_factors(file_path=None, start=None, end=None, step=1, index=None):
+    # record the stretch factor of every muscle surface over the frame range in one pass. Kept in
+    # memory for preview_flex_offsets and written to file_path when one is given
+    global _factor_cache
+    index = get_scene_index(index)
+    surfaces = [f"{r[:-len('_rig')]}_surface" for r in index.rigs]
+    surfaces = [s for s in surfaces if cmds.objExists(f'{s}.factor')]
+    frames = get_frames(start, end, step)
+
+    factors = dict((s, []) for s in surfaces)
+    current_time = cmds.currentTime(q=True)
+    with batch_build('VT_SimpleMuscle record_surface_factors'):
+        try:
+            for frame in frames:
+                cmds.currentTime(frame, update=False)
+                for surface in surfaces:
+                    factors[surface].append(cmds.getAttr(f'{surface}.factor'))
+        finally:
+            cmds.currentTime(current_time, update=False)
+
+    _factor_cache = factor_cache.FactorCache(frames, factors)
+    if file_path:
+        _factor_cache.save(file_path)
+    return _factor_cache
+
+def load_surface_factors(file_path):
+    global _factor_cache
+    _factor_cache = factor_cache.FactorCache.load(file_path)
+    return _factor_cache
+
+def get_factor_cache():
+    return _factor_cache
+
+def get_muscle_surface(node):
+    # the surface of a muscle from its guide, rig or surface
+    name = node.split('|')[-1]
+    if name.endswith('_surface'):
+        return name
+    if name.endswith('_rig'):
+        name = name[:-len('_rig')]
+    return f'{name}_surface'
+
+def get_surface_joints(surface):
+    # the skin joints with an offset factor attr on the surface, in build order
+    attrs = cmds.listAttr(surface, ud=True) or []
+    return sorted([a for a in attrs if a.endswith('_skin_jnt')], key=skin_joint_number)
+
+def preview_flex_offsets(surface, bulge=None, sink=None, triggerLength=None):
+    # {skin joint: (min, max)} Z offset over the recorded frames with these settings, settings
+    # that aren't given are read from the surface. Needs record_surface_factors first
+    if _factor_cache is None or surface not in _factor_cache.factors:
+        cmds.warning(f'Record the surface factors first, there are none for {surface}')
+        return {}
+    bulge = cmds.getAttr(f'{surface}.bulge') if bulge is None else bulge
+    sink = cmds.getAttr(f'{surface}.sink') if sink is None else sink
+    triggerLength = cmds.getAttr(f'{surface}.triggerLength') if triggerLength is None else triggerLength
+
+    joints = get_surface_joints(surface)
+    weights = [cmds.getAttr(f'{surface}.{j}') for j in joints]
+    return dict(zip(joints, _factor_cache.offset_range(surface, bulge, sink, triggerLength, weights)))
+
+def export_guides(file_path, index=None):
+    index = get_scene_index(index)
+    to_export = index.guides
+
+    if file_path.endswith('.json'):
+        # guide transforms and settings only, no maya scene export
+        guide_io.write_guides(file_path, [get_guide_data(g) for g in to_export])
+        return
 
     current_selection = cmds.ls(sl=True)
     cmds.select(to_export)
     cmds.file(file_path, es=True, type='mayaAscii')
     cmds.select(current_selection)
 
-def bake_to_guides():
-    all_joints = cmds.ls(type='joint')
-    for joint in all_joints:
-        if check_for_attr(joint, 'parent'):
-            surface = f'{joint}_surface'
+def get_guide_data(joint):
+    end_joint = cmds.listRelatives(joint, c=True, type='joint')[0]
+    data = {'name': joint.split('|')[-1],
+            'matrix': cmds.xform(joint, q=True, m=True, ws=True),
+            'end': end_joint,
+            'endTranslate': list(cmds.getAttr(f'{end_joint}.translate')[0]),
+            'parent': cmds.getAttr(f'{joint}.parent') or ''}
+    for attr in ['numJoints', 'surfType', 'bulge', 'sink', 'triggerLength']:
+        data[attr] = cmds.getAttr(f'{joint}.{attr}')
+    return data
+
+def bake_to_guides(index=None):
+    index = get_scene_index(index)
+    for joint in index.guides:
+        surface = f'{joint}_surface'
+
+        if cmds.objExists(surface):
+            bulge = cmds.getAttr(f'{surface}.bulge')
+            sink = cmds.getAttr(f'{surface}.sink')
+            triggerLength = cmds.getAttr(f'{surface}.triggerLength')
+
+            cmds.setAttr(f'{joint}.bulge', bulge)
+            cmds.setAttr(f'{joint}.sink', sink)
+            cmds.setAttr(f'{joint}.triggerLength', triggerLength)
+        else:
+            pass
 
-            if cmds.objExists(surface):
-                bulge = cmds.getAttr(f'{surface}.bulge')
-                sink = cmds.getAttr(f'{surface}.sink')
-                triggerLength = cmds.getAttr(f'{surface}.triggerLength')
+def import_guides(file_path, batch=True):
+    if not file_path.endswith('.json'):
+        cmds.file(file_path, i=True)
+        return
 
-                cmds.setAttr(f'{joint}.bulge', bulge)
-                cmds.setAttr(f'{joint}.sink', sink)
-                cmds.setAttr(f'{joint}.triggerLength', triggerLength)
+    # parse and validate everything before touching the scene
+    guides = guide_io.read_guides(file_path)
+    with batch_build('VT_SimpleMuscle import_guides', enabled=batch):
+        return [guide for done, total, guide in iter_create_guides(guides) if guide]
+
+def iter_create_guides(guides):
+    # create guides from validated guide_io data one per step, yields (guides done, total, guide)
+    # where guide is None when it was skipped. Run it inside one batch_build
+    for i, data in enumerate(guides):
+        if cmds.objExists(data['name']):
+            cmds.warning(f"{data['name']} already exists skipping")
+            yield i + 1, len(guides), None
+            continue
+        guide = create_guide_from_data(data)
+        yield i + 1, len(guides), guide
+
+def create_guide_from_data(data):
+    joint, end_joint = create_guide(data['name'], data['parent'], data['numJoints'],
+                                    ['Linear', 'Cubic'][data['surfType']], data['endTranslate'])
+    if end_joint != data['end']:
+        end_joint = cmds.rename(end_joint, data['end'])
+    cmds.xform(joint, m=data['matrix'], ws=True)
+    for attr in ['bulge', 'sink', 'triggerLength']:
+        cmds.setAttr(f'{joint}.{attr}', data[attr])
+    return joint
+
+def export_rig_description(file_path, index=None):
+    # every guide, the settings of its built surface and every push rig in one json file
+    index = get_scene_index(index)
+    guides = [get_guide_data(g) for g in index.guides]
+    surfaces = {}
+    for data in guides:
+        surface = f"{data['name']}_surface"
+        if cmds.objExists(surface) and cmds.attributeQuery('bulge', n=surface, ex=True):
+            surfaces[data['name']] = dict((attr, cmds.getAttr(f'{surface}.{attr}'))
+                                          for attr in rig_description.SURFACE_SETTINGS)
+    push_rigs = dict(get_push_rig_data(b) for b in index.push_bases)
+    rig_description.write_rig_description(file_path, guides, surfaces, push_rigs)
+
+def build_from_rig_description(file_path, index=None, batch=True, backend='cmds', flex_network='per_joint'):
+    # creates the guides, builds their muscle rigs with the tuned settings and builds the push rigs
+    index = get_scene_index(index)
+    description = rig_description.read_rig_description(file_path)
+    push_report = {'created': [], 'skipped': [], 'invalid': []}
+    timings = []
+
+    with batch_build('VT_SimpleMuscle build_from_rig_description', enabled=batch):
+        for data in description['guides']:
+            # the tuned surface settings win over what was baked to the guide
+            settings = description['surfaces'].get(data['name'], {})
+            joint = data['name']
+            if not cmds.objExists(joint):
+                create_guide_from_data(dict(data, **settings))
             else:
-                pass
-
-def import_guides(file_path):
-    cmds.file(file_path, i=True)
-
-def update_guides():
-    all_joints = cmds.ls(type='joint')
-    for joint in all_joints:
-        if check_for_attr(joint, 'parent'):
-            cmds.addAttr(joint, ln='surfType', at='enum', en='Linear:Cubic', h=False, k=True)
+                for attr, value in settings.items():
+                    cmds.setAttr(f'{joint}.{attr}', value)
+            if cmds.objExists(f'{joint}_rig'):
+                cmds.warning(f'{joint}_rig already exists skipping')
+                continue
+            start = time.perf_counter()
+            build_guide(joint, backend, flex_network)
+            timings.append((joint, time.perf_counter() - start))
+
+        entries = collect_push_rigs(description['push_rigs'].items(), push_report)
+        build_push_rigs(entries, push_report)
+
+    index.invalidate()
+    print_build_timings(timings)
+    print_push_import_report(push_report)
+    return timings, push_report
+
+def update_guides(index=None):
+    index = get_scene_index(index)
+    for joint in index.guides:
+        cmds.addAttr(joint, ln='surfType', at='enum', en='Linear:Cubic', h=False, k=True)
 
 #############################################
 ## push joints
@@ -487,7 +1520,7 @@ add mirror rig function
 add mirror settings function
 add export and import functions
 '''
-def create_push_joints(driver_joint, name):
+def create_push_joints(driver_joint, name, lean=False):
 
     if cmds.objExists(f'{name}_pushBase'):
         cmds.warning(f'{name}_pushBase already exists skipping')
@@ -497,7 +1530,7 @@ def create_push_joints(driver_joint, name):
         push_axis = get_push_axis(driver_joint, hinge_axis)
 
         # base_joint = cmds.createNode('joint', n=f'{name}_pushBase')
-        base_joint = cmds.duplicate(driver_joint, po=True)[0]
+        base_joint = cmds.rename(cmds.duplicate(driver_joint, po=True)[0], f'{name}_pushBase')
         pos_up_joint = cmds.createNode('joint', n=f'{name}_pushPosUp')
         pos_dn_joint = cmds.createNode('joint', n=f'{name}_pushPosDn')
         neg_up_joint = cmds.createNode('joint', n=f'{name}_pushNegUp')
@@ -521,7 +1554,7 @@ def create_push_joints(driver_joint, name):
         cmds.parent(base_joint, driver_joint)
 
         # create group to hold constraint nodes
-        if not cmds.objExists('push_constraints_grp'):
+        if not lean and not cmds.objExists('push_constraints_grp'):
             cmds.createNode('transform', n='push_constraints_grp')
 
         # get usable default values
@@ -545,31 +1578,38 @@ def create_push_joints(driver_joint, name):
         pos_remap = cmds.createNode('remapValue', n=f'{name}_pos_remap')
         neg_remap = cmds.createNode('remapValue', n=f'{name}_neg_remap')
 
-        # create transforms to read the world space pos of each joint
-        parent_reader = cmds.createNode('transform', n=f'{name}_parent_reader')
-        driver_reader = cmds.createNode('transform', n=f'{name}_driver_reader')
-        child_reader = cmds.createNode('transform', n=f'{name}_child_reader')
-
-        cmds.pointConstraint(driver_parent, parent_reader, mo=False)
-        cmds.pointConstraint(driver_joint, driver_reader, mo=False)
-        cmds.pointConstraint(driver_child, child_reader, mo=False)
+        angle_between = cmds.createNode('angleBetween', n=f'{name}_angle')
+        if lean:
+            # in the driver's space the child is at its translate and the parent is at the
+            # translate of the driver's inverse matrix, no reader transforms needed
+            parent_position = cmds.createNode('decomposeMatrix', n=f'{name}_parent_position')
+            cmds.connectAttr(f'{driver_joint}.inverseMatrix', f'{parent_position}.inputMatrix')
+            cmds.connectAttr(f'{driver_child}.translate', f'{angle_between}.vector1')
+            cmds.connectAttr(f'{parent_position}.outputTranslate', f'{angle_between}.vector2')
+        else:
+            # create transforms to read the world space pos of each joint
+            parent_reader = cmds.createNode('transform', n=f'{name}_parent_reader')
+            driver_reader = cmds.createNode('transform', n=f'{name}_driver_reader')
+            child_reader = cmds.createNode('transform', n=f'{name}_child_reader')
 
-        # get the vectors to find the angle between them
-        child_minus_driver = cmds.createNode('plusMinusAverage', n=f'{name}_child_minus_driver')
-        cmds.setAttr(f'{child_minus_driver}.operation', 2)
-        parent_minus_driver = cmds.createNode('plusMinusAverage', n=f'{name}_parent_minus_driver')
-        cmds.setAttr(f'{parent_minus_driver}.operation', 2)
+            cmds.pointConstraint(driver_parent, parent_reader, mo=False)
+            cmds.pointConstraint(driver_joint, driver_reader, mo=False)
+            cmds.pointConstraint(driver_child, child_reader, mo=False)
 
-        cmds.connectAttr(f'{child_reader}.translate', f'{child_minus_driver}.input3D[0]')
-        cmds.connectAttr(f'{driver_reader}.translate', f'{child_minus_driver}.input3D[1]')
+            # get the vectors to find the angle between them
+            child_minus_driver = cmds.createNode('plusMinusAverage', n=f'{name}_child_minus_driver')
+            cmds.setAttr(f'{child_minus_driver}.operation', 2)
+            parent_minus_driver = cmds.createNode('plusMinusAverage', n=f'{name}_parent_minus_driver')
+            cmds.setAttr(f'{parent_minus_driver}.operation', 2)
 
-        cmds.connectAttr(f'{parent_reader}.translate', f'{parent_minus_driver}.input3D[0]')
-        cmds.connectAttr(f'{driver_reader}.translate', f'{parent_minus_driver}.input3D[1]')
+            cmds.connectAttr(f'{child_reader}.translate', f'{child_minus_driver}.input3D[0]')
+            cmds.connectAttr(f'{driver_reader}.translate', f'{child_minus_driver}.input3D[1]')
 
-        angle_between = cmds.createNode('angleBetween', n=f'{name}_angle')
+            cmds.connectAttr(f'{parent_reader}.translate', f'{parent_minus_driver}.input3D[0]')
+            cmds.connectAttr(f'{driver_reader}.translate', f'{parent_minus_driver}.input3D[1]')
 
-        cmds.connectAttr(f'{child_minus_driver}.output3D', f'{angle_between}.vector1')
-        cmds.connectAttr(f'{parent_minus_driver}.output3D', f'{angle_between}.vector2')
+            cmds.connectAttr(f'{child_minus_driver}.output3D', f'{angle_between}.vector1')
+            cmds.connectAttr(f'{parent_minus_driver}.output3D', f'{angle_between}.vector2')
 
         # div that angle by 2 to find the half way angle
         multiply = cmds.createNode('multDoubleLinear', n=f'{name}_multiply')
@@ -588,39 +1628,20 @@ def create_push_joints(driver_joint, name):
 
         # drive push translate on push joints
         # connect attrs from base joint to remap nodes
-        # we need to do the opposite for the right side
-        if '_r' or '_R' in name:
-
-            cmds.connectAttr(f'{pos_remap}.outValue', f'{pos_up_joint}.translate{aim_axis}')
-            cmds.connectAttr(f'{pos_remap}.outValue', f'{pos_dn_joint}.translate{aim_axis}')
-            cmds.connectAttr(f'{neg_remap}.outValue', f'{neg_up_joint}.translate{aim_axis}')
-            cmds.connectAttr(f'{neg_remap}.outValue', f'{neg_dn_joint}.translate{aim_axis}')
-
-            cmds.connectAttr(f'{base_joint}.drvStart', f'{pos_remap}.inputMin')
-            cmds.connectAttr(f'{base_joint}.drvEnd', f'{pos_remap}.inputMax')
-            cmds.connectAttr(f'{base_joint}.posStart', f'{pos_remap}.outputMin')
-            cmds.connectAttr(f'{base_joint}.posEnd', f'{pos_remap}.outputMax')
-
-            cmds.connectAttr(f'{base_joint}.drvStart', f'{neg_remap}.inputMin')
-            cmds.connectAttr(f'{base_joint}.drvEnd', f'{neg_remap}.inputMax')
-            cmds.connectAttr(f'{base_joint}.negStart', f'{neg_remap}.outputMin')
-            cmds.connectAttr(f'{base_joint}.negEnd', f'{neg_remap}.outputMax')
-        else:
-
-            cmds.connectAttr(f'{pos_remap}.outValue', f'{pos_up_joint}.translate{aim_axis}')
-            cmds.connectAttr(f'{pos_remap}.outValue', f'{pos_dn_joint}.translate{aim_axis}')
-            cmds.connectAttr(f'{neg_remap}.outValue', f'{neg_up_joint}.translate{aim_axis}')
-            cmds.connectAttr(f'{neg_remap}.outValue', f'{neg_dn_joint}.translate{aim_axis}')
+        cmds.connectAttr(f'{pos_remap}.outValue', f'{pos_up_joint}.translate{aim_axis}')
+        cmds.connectAttr(f'{pos_remap}.outValue', f'{pos_dn_joint}.translate{aim_axis}')
+        cmds.connectAttr(f'{neg_remap}.outValue', f'{neg_up_joint}.translate{aim_axis}')
+        cmds.connectAttr(f'{neg_remap}.outValue', f'{neg_dn_joint}.translate{aim_axis}')
 
-            cmds.connectAttr(f'{base_joint}.drvStart', f'{pos_remap}.inputMin')
-            cmds.connectAttr(f'{base_joint}.drvEnd', f'{pos_remap}.inputMax')
-            cmds.connectAttr(f'{base_joint}.posStart', f'{pos_remap}.outputMin')
-            cmds.connectAttr(f'{base_joint}.posEnd', f'{pos_remap}.outputMax')
+        cmds.connectAttr(f'{base_joint}.drvStart', f'{pos_remap}.inputMin')
+        cmds.connectAttr(f'{base_joint}.drvEnd', f'{pos_remap}.inputMax')
+        cmds.connectAttr(f'{base_joint}.posStart', f'{pos_remap}.outputMin')
+        cmds.connectAttr(f'{base_joint}.posEnd', f'{pos_remap}.outputMax')
 
-            cmds.connectAttr(f'{base_joint}.drvStart', f'{neg_remap}.inputMin')
-            cmds.connectAttr(f'{base_joint}.drvEnd', f'{neg_remap}.inputMax')
-            cmds.connectAttr(f'{base_joint}.negStart', f'{neg_remap}.outputMin')
-            cmds.connectAttr(f'{base_joint}.negEnd', f'{neg_remap}.outputMax')
+        cmds.connectAttr(f'{base_joint}.drvStart', f'{neg_remap}.inputMin')
+        cmds.connectAttr(f'{base_joint}.drvEnd', f'{neg_remap}.inputMax')
+        cmds.connectAttr(f'{base_joint}.negStart', f'{neg_remap}.outputMin')
+        cmds.connectAttr(f'{base_joint}.negEnd', f'{neg_remap}.outputMax')
 
         # offset the up and dn joints a little so they don't overlap
         cmds.setAttr(f'{pos_up_joint}.translate{push_axis}', side_offset * -1)
@@ -628,6 +1649,11 @@ def create_push_joints(driver_joint, name):
         cmds.setAttr(f'{neg_up_joint}.translate{push_axis}', side_offset * -1)
         cmds.setAttr(f'{neg_dn_joint}.translate{push_axis}', side_offset)
 
+        if lean:
+            drive_push_orients(name, driver_joint, base_joint, hinge_axis, [pos_up_joint, neg_up_joint],
+                               [pos_dn_joint, neg_dn_joint])
+            return base_joint
+
         # orient constrain up and dn joints to the parent and driver joints
         # skip all axes except the hinge axis
         skip = []
@@ -639,124 +1665,137 @@ def create_push_joints(driver_joint, name):
         pos_dn_orient = cmds.orientConstraint(driver_joint, pos_dn_joint, mo=False, skip=skip)[0]
         neg_dn_orient = cmds.orientConstraint(driver_joint, neg_dn_joint, mo=False, skip=skip)[0]
         cmds.parent(pos_up_orient, pos_dn_orient, neg_up_orient, neg_dn_orient, 'push_constraints_grp')
+        return base_joint
+
+def drive_push_orients(name, driver_joint, base_joint, hinge_axis, up_joints, dn_joints):
+    # what the hinge axis only orientConstraints do, from local matrices. The up joints follow the
+    # driver's parent, which relative to the base joint is driver.inverseMatrix * base.inverseMatrix,
+    # and the dn joints follow the driver, which is just base.inverseMatrix
+    up_matrix = cmds.createNode('multMatrix', n=f'{name}_up_matrix')
+    cmds.connectAttr(f'{driver_joint}.inverseMatrix', f'{up_matrix}.matrixIn[0]')
+    cmds.connectAttr(f'{base_joint}.inverseMatrix', f'{up_matrix}.matrixIn[1]')
+    up_orient = cmds.createNode('decomposeMatrix', n=f'{name}_up_orient')
+    cmds.connectAttr(f'{up_matrix}.matrixSum', f'{up_orient}.inputMatrix')
+
+    dn_orient = cmds.createNode('decomposeMatrix', n=f'{name}_dn_orient')
+    cmds.connectAttr(f'{base_joint}.inverseMatrix', f'{dn_orient}.inputMatrix')
+
+    for joint in up_joints:
+        cmds.connectAttr(f'{up_orient}.outputRotate{hinge_axis}', f'{joint}.rotate{hinge_axis}')
+    for joint in dn_joints:
+        cmds.connectAttr(f'{dn_orient}.outputRotate{hinge_axis}', f'{joint}.rotate{hinge_axis}')
+
+# joint axes worked out during a build, see axis_cache
+_axis_cache = None
+
+@contextlib.contextmanager
+def axis_cache():
+    # remember each joint's aim and hinge axis until the block exits, for building many push rigs
+    global _axis_cache
+    if _axis_cache is not None:
+        yield
+        return
+    _axis_cache = {}
+    try:
+        yield
+    finally:
+        _axis_cache = None
+
+def cached_axis(key, compute):
+    if _axis_cache is None:
+        return compute()
+    if key not in _axis_cache:
+        _axis_cache[key] = compute()
+    return _axis_cache[key]
 
 def get_aim_axis(driver_joint):
+    return cached_axis(('aim', driver_joint), lambda: compute_aim_axis(driver_joint))
+
+def compute_aim_axis(driver_joint):
     # Get the children of the driver_joint
     children = cmds.listRelatives(driver_joint, type='joint', children=True)
     if not children:
         cmds.warning(f"No child joint found for {driver_joint}.")
         return None
 
-    child_joint = children[0]
-
-    # Get the translate values of the child joint relative to the driver_joint
-    translate_values = cmds.getAttr(f"{child_joint}.translate")[0]
-
-    # Find the axis with the largest absolute translation value
-    axes = ['x', 'y', 'z']
-    axis_index = max(range(3), key=lambda i: abs(translate_values[i]))
-    sign = '-' if translate_values[axis_index] < 0 else ''
-
-    return f"{axes[axis_index].capitalize()}"
+    # the axis with the largest translation of the child relative to the driver_joint
+    return axes.aim_axis(cmds.getAttr(f"{children[0]}.translate")[0])
 
 def get_push_axis(driver_joint, hinge_axis='Z'):
-    aim_axis = get_aim_axis(driver_joint)
-    push_axis = None
-    for axis in ['X', 'Y', 'Z']:
-        if axis != aim_axis and axis != hinge_axis:
-            push_axis = axis
-
-    return push_axis
+    return axes.push_axis(get_aim_axis(driver_joint), hinge_axis)
 
 def get_joint_hinge_axis(joint):
-    parent = cmds.listRelatives(joint, p=True, type='joint')[0]
-    reader = cmds.createNode('transform')
-    cmds.matchTransform(reader, joint)
-    cmds.parent(reader, parent)
+    return cached_axis(('hinge', joint), lambda: compute_joint_hinge_axis(joint))
 
+def compute_joint_hinge_axis(joint):
     if not cmds.objectType(joint, isType="joint"):
         cmds.error(f"The specified object '{joint}' is not a joint.")
         return None
 
-    # Get the joint's rotate axis
-    rotate = cmds.getAttr(f"{reader}.rotate")[0]
+    # the joint's rotation relative to its parent including the joint orient, worked out from
+    # the attrs instead of matching a temporary transform to it
+    rotate = axes.joint_local_rotation(cmds.getAttr(f"{joint}.rotate")[0],
+                                       cmds.getAttr(f"{joint}.jointOrient")[0],
+                                       cmds.getAttr(f"{joint}.rotateAxis")[0],
+                                       cmds.getAttr(f"{joint}.rotateOrder"))
 
     # Check if all rotation values are zero (default state)
-    if all(value == 0.0 for value in rotate):
+    if all(abs(value) < 1e-6 for value in rotate):
         cmds.warning(f"The joint '{joint}' has no specific rotateAxis set. It might hinge along the default axis.")
 
-    # Calculate the dominant axis
-    abs_values = [abs(value) for value in rotate]
-    max_index = abs_values.index(max(abs_values))
-    axes = ['x', 'y', 'z']
+    return axes.dominant_axis(rotate)
 
-    cmds.delete(reader)
+def mirror_push_rigs(index=None, rules=None):
+    index = get_scene_index(index)
+    rules = sides.get_rules(rules)
+    # either mirror selected base joints or mirror all push rigs
+    to_mirror = get_push_bases_to_mirror(index, rules)
 
-    return axes[max_index].capitalize()
+    with axis_cache():
+        mirror_push_bases(to_mirror, rules)
 
-def mirror_push_rigs():
-    # either mirror selected base joints or mirror all push rigs
-    to_mirror = []
-    selection = cmds.ls(sl=True)
-    if selection:
-        for item in selection:
-            if check_for_attr(item, 'drvStart', 'joint'):
-                to_mirror.append(item)
-    else:
-        all_joints = cmds.ls(type='joint')
-        for joint in all_joints:
-            if '_L' or '_l' in joint:
-                if check_for_attr(joint, 'drvStart', 'joint'):
-                    to_mirror.append(joint)
+    index.invalidate()
 
+def mirror_push_bases(to_mirror, rules):
     for base_joint in to_mirror:
-        driver_joint_L = cmds.getAttr(f'{base_joint}.joint')
-        driver_joint_R = ''
-        name_L = base_joint.split('_pushBase')[0]
-        name_R = ''
-        if '_L' in base_joint:
-            driver_joint_R = driver_joint_L.replace('L', 'R')
-        elif '_l' in base_joint:
-            driver_joint_R = driver_joint_L.replace('l', 'r')
-
-        if '_L' in name_L:
-            name_R = name_L.replace('_L','_R')
-        if '_l' in name_L:
-            name_R = name_L.replace('_l', '_r')
-
-        create_push_joints(driver_joint_R, name_R)
-        mirror_push_rig_settings(base_joint)
-
-def mirror_all_push_rig_settings():
+        driver_joint_R = rules.mirror(cmds.getAttr(f'{base_joint}.joint'))
+        name_R = rules.mirror(base_joint.split('_pushBase')[0])
+        if not cmds.objExists(driver_joint_R):
+            print(f'the right side driver joint {driver_joint_R} for {base_joint} doesnt exist. Skipping')
+            continue
+
+        # build the right side the same way the left side was built
+        lean = not cmds.objExists(f"{base_joint.split('_pushBase')[0]}_parent_reader")
+        create_push_joints(driver_joint_R, name_R, lean)
+        mirror_push_rig_settings(base_joint, rules)
+
+def mirror_all_push_rig_settings(index=None, rules=None):
+    index = get_scene_index(index)
+    rules = sides.get_rules(rules)
     # either mirror selected base joints or mirror all push rigs
-    to_mirror = []
+    for push_base in get_push_bases_to_mirror(index, rules):
+        mirror_push_rig_settings(push_base, rules)
+
+def get_push_bases_to_mirror(index, rules=None):
+    # the selected left side push bases, or all of them if nothing is selected. Bases without a
+    # side token can't be paired, report them instead of dropping them
+    rules = sides.get_rules(rules)
+    pairs = index.side_pairs('push_bases', rules)
     selection = cmds.ls(sl=True)
-    if selection:
-        for item in selection:
-            if check_for_attr(item, 'drvStart', 'joint'):
-                to_mirror.append(item)
-    else:
-        all_joints = cmds.ls(type='joint')
-        for joint in all_joints:
-            if '_L' or '_l' in joint:
-                if check_for_attr(joint, 'drvStart', 'joint'):
-                    to_mirror.append(joint)
-
-    for push_base in to_mirror:
-        mirror_push_rig_settings(push_base)
-
-def mirror_push_rig_settings(push_base_L):
-    push_base_R = ''
-    joint_L = cmds.getAttr(f'{push_base_L}.joint')
-    joint_R = ''
-    if '_L' in push_base_L:
-        push_base_R = push_base_L.replace('_L', '_R')
-    elif '_l' in push_base_L:
-        push_base_R = push_base_L.replace('_l', '_r')
-    if '_L' in joint_L:
-        joint_R = joint_L.replace('_L', '_R')
-    if '_l' in joint_L:
-        joint_R = joint_L.replace('_l', '_r')
+    push_bases = index.filter(selection, 'push_bases') if selection else index.push_bases
+    for push_base in push_bases:
+        if push_base in pairs:
+            continue
+        if rules.side(push_base) is None:
+            print(f'{push_base} has no side token to mirror. Skipping')
+        elif selection:
+            print(f'{push_base} is not a left side push rig. Skipping')
+    return [b for b in push_bases if b in pairs]
+
+def mirror_push_rig_settings(push_base_L, rules=None):
+    rules = sides.get_rules(rules)
+    push_base_R = rules.mirror(push_base_L)
+    joint_R = rules.mirror(cmds.getAttr(f'{push_base_L}.joint'))
 
     if cmds.objExists(push_base_R):
         drvStart = cmds.getAttr(f'{push_base_L}.drvStart')
@@ -773,59 +1812,83 @@ def mirror_push_rig_settings(push_base_L):
         cmds.setAttr(f'{push_base_R}.negStart', negStart*-1)
         cmds.setAttr(f'{push_base_R}.negEnd', negEnd*-1)
         cmds.setAttr(f'{push_base_R}.joint', joint_R, type='string')
+    else:
+        print(f'the right side push rig {push_base_R} for {push_base_L} doesnt exist. Skipping')
 
-def export_push_rigs(file_path):
+def export_push_rigs(file_path, index=None):
+    index = get_scene_index(index)
     data = {}
-    all_joints = cmds.ls(type='joint')
-    for joint in all_joints:
-        if check_for_attr(joint, 'drvStart', 'joint') and check_for_attr(joint, 'drvEnd', 'joint'):
-            rig_name = joint.split('_pushBase')[0]
-            driver_joint = cmds.getAttr(f'{joint}.joint')
-            drvStart = cmds.getAttr(f'{joint}.drvStart')
-            drvEnd = cmds.getAttr(f'{joint}.drvEnd')
-            posStart = cmds.getAttr(f'{joint}.posStart')
-            posEnd = cmds.getAttr(f'{joint}.posEnd')
-            negStart = cmds.getAttr(f'{joint}.negStart')
-            negEnd = cmds.getAttr(f'{joint}.negEnd')
-            data[driver_joint] = {
-                'rig_name':rig_name,
-                'drvStart':drvStart,
-                'drvEnd':drvEnd,
-                'posStart':posStart,
-                'posEnd':posEnd,
-                'negStart':negStart,
-                'negEnd':negEnd
-            }
+    for joint in index.push_bases:
+        driver_joint, data[driver_joint] = get_push_rig_data(joint)
 
     with open(file_path, "w") as json_file:
         json.dump(data, json_file, indent=4)
 
-def import_push_rigs(file_path):
-    with open(file_path, "r") as json_file:
-        loaded_data = json.load(json_file)
-
-    for key in loaded_data.keys():
-        create_push_joints(key, loaded_data[key]['rig_name'])
-
-    base_name = f"{loaded_data[key]['rig_name']}_pushBase"
-    if cmds.objExists(base_name):
-        cmds.setAttr(f'{base_name}.drvStart', loaded_data[key]['drvStart'])
-        cmds.setAttr(f'{base_name}.drvEnd', loaded_data[key]['drvEnd'])
-        cmds.setAttr(f'{base_name}.posStart', loaded_data[key]['posStart'])
-        cmds.setAttr(f'{base_name}.posEnd', loaded_data[key]['posEnd'])
-        cmds.setAttr(f'{base_name}.negStart', loaded_data[key]['negStart'])
-        cmds.setAttr(f'{base_name}.negEnd', loaded_data[key]['negEnd'])
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+def get_push_rig_data(push_base):
+    # (driver joint, settings) as they are written to push rig json files
+    data = {'rig_name': push_base.split('_pushBase')[0]}
+    for attr in push_io.SETTINGS:
+        data[attr] = cmds.getAttr(f'{push_base}.{attr}')
+    return cmds.getAttr(f'{push_base}.joint'), data
+
+def import_push_rigs(file_path, batch=True, lean=False):
+    # validate every entry first, build all the rigs, then apply all the settings
+    report = {'created': [], 'skipped': [], 'invalid': []}
+    entries = collect_push_rigs(push_io.iter_push_rigs(file_path), report)
+    with batch_build('VT_SimpleMuscle import_push_rigs', enabled=batch):
+        build_push_rigs(entries, report, lean)
+
+    print_push_import_report(report)
+    return report
+
+def iter_import_push_rigs(items, invalid=(), lean=False):
+    # import_push_rigs one rig per step from already read (driver joint, entry) pairs, yields
+    # (rigs done, total, driver joint). invalid is the (driver joint, reason) pairs the reader
+    # rejected. Run it inside one batch_build
+    report = {'created': [], 'skipped': [], 'invalid': list(invalid)}
+    entries = collect_push_rigs(items, report)
+    try:
+        for i, entry in enumerate(entries):
+            build_push_rigs([entry], report, lean)
+            yield i + 1, len(entries), entry[0]
+    finally:
+        print_push_import_report(report)
+
+def collect_push_rigs(items, report):
+    # the valid (driver joint, entry) pairs whose driver joints exist
+    entries = []
+    for driver_joint, entry in items:
+        try:
+            entry = push_io.validate_push_rig(driver_joint, entry)
+        except ValueError as e:
+            report['invalid'].append((driver_joint, str(e)))
+            continue
+        if not cmds.objExists(driver_joint):
+            report['skipped'].append((driver_joint, 'driver joint not found'))
+            continue
+        entries.append((driver_joint, entry))
+    return entries
+
+def build_push_rigs(entries, report, lean=False):
+    # create_push_joints returns None for rigs that already exist, those keep their settings
+    built = []
+    with axis_cache():
+        for driver_joint, entry in entries:
+            base_joint = create_push_joints(driver_joint, entry['rig_name'], lean)
+            if base_joint is None:
+                report['skipped'].append((driver_joint, f"{entry['rig_name']}_pushBase already exists"))
+                continue
+            built.append((base_joint, entry))
+
+    for base_joint, entry in built:
+        for attr in push_io.SETTINGS:
+            cmds.setAttr(f'{base_joint}.{attr}', entry[attr])
+        report['created'].append(base_joint)
+
+def print_push_import_report(report):
+    for driver_joint, reason in report['invalid']:
+        print(f'invalid push rig entry {driver_joint}: {reason}')
+    for driver_joint, reason in report['skipped']:
+        print(f'skipped push rig for {driver_joint}: {reason}')
+    print(f"imported {len(report['created'])} push rigs, skipped {len(report['skipped'])}, "
+          f"{len(report['invalid'])} invalid")
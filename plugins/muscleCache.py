@@ -0,0 +1,104 @@
+import maya.api.OpenMaya as om
+
+import VT_SimpleMuscle.joint_cache as joint_cache
+
+# muscleCache node, plays back skin joints baked with lib.bake_muscle_cache. Reads the frame
+# closest to its time input from a memory mapped joint cache file and outputs the local
+# translate and rotate of every cached joint, element i of each output is joint i of the cache.
+# load with lib.load_cache_plugin()
+
+
+def maya_useNewAPI():
+    pass
+
+
+class MuscleCacheNode(om.MPxNode):
+    type_name = 'muscleCache'
+    # 0x00000 - 0x7ffff is the range reserved for local plugins
+    type_id = om.MTypeId(0x0007f5a1)
+
+    cacheFile = None
+    time = None
+    # one output array per joint_cache.CHANNELS entry
+    outputs = []
+
+    def __init__(self):
+        super(MuscleCacheNode, self).__init__()
+        self.cache = None
+        self.cache_file = None
+
+    @staticmethod
+    def creator():
+        return MuscleCacheNode()
+
+    @staticmethod
+    def initialize():
+        cls = MuscleCacheNode
+        typed_fn = om.MFnTypedAttribute()
+        cls.cacheFile = typed_fn.create('cacheFile', 'cf', om.MFnData.kString)
+        unit_fn = om.MFnUnitAttribute()
+        cls.time = unit_fn.create('time', 'tm', om.MFnUnitAttribute.kTime, 0.0)
+
+        numeric_fn = om.MFnNumericAttribute()
+        cls.outputs = []
+        for channel in joint_cache.CHANNELS:
+            name = f'out{channel[0].upper()}{channel[1:]}'
+            if channel.startswith('rotate'):
+                attr = unit_fn.create(name, name, om.MFnUnitAttribute.kAngle, 0.0)
+                fn = unit_fn
+            else:
+                attr = numeric_fn.create(name, name, om.MFnNumericData.kFloat, 0.0)
+                fn = numeric_fn
+            fn.array = True
+            fn.usesArrayDataBuilder = True
+            fn.writable = False
+            fn.storable = False
+            cls.outputs.append(attr)
+
+        for attr in [cls.cacheFile, cls.time] + cls.outputs:
+            cls.addAttribute(attr)
+        for attr in cls.outputs:
+            cls.attributeAffects(cls.cacheFile, attr)
+            cls.attributeAffects(cls.time, attr)
+
+    def get_cache(self, file_path):
+        if file_path != self.cache_file:
+            self.cache_file = file_path
+            try:
+                self.cache = joint_cache.open_cache(file_path)
+            except (IOError, ValueError, ImportError) as e:
+                om.MGlobal.displayWarning(f'muscleCache could not read {file_path}: {e}')
+                self.cache = None
+        return self.cache
+
+    def compute(self, plug, data):
+        cls = MuscleCacheNode
+        if not any(plug == attr or (plug.isElement and plug.array() == attr) for attr in cls.outputs):
+            return None
+
+        cache = self.get_cache(data.inputValue(cls.cacheFile).asString())
+        frame = data.inputValue(cls.time).asTime().asUnits(om.MTime.uiUnit())
+        values = joint_cache.frame_values(cache, frame).tolist() if cache is not None else []
+
+        for column, attr in enumerate(cls.outputs):
+            handle = data.outputArrayValue(attr)
+            builder = handle.builder()
+            for index, row in enumerate(values):
+                element = builder.addElement(index)
+                if joint_cache.CHANNELS[column].startswith('rotate'):
+                    element.setMAngle(om.MAngle(row[column], om.MAngle.kDegrees))
+                else:
+                    element.setFloat(row[column])
+            handle.set(builder)
+            handle.setAllClean()
+        data.setClean(plug)
+
+
+def initializePlugin(plugin):
+    fn = om.MFnPlugin(plugin, 'Vertex Theory', '1.0')
+    fn.registerNode(MuscleCacheNode.type_name, MuscleCacheNode.type_id, MuscleCacheNode.creator,
+                    MuscleCacheNode.initialize)
+
+def uninitializePlugin(plugin):
+    fn = om.MFnPlugin(plugin)
+    fn.deregisterNode(MuscleCacheNode.type_id)
@@ -0,0 +1,95 @@
+import maya.api.OpenMaya as om
+
+import VT_SimpleMuscle.flex as flex
+
+# muscleFlex node, one per muscle in place of the per joint remap/condition network.
+# Takes the surface's factor, bulge, sink, triggerLength and the per joint offset factors
+# and outputs the Z offset for every skin joint. The math lives in VT_SimpleMuscle.flex.
+# load with lib.load_flex_plugin()
+
+
+def maya_useNewAPI():
+    pass
+
+
+class MuscleFlexNode(om.MPxNode):
+    type_name = 'muscleFlex'
+    # 0x00000 - 0x7ffff is the range reserved for local plugins
+    type_id = om.MTypeId(0x0007f5a0)
+
+    factor = None
+    bulge = None
+    sink = None
+    triggerLength = None
+    weight = None
+    offset = None
+
+    @staticmethod
+    def creator():
+        return MuscleFlexNode()
+
+    @staticmethod
+    def initialize():
+        fn = om.MFnNumericAttribute()
+        cls = MuscleFlexNode
+
+        cls.factor = fn.create('factor', 'fac', om.MFnNumericData.kFloat, 1.0)
+        fn.keyable = True
+        cls.bulge = fn.create('bulge', 'blg', om.MFnNumericData.kFloat, 0.0)
+        fn.keyable = True
+        cls.sink = fn.create('sink', 'snk', om.MFnNumericData.kFloat, 0.0)
+        fn.keyable = True
+        cls.triggerLength = fn.create('triggerLength', 'trl', om.MFnNumericData.kFloat, 0.6)
+        fn.keyable = True
+        fn.setMin(0.0)
+        fn.setMax(1.0)
+
+        cls.weight = fn.create('weight', 'w', om.MFnNumericData.kFloat, 0.0)
+        fn.array = True
+
+        cls.offset = fn.create('offset', 'off', om.MFnNumericData.kFloat, 0.0)
+        fn.array = True
+        fn.usesArrayDataBuilder = True
+        fn.writable = False
+        fn.storable = False
+
+        for attr in [cls.factor, cls.bulge, cls.sink, cls.triggerLength, cls.weight, cls.offset]:
+            cls.addAttribute(attr)
+        for attr in [cls.factor, cls.bulge, cls.sink, cls.triggerLength, cls.weight]:
+            cls.attributeAffects(attr, cls.offset)
+
+    def compute(self, plug, data):
+        cls = MuscleFlexNode
+        if plug != cls.offset and not (plug.isElement and plug.array() == cls.offset):
+            return None
+
+        factor = data.inputValue(cls.factor).asFloat()
+        bulge = data.inputValue(cls.bulge).asFloat()
+        sink = data.inputValue(cls.sink).asFloat()
+        triggerLength = data.inputValue(cls.triggerLength).asFloat()
+
+        weights = data.inputArrayValue(cls.weight)
+        indices = []
+        values = []
+        for i in range(len(weights)):
+            weights.jumpToPhysicalElement(i)
+            indices.append(weights.elementLogicalIndex())
+            values.append(weights.inputValue().asFloat())
+
+        offsets = data.outputArrayValue(cls.offset)
+        builder = offsets.builder()
+        for index, value in zip(indices, flex.flex_offsets(factor, bulge, sink, triggerLength, values)):
+            builder.addElement(index).setFloat(value)
+        offsets.set(builder)
+        offsets.setAllClean()
+        data.setClean(plug)
+
+
+def initializePlugin(plugin):
+    fn = om.MFnPlugin(plugin, 'Vertex Theory', '1.0')
+    fn.registerNode(MuscleFlexNode.type_name, MuscleFlexNode.type_id, MuscleFlexNode.creator,
+                    MuscleFlexNode.initialize)
+
+def uninitializePlugin(plugin):
+    fn = om.MFnPlugin(plugin)
+    fn.deregisterNode(MuscleFlexNode.type_id)
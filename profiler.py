@@ -0,0 +1,179 @@
+# Per stage build instrumentation. Stage functions in lib and api_builder are wrapped with
+# @stage and record wall time, maya commands issued and nodes created per muscle while a
+# BuildProfiler is active. build_all_rigs keeps the report of its last run in last_report.
+# sort_costs and cost_table format the per muscle playback costs from lib.analyze_rig_costs.
+import contextlib
+import functools
+import json
+import time
+
+# the running profiler, only one build is profiled at a time
+active = None
+# report of the last profiled build
+last_report = None
+
+
+class CommandCounter(object):
+    # stands in for maya.cmds in the profiled modules and counts every command called through it
+
+    def __init__(self, cmds_module):
+        self._cmds = cmds_module
+        self.count = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._cmds, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.count += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+class BuildProfiler(object):
+
+    def __init__(self, modules=()):
+        # modules whose cmds attribute is swapped for a CommandCounter while profiling
+        self.modules = list(modules)
+        self.records = []
+        self.current_muscle = None
+        self.stack = []
+        self.commands = None
+        self.nodes = 0
+        self._callback = None
+
+    def start(self):
+        if self.modules:
+            self.commands = CommandCounter(self.modules[0].cmds)
+            for module in self.modules:
+                module.cmds = self.commands
+        try:
+            import maya.api.OpenMaya as om
+            self._callback = om.MDGMessage.addNodeAddedCallback(self._node_added, 'dependNode')
+        except ImportError:
+            self._callback = None
+
+    def stop(self):
+        if self.commands is not None:
+            for module in self.modules:
+                module.cmds = self.commands._cmds
+        if self._callback is not None:
+            import maya.api.OpenMaya as om
+            om.MMessage.removeCallback(self._callback)
+            self._callback = None
+
+    def _node_added(self, *args):
+        self.nodes += 1
+
+    def counters(self):
+        return (time.perf_counter(), self.commands.count if self.commands else 0, self.nodes)
+
+    @contextlib.contextmanager
+    def muscle(self, name):
+        self.current_muscle = name
+        try:
+            yield
+        finally:
+            self.current_muscle = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = {'muscle': self.current_muscle, 'stage': name,
+                  'parent': self.stack[-1]['stage'] if self.stack else None,
+                  'seconds': 0.0, 'self_seconds': 0.0, 'commands': 0, 'nodes': 0, '_child_seconds': 0.0}
+        self.stack.append(record)
+        start = self.counters()
+        try:
+            yield
+        finally:
+            end = self.counters()
+            self.stack.pop()
+            record['seconds'] = end[0] - start[0]
+            record['commands'] = end[1] - start[1]
+            record['nodes'] = end[2] - start[2]
+            record['self_seconds'] = record['seconds'] - record.pop('_child_seconds')
+            if self.stack:
+                self.stack[-1]['_child_seconds'] += record['seconds']
+            self.records.append(record)
+
+    def report(self):
+        # {'records': [...], 'stages': {stage: totals}, 'muscles': {muscle: {stage: totals}}}
+        stages = {}
+        muscles = {}
+        for record in self.records:
+            for totals in [stages.setdefault(record['stage'], new_totals()),
+                           muscles.setdefault(record['muscle'], {}).setdefault(record['stage'], new_totals())]:
+                totals['calls'] += 1
+                for key in ['seconds', 'self_seconds', 'commands', 'nodes']:
+                    totals[key] += record[key]
+        return {'records': list(self.records), 'stages': stages, 'muscles': muscles}
+
+
+def new_totals():
+    return {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0, 'commands': 0, 'nodes': 0}
+
+@contextlib.contextmanager
+def profiling(profiler):
+    # make profiler the active one for the block, a None profiler turns profiling off
+    global active, last_report
+    if profiler is None or active is not None:
+        yield profiler
+        return
+    active = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        active = None
+        last_report = profiler.report()
+
+@contextlib.contextmanager
+def muscle(name):
+    if active is None:
+        yield
+        return
+    with active.muscle(name):
+        yield
+
+def stage(func):
+    # decorator for a build stage, records nothing unless a profiler is active
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if active is None:
+            return func(*args, **kwargs)
+        with active.stage(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def summary_rows(report=None):
+    # (stage, calls, seconds, self seconds, commands, nodes) sorted by self time
+    report = report or last_report
+    if not report:
+        return []
+    rows = [(name, t['calls'], t['seconds'], t['self_seconds'], t['commands'], t['nodes'])
+            for name, t in report['stages'].items()]
+    return sorted(rows, key=lambda row: row[3], reverse=True)
+
+def summary_table(report=None):
+    lines = [f"{'stage':<28}{'calls':>7}{'total s':>10}{'self s':>10}{'cmds':>8}{'nodes':>8}"]
+    for name, calls, seconds, self_seconds, commands, nodes in summary_rows(report):
+        lines.append(f'{name:<28}{calls:>7}{seconds:>10.3f}{self_seconds:>10.3f}{commands:>8}{nodes:>8}')
+    return '\n'.join(lines)
+
+def write_report(file_path, report=None):
+    with open(file_path, 'w') as json_file:
+        json.dump(report or last_report, json_file, indent=4)
+
+def sort_costs(costs):
+    # rig costs from analyze_rig_costs, slowest first, by node count when nothing was timed
+    return sorted(costs, key=lambda c: (c['seconds'] or 0.0, c['nodes']), reverse=True)
+
+def cost_table(costs):
+    lines = [f"{'muscle':<28}{'fol':>6}{'arc':>6}{'cons':>6}{'flex':>6}{'nodes':>7}{'ms/frame':>10}"]
+    for c in costs:
+        ms = '-' if c['ms_per_frame'] is None else f"{c['ms_per_frame']:.3f}"
+        lines.append(f"{c['muscle']:<28}{c['follicles']:>6}{c['arcLengths']:>6}{c['constraints']:>6}{c['flex']:>6}"
+                     f"{c['nodes']:>7}{ms:>10}")
+    return '\n'.join(lines)
@@ -0,0 +1,117 @@
+# Maya-free reader for push rig json files. Entries are validated and streamed one at a time so
+# large multi character files don't have to be loaded in one go.
+#
+# {"Elbow_L_jnt": {"rig_name": "Elbow_L", "drvStart": 180.0, "drvEnd": 0.0, "posStart": 1.0,
+#                  "posEnd": 2.0, "negStart": -1.0, "negEnd": -2.0}, ...}
+import json
+
+SETTINGS = ['drvStart', 'drvEnd', 'posStart', 'posEnd', 'negStart', 'negEnd']
+CHUNK_SIZE = 1 << 16
+
+
+def validate_push_rig(driver_joint, entry):
+    # returns a clean copy of one entry, raises ValueError if it's bad
+    if not isinstance(driver_joint, str) or not driver_joint:
+        raise ValueError(f'{driver_joint!r} is not a driver joint name')
+    if not isinstance(entry, dict):
+        raise ValueError(f'{driver_joint} entry is not an object')
+    rig_name = entry.get('rig_name')
+    if not isinstance(rig_name, str) or not rig_name:
+        raise ValueError(f'{driver_joint} needs a "rig_name"')
+
+    clean = {'rig_name': rig_name}
+    for key in SETTINGS:
+        value = entry.get(key)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f'{driver_joint} "{key}" should be a number')
+        clean[key] = float(value)
+    return clean
+
+def read_push_rigs(file_path):
+    # every entry of a file validated, returns ([(driver joint, entry)], [(driver joint, reason)])
+    entries = []
+    invalid = []
+    for driver_joint, entry in iter_push_rigs(file_path):
+        try:
+            entries.append((driver_joint, validate_push_rig(driver_joint, entry)))
+        except ValueError as e:
+            invalid.append((driver_joint, str(e)))
+    return entries, invalid
+
+def iter_push_rigs(file_path):
+    # yields (driver joint, entry) pairs from the top level object without reading the whole file
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r') as json_file:
+        reader = StreamReader(json_file)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.decode(decoder)
+            reader.expect(':')
+            value = reader.decode(decoder)
+            yield key, value
+            if reader.next_char() == '}':
+                return
+            reader.back()
+            reader.expect(',')
+
+class StreamReader(object):
+    # just enough of a buffered tokenizer to step through one json object's members
+
+    def __init__(self, file_obj):
+        self.file_obj = file_obj
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        data = self.file_obj.read(CHUNK_SIZE)
+        if not data:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+
+    def skip_space(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self.fill()
+
+    def peek(self):
+        self.skip_space()
+        if self.pos >= len(self.buffer):
+            raise ValueError('unexpected end of push rig file')
+        return self.buffer[self.pos]
+
+    def next_char(self):
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def back(self):
+        self.pos -= 1
+
+    def expect(self, char):
+        found = self.next_char()
+        if found != char:
+            raise ValueError(f'expected "{char}" in push rig file but found "{found}"')
+
+    def decode(self, decoder):
+        self.skip_space()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill()
+                continue
+            # a number at the end of the buffer might continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
@@ -0,0 +1,64 @@
+# Maya-free reader and writer for a rig description, one json document with every muscle guide,
+# the tuned settings of its built surface and every push rig. lib.export_rig_description and
+# lib.build_from_rig_description use it.
+#
+# {"format": "VT_SimpleMuscle.rig", "version": 1,
+#  "guides": [guide entries as in guide_io],
+#  "surfaces": {"Bicep_L": {"bulge": 1.2, "sink": 0.6, "triggerLength": 0.6}, ...},
+#  "push_rigs": {driver joint: push rig entry as in push_io, ...}}
+import json
+
+import VT_SimpleMuscle.guide_io as guide_io
+import VT_SimpleMuscle.push_io as push_io
+
+FORMAT = 'VT_SimpleMuscle.rig'
+VERSION = 1
+SURFACE_SETTINGS = ['bulge', 'sink', 'triggerLength']
+
+
+def write_rig_description(file_path, guides, surfaces, push_rigs):
+    document = {'format': FORMAT, 'version': VERSION,
+                'guides': [guide_io.validate_guide(g) for g in guides],
+                'surfaces': dict((name, validate_surface(name, s)) for name, s in surfaces.items()),
+                'push_rigs': dict((driver, push_io.validate_push_rig(driver, p)) for driver, p in push_rigs.items())}
+    with open(file_path, 'w') as json_file:
+        json.dump(document, json_file, indent=4, sort_keys=True)
+
+def read_rig_description(file_path):
+    with open(file_path, 'r') as json_file:
+        document = json.load(json_file)
+    return load_rig_description(document)
+
+def load_rig_description(document):
+    # validates the whole document, raises ValueError on the first bad entry
+    if not isinstance(document, dict) or document.get('format') != FORMAT:
+        raise ValueError(f'not a {FORMAT} document')
+    version = document.get('version', 0)
+    if not isinstance(version, int) or isinstance(version, bool):
+        raise ValueError(f'{FORMAT} version {version!r} should be an int')
+    if version > VERSION:
+        raise ValueError(f'{FORMAT} version {version} is newer than this tool reads ({VERSION})')
+    for key in ['surfaces', 'push_rigs']:
+        if not isinstance(document.get(key, {}), dict):
+            raise ValueError(f'{FORMAT} "{key}" should be an object')
+
+    guides = [guide_io.validate_guide(g) for g in document.get('guides', [])]
+    names = set(g['name'] for g in guides)
+    surfaces = {}
+    for name, settings in document.get('surfaces', {}).items():
+        if name not in names:
+            raise ValueError(f'surface settings for {name} have no guide')
+        surfaces[name] = validate_surface(name, settings)
+    push_rigs = dict((driver, push_io.validate_push_rig(driver, p)) for driver, p in document.get('push_rigs', {}).items())
+    return {'guides': guides, 'surfaces': surfaces, 'push_rigs': push_rigs}
+
+def validate_surface(name, settings):
+    if not isinstance(settings, dict):
+        raise ValueError(f'surface settings for {name} are not an object')
+    clean = {}
+    for key in SURFACE_SETTINGS:
+        value = settings.get(key)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f'surface settings for {name} "{key}" should be a number')
+        clean[key] = float(value)
+    return clean
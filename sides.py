@@ -0,0 +1,67 @@
+# Left/right name pairing for the mirror functions. A side token only counts where it is a whole
+# name segment, so "Bicep_L" and "Bicep_L_End" are left side but "Arm_Lower" and "Lat_M" aren't.
+# A suffix token can be followed by the number maya appends to clashing names, "elbow_L1" pairs
+# with "elbow_R1".
+# Tokens that start with _ are suffix tokens and tokens that end with _ are prefix tokens.
+import re
+
+DEFAULT_TOKENS = [('_L', '_R'), ('_l', '_r')]
+# characters that can end a name segment, besides the end of the name
+DELIMITERS = '_|.:'
+
+
+class SideRules(object):
+
+    def __init__(self, tokens=None):
+        self.tokens = list(tokens or DEFAULT_TOKENS)
+        self.patterns = [(self.token_pattern(left), self.token_pattern(right), left, right)
+                         for left, right in self.tokens]
+
+    @staticmethod
+    def token_pattern(token):
+        pattern = re.escape(token)
+        if token.startswith('_'):
+            pattern += f'(?=\\d*(?:$|[{re.escape(DELIMITERS)}]))'
+        elif token.endswith('_'):
+            pattern = f'(?:^|(?<=[{re.escape(DELIMITERS)}]))' + pattern
+        return re.compile(pattern)
+
+    def side(self, name):
+        # 'L', 'R' or None
+        for left, right, _, _ in self.patterns:
+            if left.search(name):
+                return 'L'
+            if right.search(name):
+                return 'R'
+        return None
+
+    def is_left(self, name):
+        return self.side(name) == 'L'
+
+    def mirror(self, name):
+        # the other side's name, or the name unchanged if it has no side
+        for left, right, left_token, right_token in self.patterns:
+            if left.search(name):
+                return left.sub(right_token, name)
+            if right.search(name):
+                return right.sub(left_token, name)
+        return name
+
+    def tokens_for(self, name):
+        # the (left, right) token pair a name uses, or None
+        for left, right, left_token, right_token in self.patterns:
+            if left.search(name) or right.search(name):
+                return (left_token, right_token)
+        return None
+
+    def pair_map(self, names):
+        # {left name: right name} for every left side name
+        return dict((name, self.mirror(name)) for name in names if self.is_left(name))
+
+
+DEFAULT_RULES = SideRules()
+
+def get_rules(rules=None):
+    if rules is None:
+        return DEFAULT_RULES
+    return rules
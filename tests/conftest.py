@@ -0,0 +1,14 @@
+# the checkout is the VT_SimpleMuscle package whatever its folder is called, import it under that
+# name so the tests use the same imports as the tool
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'VT_SimpleMuscle' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('VT_SimpleMuscle', os.path.join(ROOT, '__init__.py'),
+                                                  submodule_search_locations=[ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules['VT_SimpleMuscle'] = package
+    spec.loader.exec_module(package)
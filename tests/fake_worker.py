@@ -0,0 +1,31 @@
+# stands in for batch.py's mayapy worker, run as  python fake_worker.py --worker <job.json> <result.json>
+# What it does depends on the job's scene name: error.ma reports an error, timeout.ma never
+# finishes, crash.ma exits without a result and anything else builds 3 muscles
+import json
+import os
+import sys
+import time
+
+
+def main(args):
+    job_path, result_path = args[args.index('--worker') + 1:][:2]
+    with open(job_path, 'r') as json_file:
+        job = json.load(json_file)
+    name = os.path.basename(job.get('scene', ''))
+
+    if name == 'timeout.ma':
+        time.sleep(60)
+    if name == 'crash.ma':
+        sys.stderr.write('fake worker crashed\n')
+        return 3
+
+    result = {'open_seconds': 0.0, 'muscles': 3, 'timings': [['muscle_L', 0.1]] * 3}
+    if name == 'error.ma':
+        result = {'error': 'Traceback (most recent call last):\nRuntimeError: fake build error'}
+    with open(result_path, 'w') as json_file:
+        json.dump(result, json_file)
+    return 1 if result.get('error') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
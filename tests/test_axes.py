@@ -0,0 +1,69 @@
+import pytest
+
+import VT_SimpleMuscle.axes as axes
+
+
+def assert_matrix(a, b):
+    for row_a, row_b in zip(a, b):
+        assert row_a == pytest.approx(row_b, abs=1e-9)
+
+def test_joint_local_rotation_default():
+    assert axes.joint_local_rotation((0, 0, 0)) == pytest.approx([0, 0, 0], abs=1e-9)
+    assert axes.joint_local_rotation((30, 0, 20)) == pytest.approx([30, 0, 20], abs=1e-9)
+
+def test_joint_local_rotation_joint_orient():
+    # rotations about the same axis add up
+    assert axes.joint_local_rotation((0, 0, 30), jointOrient=(0, 0, 45)) == pytest.approx([0, 0, 75], abs=1e-9)
+    assert axes.joint_local_rotation((5, 0, 0), jointOrient=(0, -70, 0)) == pytest.approx([5, -70, 0], abs=1e-9)
+
+def test_joint_local_rotation_rotate_axis():
+    # rotateAxis comes first, Rx(-90) * Rz(10) is xyz order already
+    assert axes.joint_local_rotation((0, 0, 10), rotateAxis=(-90, 0, 0)) == pytest.approx([-90, 0, 10], abs=1e-9)
+    # a rotateAxis about Z turns a Y rotate into an X rotation in the joint's frame
+    assert axes.joint_local_rotation((0, 40, 0), rotateAxis=(0, 0, 90), rotateOrder=2) == \
+        pytest.approx([40, 0, 90], abs=1e-9)
+
+def test_joint_local_rotation_rotate_order():
+    # zyx applies Z first, Rz * Rx, which isn't the same rotation as xyz
+    rotation = axes.joint_local_rotation((30, 0, 20), rotateOrder=5)
+    assert rotation != pytest.approx([30, 0, 20], abs=1e-3)
+    assert_matrix(axes.euler_matrix(rotation), axes.multiply(axes.axis_matrix('z', 20), axes.axis_matrix('x', 30)))
+    assert axes.joint_local_rotation((30, 0, 20), rotateOrder='zyx') == pytest.approx(rotation)
+
+@pytest.mark.parametrize('order', range(len(axes.ROTATE_ORDERS)))
+def test_joint_local_rotation_single_axis_any_order(order):
+    assert axes.joint_local_rotation((0, 40, 0), rotateOrder=order) == pytest.approx([0, 40, 0], abs=1e-9)
+
+def test_joint_local_rotation_all():
+    rotation = axes.joint_local_rotation((10, 20, 30), (0, 0, 15), (5, 0, 0), 3)
+    expected = axes.multiply(axes.multiply(axes.euler_matrix((5, 0, 0)), axes.euler_matrix((10, 20, 30), 'xzy')),
+                             axes.euler_matrix((0, 0, 15)))
+    assert_matrix(axes.euler_matrix(rotation), expected)
+
+@pytest.mark.parametrize('kwargs, axis', [
+    (dict(rotate=(0, 0, 35)), 'Z'),
+    (dict(rotate=(-50, 10, 0)), 'X'),
+    (dict(rotate=(5, 0, 0), jointOrient=(0, -70, 0)), 'Y'),
+    (dict(rotate=(0, 10, 0), rotateAxis=(0, 0, 50)), 'Z'),
+    (dict(rotate=(0, 45, 0), rotateOrder=3), 'Y'),
+    (dict(rotate=(30, 0, 20), rotateOrder=5), 'X'),
+])
+def test_hinge_axis(kwargs, axis):
+    assert axes.hinge_axis(**kwargs) == axis
+
+@pytest.mark.parametrize('translate, axis', [
+    ((10, 0, 0), 'X'),
+    ((0, -12, 0.5), 'Y'),
+    ((0.1, 0.2, -3), 'Z'),
+])
+def test_aim_axis(translate, axis):
+    assert axes.aim_axis(translate) == axis
+
+@pytest.mark.parametrize('aim, hinge, push', [
+    ('X', 'Z', 'Y'),
+    ('Z', 'X', 'Y'),
+    ('X', 'Y', 'Z'),
+    ('Y', 'Z', 'X'),
+])
+def test_push_axis(aim, hinge, push):
+    assert axes.push_axis(aim, hinge) == push
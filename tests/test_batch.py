@@ -0,0 +1,60 @@
+# the batch scheduler against tests/fake_worker.py run with this python
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+import VT_SimpleMuscle.batch as batch
+
+FAKE_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_worker.py')
+
+
+def run(jobs, **kwargs):
+    return batch.run_manifest(jobs, 2, sys.executable, FAKE_WORKER, **kwargs)
+
+def test_ok_job():
+    reports = run([{'scene': '/scenes/char.ma', 'output': '/scenes/char_rig.ma'}])
+    assert reports[0]['status'] == 'ok'
+    assert reports[0]['error'] is None
+    assert reports[0]['result']['muscles'] == 3
+
+def test_error_job():
+    reports = run([{'scene': '/scenes/error.ma'}])
+    assert reports[0]['status'] == 'error'
+    assert 'fake build error' in reports[0]['error']
+
+def test_crashed_job():
+    reports = run([{'scene': '/scenes/crash.ma'}])
+    assert reports[0]['status'] == 'error'
+    assert reports[0]['result'] is None
+    assert 'fake worker crashed' in reports[0]['error']
+
+def test_timeout_job():
+    reports = run([{'scene': '/scenes/timeout.ma'}], timeout=1)
+    assert reports[0]['status'] == 'error'
+    assert 'timed out' in reports[0]['error']
+
+def test_reports_in_job_order():
+    scenes = ['/scenes/a.ma', '/scenes/error.ma', '/scenes/b.ma', '/scenes/timeout.ma']
+    reports = run([{'scene': scene} for scene in scenes], timeout=2)
+    assert [r['job']['scene'] for r in reports] == scenes
+    assert [r['status'] for r in reports] == ['ok', 'error', 'ok', 'error']
+
+def test_temp_dir_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    run([{'scene': '/scenes/char.ma'}])
+    assert os.listdir(tmp_path) == []
+
+def test_load_manifest(tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({'jobs': [{'scene': 'char.ma', 'output': 'out/char_rig.ma', 'extra': 'x'}]}))
+    jobs = batch.load_manifest(str(manifest))
+    assert jobs == [{'scene': str(tmp_path / 'char.ma'), 'output': str(tmp_path / 'out' / 'char_rig.ma')}]
+
+def test_load_manifest_needs_a_scene(tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps([{'output': 'char_rig.ma'}]))
+    with pytest.raises(ValueError, match='needs a scene'):
+        batch.load_manifest(str(manifest))
@@ -0,0 +1,42 @@
+# rig construction against the fake maya.cmds at 1 to 1000 muscles, timed with pytest-benchmark.
+# The command counts are what fails a run, the times are only reported
+#
+#   python -m pytest tests/test_benchmark.py --benchmark-only
+import importlib.util
+
+import pytest
+
+import VT_SimpleMuscle.benchmark as bench
+
+SIZES = [1, 10, 100, 1000]
+# (commands per muscle, fixed commands) each benchmark may run
+COMMAND_LIMITS = {
+    'setup': (219, 1),
+    'build_all_rigs': (241, 4),
+    'create_push_joints': (96, 1),
+    'create_push_joints_lean': (89, 0),
+    'mirror_guides': (6, 3),
+    'mirror_rig_settings': (3, 3),
+    'mirror_push_rigs': (112, 3),
+    'mirror_all_push_rig_settings': (15, 3),
+}
+
+
+def test_every_benchmark_has_a_limit():
+    assert sorted(name for name, _, _ in bench.BENCHMARKS) == sorted(COMMAND_LIMITS)
+
+@pytest.mark.skipif(importlib.util.find_spec('pytest_benchmark') is None, reason='needs pytest-benchmark')
+@pytest.mark.parametrize('size', SIZES)
+@pytest.mark.parametrize('name, prepare, run', bench.BENCHMARKS, ids=[name for name, _, _ in bench.BENCHMARKS])
+def test_commands(benchmark, name, prepare, run, size):
+    cmds = bench.cmds
+
+    def setup():
+        cmds.reset()
+        state = prepare(size)
+        cmds.calls.clear()
+        return (size, state), {}
+
+    benchmark.pedantic(run, setup=setup, rounds=1)
+    per_muscle, fixed = COMMAND_LIMITS[name]
+    assert cmds.command_count <= per_muscle * size + fixed, dict(cmds.calls)
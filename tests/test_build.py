@@ -0,0 +1,79 @@
+# building rigs on the fake maya.cmds
+import VT_SimpleMuscle.benchmark as bench
+
+
+def build_twice(**kwargs):
+    bench.cmds.reset()
+    bench.make_skeleton()
+    bench.make_guides(1)
+    bench.lib.build_all_rigs(batch=False, profile=False)
+    bench.lib.create_guide('extra_L', 'spine', 3)
+    return bench.lib.build_all_rigs(batch=False, profile=False, **kwargs)
+
+def test_build_guide_with_existing_rig():
+    # a second rig gets maya's next free name and the guide hash goes on that rig
+    timings = build_twice()
+    assert [joint for joint, seconds in timings] == ['muscle0_L', 'extra_L']
+    cmds = bench.cmds
+    assert cmds.objExists('muscle0_L_rig1')
+    assert cmds.getAttr('muscle0_L_rig1.guideHash') == bench.lib.guide_hash('muscle0_L')
+    assert cmds.getAttr('extra_L_rig.guideHash') == bench.lib.guide_hash('extra_L')
+
+def test_build_skip_built():
+    timings = build_twice(skip_built=True)
+    assert [joint for joint, seconds in timings] == ['extra_L']
+    assert not bench.cmds.objExists('muscle0_L_rig1')
+
+def test_analyze_rig_costs_leaves_the_scene_alone():
+    bench.cmds.reset()
+    bench.make_skeleton()
+    bench.make_guides(2)
+    bench.lib.build_all_rigs(batch=False, profile=False)
+    cmds = bench.cmds
+    cmds.setAttr('muscle0_L_follicle_1.nodeState', 2)
+    cmds.currentTime(7)
+    states = []
+    real_undo_info = cmds.undoInfo
+
+    def undo_info(**kwargs):
+        if 'stateWithoutFlush' in kwargs:
+            states.append(kwargs['stateWithoutFlush'])
+        return real_undo_info(**kwargs)
+
+    cmds.undoInfo = undo_info
+    try:
+        costs = bench.lib.analyze_rig_costs(start=1, end=3)
+    finally:
+        del cmds.undoInfo
+    assert sorted(c['rig'] for c in costs) == ['muscle0_L_rig', 'muscle1_L_rig']
+    # the nodeState toggles happen with the undo queue off, then it is turned back on
+    assert states == [False, True]
+    assert cmds.undo_state
+    assert cmds.getAttr('muscle0_L_follicle_1.nodeState') == 2
+    assert cmds.currentTime(q=True) == 7
+
+def offset_sources(cmds, rig):
+    return [cmds.listConnections(f'{j}_parentConstraint1.target[0].targetOffsetTranslateZ', s=True, d=False, p=True)
+            for j in bench.lib.get_rig_nodes(rig)['skin_joints']]
+
+def test_lod_rest_offsets():
+    bench.cmds.reset()
+    bench.make_skeleton()
+    bench.make_guides(1)
+    bench.lib.build_all_rigs(batch=False, profile=False)
+    cmds = bench.cmds
+    rig = 'muscle0_L_rig'
+    connected = offset_sources(cmds, rig)
+    assert all(connected)
+    cmds.setAttr('muscle0_L_1_skin_jnt_parentConstraint1.target[0].targetOffsetTranslateZ', 0.7)
+
+    for level in ['reduced', 'off']:
+        bench.lib.set_muscle_lod(level)
+        # frozen at the rest offset, not the last evaluated one
+        assert offset_sources(cmds, rig) == [None] * len(connected)
+        assert cmds.getAttr('muscle0_L_1_skin_jnt_parentConstraint1.target[0].targetOffsetTranslateZ') == 0.0
+        assert bench.lib.get_muscle_lod(rig) == level
+
+    bench.lib.set_muscle_lod('full')
+    assert offset_sources(cmds, rig) == connected
+    assert all(cmds.getAttr(f'{n}.nodeState') == 0 for n in bench.lib.get_rig_nodes(rig)['constraints'])
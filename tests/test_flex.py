@@ -0,0 +1,152 @@
+import pytest
+
+import VT_SimpleMuscle.flex as flex
+
+# the old animCurveTA keyed at frames 0, 0.5 and 1 with values 0, 1, 0 (degrees), a flat spline
+# tangent on the middle key and +/-2.7 degree tangents on the end keys. Maya evaluates each
+# segment as a bezier with handles a third of the segment along the tangents, these are that
+# bezier's values
+OFFSET_CURVE = [
+    (0.0, 0.0),
+    (0.1, 0.10701816338415879),
+    (0.25, 0.5029474251798425),
+    (0.5, 1.0),
+    (0.75, 0.5029474251798425),
+    (0.9, 0.1070181633841587),
+    (1.0, 0.0),
+]
+
+
+@pytest.mark.parametrize('u, weight', OFFSET_CURVE)
+def test_offset_weight(u, weight):
+    assert flex.offset_weight(u) == pytest.approx(weight, abs=1e-9)
+
+@pytest.mark.parametrize('u', [0.0, 0.05, 0.1, 0.2, 0.25, 1 / 3.0, 0.4, 0.49])
+def test_offset_weight_symmetry(u):
+    assert flex.offset_weight(u) == pytest.approx(flex.offset_weight(1.0 - u), abs=1e-12)
+
+def test_offset_weight_end_tangent():
+    # the 2.7 degree tangent is a slope of tan(2.7 degrees) value units per frame
+    step = 1e-6
+    assert flex.offset_weight(step) / step == pytest.approx(0.04716, abs=1e-4)
+
+def test_offset_weight_clamped():
+    assert flex.offset_weight(-0.5) == 0.0
+    assert flex.offset_weight(1.5) == 0.0
+
+def test_offset_weights():
+    positions = [u for u, weight in OFFSET_CURVE]
+    assert flex.offset_weights(positions) == pytest.approx([weight for u, weight in OFFSET_CURVE], abs=1e-9)
+
+# hand worked remapValue/condition results for bulge 2, sink 1 and a joint weight of 0.5. The
+# condition picks the above 1.0 remap (inputs 1 to 1 + triggerLength, outputs 0 to -sink * weight)
+# when factor >= 1 and the below remap (inputs triggerLength to 1, outputs bulge * weight to 0)
+# otherwise
+@pytest.mark.parametrize('factor, triggerLength, offset', [
+    # stretched
+    (1.3, 0.6, -0.25),
+    (1.6, 0.6, -0.5),
+    (2.0, 0.6, -0.5),
+    (1.15, 0.6, -0.125),
+    # exactly 1.0 is the above remap at its input min
+    (1.0, 0.6, 0.0),
+    # compressed
+    (0.8, 0.6, 0.5),
+    (0.9, 0.6, 0.25),
+    (0.6, 0.6, 1.0),
+    (0.3, 0.6, 1.0),
+    (0.0, 0.6, 1.0),
+    # triggerLength 0 collapses the above remap, any stretch is the full sink
+    (1.0, 0.0, -0.5),
+    (1.01, 0.0, -0.5),
+    (0.5, 0.0, 0.5),
+    # triggerLength 1 collapses the below remap, any compression is the full bulge
+    (0.99, 1.0, 1.0),
+    (1.5, 1.0, -0.25),
+    (2.0, 1.0, -0.5),
+])
+def test_flex_offset(factor, triggerLength, offset):
+    assert flex.flex_offset(factor, 2.0, 1.0, triggerLength, 0.5) == pytest.approx(offset, abs=1e-12)
+
+def test_flex_offset_weight():
+    # the weight scales the bulge and sink, a 0 weight never moves
+    assert flex.flex_offset(0.8, 2.0, 1.0, 0.6, 1.0) == pytest.approx(1.0)
+    assert flex.flex_offset(1.3, 2.0, 1.0, 0.6, 1.0) == pytest.approx(-0.5)
+    assert flex.flex_offset(0.3, 2.0, 1.0, 0.6, 0.0) == 0.0
+    assert flex.flex_offset(1.9, 2.0, 1.0, 0.6, 0.0) == 0.0
+
+def test_flex_offsets():
+    assert flex.flex_offsets(0.8, 2.0, 1.0, 0.6, [0.0, 0.5, 1.0]) == pytest.approx([0.0, 0.5, 1.0])
+
+@pytest.mark.parametrize('value, offset', [(-1.0, 10.0), (0.0, 10.0), (0.25, 15.0), (1.0, 30.0), (3.0, 30.0)])
+def test_remap(value, offset):
+    assert flex.remap(value, 0.0, 1.0, 10.0, 30.0) == pytest.approx(offset)
+
+######################################
+# the numpy versions against the scalar ones
+
+needs_numpy = pytest.mark.skipif(flex.np is None, reason='needs numpy')
+
+FACTORS = [0.0, 0.3, 0.6, 0.8, 0.99, 1.0, 1.01, 1.3, 1.6, 2.5]
+
+
+@needs_numpy
+@pytest.mark.parametrize('input_min, input_max, output_min, output_max', [
+    (0.0, 1.0, 10.0, 30.0),
+    (1.0, 1.6, 0.0, -0.5),
+    (0.6, 1.0, 1.0, 0.0),
+    (1.0, 1.0, 0.0, -0.5),
+])
+def test_remap_array(input_min, input_max, output_min, output_max):
+    expected = [flex.remap(f, input_min, input_max, output_min, output_max) for f in FACTORS]
+    result = flex.remap_array(FACTORS, input_min, input_max, output_min, output_max)
+    assert result.tolist() == pytest.approx(expected, abs=1e-12)
+
+@needs_numpy
+@pytest.mark.parametrize('frames, muscles, joints', [(1, 1, 1), (4, 3, 5), (10, 2, 3)])
+def test_flex_offsets_array(frames, muscles, joints):
+    np = flex.np
+    rng = np.random.default_rng(frames * 100 + muscles * 10 + joints)
+    factor = rng.uniform(0.0, 2.5, (frames, muscles))
+    factor[0, 0] = 1.0
+    bulge = rng.uniform(0.0, 3.0, muscles)
+    sink = rng.uniform(0.0, 3.0, muscles)
+    # the triggerLength edges are in there too
+    triggerLength = np.resize([0.6, 0.0, 1.0, 0.25], muscles)
+    weights = rng.uniform(0.0, 1.0, (muscles, joints))
+    # muscles with fewer joints are padded with 0
+    weights[-1, joints // 2:] = 0.0
+
+    result = flex.flex_offsets_array(factor, bulge, sink, triggerLength, weights)
+    assert result.shape == (frames, muscles, joints)
+    for f in range(frames):
+        for m in range(muscles):
+            expected = flex.flex_offsets(factor[f, m], bulge[m], sink[m], triggerLength[m], weights[m])
+            assert result[f, m].tolist() == pytest.approx(expected, abs=1e-12)
+
+@needs_numpy
+def test_flex_offsets_array_one_muscle():
+    # one muscle's (joints,) weights against a (frames,) factor
+    weights = [0.0, 0.5, 1.0]
+    result = flex.flex_offsets_array(FACTORS, 2.0, 1.0, 0.6, weights)
+    assert result.shape == (len(FACTORS), 3)
+    for row, factor in zip(result.tolist(), FACTORS):
+        assert row == pytest.approx(flex.flex_offsets(factor, 2.0, 1.0, 0.6, weights), abs=1e-12)
+
+@needs_numpy
+@pytest.mark.parametrize('positions', [
+    [u for u, weight in OFFSET_CURVE],
+    [-0.5, 0.2, 0.5, 0.8, 1.5],
+    [[0.25, 0.5, 0.75], [0.1, 0.3, 0.0]],
+])
+def test_offset_weights_array(positions):
+    np = flex.np
+    result = flex.offset_weights_array(positions)
+    expected = np.vectorize(flex.offset_weight)(np.asarray(positions, dtype=float))
+    assert result.shape == expected.shape
+    assert result.ravel().tolist() == pytest.approx(expected.ravel().tolist(), abs=1e-12)
+
+@needs_numpy
+def test_stretch_factors():
+    result = flex.stretch_factors([[10.0, 12.0], [8.0, 9.0]], [10.0, 12.0], 2.0)
+    assert result.tolist() == [[0.5, 0.5], [0.4, 0.375]]
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+import VT_SimpleMuscle.guide_io as guide_io
+
+
+def guide(name='Bicep_L', **kwargs):
+    data = {'name': name, 'matrix': [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 2.5, 10, -1, 1],
+            'end': f'{name}_End', 'endTranslate': [0, 4.25, 0]}
+    data.update(kwargs)
+    return data
+
+def document(guides, **kwargs):
+    data = {'format': guide_io.FORMAT, 'version': guide_io.VERSION, 'guides': guides}
+    data.update(kwargs)
+    return data
+
+
+def test_round_trip(tmp_path):
+    guides = [
+        guide(),
+        guide('Tricep_R', parent='Arm_R', numJoints=5, surfType=1, bulge=0.5, sink=-2, triggerLength=3.0),
+    ]
+    file_path = str(tmp_path / 'guides.json')
+    guide_io.write_guides(file_path, guides)
+    read = guide_io.read_guides(file_path)
+
+    assert [g['name'] for g in read] == ['Bicep_L', 'Tricep_R']
+    assert read == [guide_io.validate_guide(g) for g in guides]
+    # defaults filled in and numbers come back as floats
+    assert read[0]['parent'] == '' and read[0]['numJoints'] == 1 and read[0]['surfType'] == 0
+    assert read[0]['matrix'][12:15] == [2.5, 10.0, -1.0]
+    assert all(isinstance(v, float) for v in read[0]['matrix'] + read[0]['endTranslate'])
+    assert read[1]['sink'] == -2.0 and isinstance(read[1]['sink'], float)
+    # and writing what was read gives the same file
+    again = str(tmp_path / 'again.json')
+    guide_io.write_guides(again, read)
+    with open(file_path) as a, open(again) as b:
+        assert a.read() == b.read()
+
+def test_written_document(tmp_path):
+    file_path = str(tmp_path / 'guides.json')
+    guide_io.write_guides(file_path, [])
+    with open(file_path) as json_file:
+        assert json.load(json_file) == document([])
+
+def test_older_and_missing_versions_load():
+    assert guide_io.load_guides(document([guide()], version=0))[0]['name'] == 'Bicep_L'
+    data = document([guide()])
+    del data['version']
+    assert len(guide_io.load_guides(data)) == 1
+    assert guide_io.load_guides({'format': guide_io.FORMAT}) == []
+
+@pytest.mark.parametrize('data, message', [
+    (document([], version=guide_io.VERSION + 1), 'is newer than this tool reads'),
+    (document([], version='1'), 'should be an int'),
+    (document([], version=1.5), 'should be an int'),
+    (document([], version=None), 'should be an int'),
+    (document([], format='something.else'), 'not a VT_SimpleMuscle.guides document'),
+    ([guide()], 'not a VT_SimpleMuscle.guides document'),
+])
+def test_rejected_documents(data, message):
+    with pytest.raises(ValueError, match=message):
+        guide_io.load_guides(data)
+
+@pytest.mark.parametrize('entry, message', [
+    ('Bicep_L', 'is not an object'),
+    ({'matrix': [0] * 16, 'end': 'a', 'endTranslate': [0, 0, 0]}, 'missing "name"'),
+    (guide(end=None), '"end" should be a str'),
+    (guide(matrix=[0] * 15), '"matrix" should be 16 numbers'),
+    (guide(matrix=[0] * 15 + ['1']), '"matrix" should be 16 numbers'),
+    (guide(endTranslate=[0, True, 0]), '"endTranslate" should be 3 numbers'),
+    (guide(endTranslate=(0, 1, 0)), '"endTranslate" should be a list'),
+    (guide(numJoints=2.0), '"numJoints" should be a int'),
+    (guide(numJoints=True), '"numJoints" should be a int'),
+    (guide(numJoints=-1), '"numJoints" should not be negative'),
+    (guide(surfType=2), '"surfType" should be 0'),
+    (guide(bulge='0.5'), '"bulge" should be a float'),
+    (guide(sink=False), '"sink" should be a float'),
+])
+def test_bad_entries(entry, message):
+    with pytest.raises(ValueError, match=message):
+        guide_io.validate_guide(entry)
+    with pytest.raises(ValueError, match=message):
+        guide_io.load_guides(document([guide('Good_L'), entry]))
+
+def test_write_rejects_bad_entries(tmp_path):
+    file_path = tmp_path / 'guides.json'
+    with pytest.raises(ValueError):
+        guide_io.write_guides(str(file_path), [guide(), guide(surfType=3)])
+    assert not file_path.exists()
@@ -0,0 +1,32 @@
+# mirroring surface settings through the fake maya.api.OpenMaya
+import VT_SimpleMuscle.benchmark as bench
+
+
+def test_mirror_rig_settings_values():
+    bench.cmds.reset()
+    bench.prepare_mirror_rig_settings(2)
+    report = bench.lib.mirror_rig_settings()
+    assert report['unmatched'] == []
+    assert bench.cmds.getAttr('muscle1_R_surface.bulge') == 2.0
+
+def test_mirror_rig_settings_without_undo():
+    bench.cmds.reset()
+    bench.prepare_mirror_rig_settings(2)
+    bench.cmds.delete('muscle1_R_surface')
+    bench.cmds.calls.clear()
+    report = bench.lib.mirror_rig_settings(undoable=False)
+    assert report['synced'] == [('muscle0_L_surface', 'muscle0_R_surface')]
+    assert report['unmatched'][0][:2] == ('muscle1_L_surface', 'muscle1_R_surface')
+    assert bench.cmds.getAttr('muscle0_R_surface.bulge') == 2.0
+    # the modifier writes the values, no setAttr
+    assert bench.cmds.calls['setAttr'] == 0
+
+def test_mirror_rig_settings_without_guides():
+    # guides are usually deleted once the rigs are built
+    bench.cmds.reset()
+    bench.prepare_mirror_rig_settings(2)
+    bench.cmds.delete('muscle0_L', 'muscle0_R', 'muscle1_L', 'muscle1_R')
+    report = bench.lib.mirror_rig_settings()
+    assert sorted(report['synced']) == [('muscle0_L_surface', 'muscle0_R_surface'),
+                                        ('muscle1_L_surface', 'muscle1_R_surface')]
+    assert bench.cmds.getAttr('muscle1_R_surface.bulge') == 2.0
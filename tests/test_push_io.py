@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+import VT_SimpleMuscle.push_io as push_io
+
+
+def entry(rig_name, scale=1.0):
+    return {'rig_name': rig_name, 'drvStart': 180.0 * scale, 'drvEnd': 0.0, 'posStart': 1.0,
+            'posEnd': 2.5e-3, 'negStart': -1, 'negEnd': -12345.678}
+
+DATA = {
+    'Elbow_L_jnt': entry('Elbow_L'),
+    'Elbow_R_jnt': entry('Elbow_R', -1.0),
+    'char:Knee_L_jnt': dict(entry('char:Knee_L'), note='é "quoted" \\ {not: a brace}'),
+}
+
+
+def write(tmp_path, text):
+    file_path = tmp_path / 'push.json'
+    file_path.write_text(text, encoding='utf-8')
+    return str(file_path)
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize('indent', [None, 4])
+def test_iter_push_rigs_across_chunks(tmp_path, monkeypatch, chunk_size, indent):
+    # every token ends up split across reads somewhere with the small chunk sizes
+    monkeypatch.setattr(push_io, 'CHUNK_SIZE', chunk_size)
+    file_path = write(tmp_path, json.dumps(DATA, indent=indent))
+    assert list(push_io.iter_push_rigs(file_path)) == list(DATA.items())
+
+@pytest.mark.parametrize('text', ['{}', '  { \n }  ', '{}\n'])
+def test_iter_push_rigs_empty(tmp_path, monkeypatch, text):
+    monkeypatch.setattr(push_io, 'CHUNK_SIZE', 1)
+    assert list(push_io.iter_push_rigs(write(tmp_path, text))) == []
+
+@pytest.mark.parametrize('text', [
+    '',
+    '[]',
+    '{"Elbow_L_jnt" {"rig_name": "Elbow_L"}}',
+    '{"Elbow_L_jnt": {"rig_name": "Elbow_L"},}',
+    '{"Elbow_L_jnt": {"rig_name": "Elbow_L"} "Knee_L_jnt": {}}',
+    '{"Elbow_L_jnt": {"rig_name": "Elbow_L"',
+    '{"Elbow_L_jnt": {"rig_name": "Elbow_L"}',
+    '{"Elbow_L_jnt": nope}',
+])
+def test_iter_push_rigs_malformed(tmp_path, monkeypatch, text):
+    monkeypatch.setattr(push_io, 'CHUNK_SIZE', 4)
+    with pytest.raises(ValueError):
+        list(push_io.iter_push_rigs(write(tmp_path, text)))
+
+def test_read_push_rigs_reports_invalid_entries(tmp_path):
+    data = {
+        'Elbow_L_jnt': entry('Elbow_L'),
+        'no_name_jnt': dict(entry(''), rig_name=''),
+        'text_jnt': dict(entry('text'), drvEnd='0'),
+        'bool_jnt': dict(entry('bool'), posStart=True),
+        'missing_jnt': {'rig_name': 'missing', 'drvStart': 1.0},
+        'list_jnt': [1, 2],
+        '': entry('empty'),
+        'Knee_L_jnt': entry('Knee_L'),
+    }
+    entries, invalid = push_io.read_push_rigs(write(tmp_path, json.dumps(data)))
+    assert [driver_joint for driver_joint, e in entries] == ['Elbow_L_jnt', 'Knee_L_jnt']
+    assert entries[0][1]['negStart'] == -1.0 and isinstance(entries[0][1]['negStart'], float)
+    assert 'note' not in entries[0][1]
+    reasons = dict(invalid)
+    assert list(reasons) == ['no_name_jnt', 'text_jnt', 'bool_jnt', 'missing_jnt', 'list_jnt', '']
+    assert 'rig_name' in reasons['no_name_jnt']
+    assert '"drvEnd" should be a number' in reasons['text_jnt']
+    assert '"posStart" should be a number' in reasons['bool_jnt']
+    assert '"drvEnd" should be a number' in reasons['missing_jnt']
+    assert 'not an object' in reasons['list_jnt']
+    assert 'not a driver joint name' in reasons['']
+
+def test_import_push_rigs_skips_invalid_entries(tmp_path, monkeypatch):
+    import VT_SimpleMuscle.benchmark as bench
+    monkeypatch.setattr(push_io, 'CHUNK_SIZE', 5)
+    bench.cmds.reset()
+    bench.make_arms(2, sides=('L',))
+    data = {
+        'elbow0_L': entry('elbow0_L'),
+        'elbow1_L': dict(entry('elbow1_L'), posEnd=None),
+        'elbow9_L': entry('elbow9_L'),
+    }
+    report = bench.lib.import_push_rigs(write(tmp_path, json.dumps(data)), batch=False)
+    assert report['created'] == ['elbow0_L_pushBase']
+    assert [driver_joint for driver_joint, reason in report['invalid']] == ['elbow1_L']
+    assert report['skipped'] == [('elbow9_L', 'driver joint not found')]
+    assert not bench.cmds.objExists('elbow1_L_pushBase')
+    assert bench.cmds.getAttr('elbow0_L_pushBase.negEnd') == -12345.678
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import VT_SimpleMuscle.rig_description as rig_description
+
+
+def guide(name):
+    return {'name': name, 'matrix': [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 5, 0, 1],
+            'end': f'{name}_End', 'endTranslate': [0, 4, 0]}
+
+def push_rig(rig_name):
+    return {'rig_name': rig_name, 'drvStart': 180, 'drvEnd': 0, 'posStart': 1,
+            'posEnd': 2, 'negStart': -1, 'negEnd': -2}
+
+def document(**kwargs):
+    data = {'format': rig_description.FORMAT, 'version': rig_description.VERSION,
+            'guides': [guide('Bicep_L'), guide('Bicep_R')],
+            'surfaces': {'Bicep_L': {'bulge': 1.2, 'sink': 0.6, 'triggerLength': 1}},
+            'push_rigs': {'Elbow_L_jnt': push_rig('Elbow_L')}}
+    data.update(kwargs)
+    return data
+
+
+def test_load():
+    rig = rig_description.load_rig_description(document())
+    assert [g['name'] for g in rig['guides']] == ['Bicep_L', 'Bicep_R']
+    assert rig['guides'][0]['numJoints'] == 1
+    assert rig['surfaces'] == {'Bicep_L': {'bulge': 1.2, 'sink': 0.6, 'triggerLength': 1.0}}
+    assert rig['push_rigs']['Elbow_L_jnt']['drvStart'] == 180.0
+    assert isinstance(rig['push_rigs']['Elbow_L_jnt']['drvStart'], float)
+
+def test_load_empty_and_older():
+    data = {'format': rig_description.FORMAT}
+    assert rig_description.load_rig_description(data) == {'guides': [], 'surfaces': {}, 'push_rigs': {}}
+    assert len(rig_description.load_rig_description(document(version=0))['guides']) == 2
+
+def test_round_trip(tmp_path):
+    data = document()
+    file_path = str(tmp_path / 'rig.json')
+    rig_description.write_rig_description(file_path, data['guides'], data['surfaces'], data['push_rigs'])
+    assert rig_description.read_rig_description(file_path) == rig_description.load_rig_description(data)
+    with open(file_path) as json_file:
+        written = json.load(json_file)
+    assert written['format'] == rig_description.FORMAT and written['version'] == rig_description.VERSION
+
+@pytest.mark.parametrize('data, message', [
+    (document(version=rig_description.VERSION + 1), 'is newer than this tool reads'),
+    (document(version='1'), 'should be an int'),
+    (document(format='VT_SimpleMuscle.guides'), 'not a VT_SimpleMuscle.rig document'),
+    ([], 'not a VT_SimpleMuscle.rig document'),
+    (document(surfaces={'Tricep_L': {'bulge': 1, 'sink': 1, 'triggerLength': 1}}),
+     'surface settings for Tricep_L have no guide'),
+    (document(surfaces={'Bicep_L': {'bulge': 1, 'sink': 1}}), '"triggerLength" should be a number'),
+    (document(surfaces={'Bicep_L': {'bulge': True, 'sink': 1, 'triggerLength': 1}}), '"bulge" should be a number'),
+    (document(surfaces={'Bicep_L': [1, 1, 1]}), 'are not an object'),
+    (document(surfaces=[]), '"surfaces" should be an object'),
+    (document(push_rigs=[]), '"push_rigs" should be an object'),
+    (document(push_rigs={'Elbow_L_jnt': {'drvStart': 1}}), 'needs a "rig_name"'),
+    (document(guides=[guide('Bicep_L'), {'name': 'Bicep_R'}]), 'missing "matrix"'),
+])
+def test_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        rig_description.load_rig_description(data)
+
+def test_write_rejects_surface_settings(tmp_path):
+    with pytest.raises(ValueError, match='"sink" should be a number'):
+        rig_description.write_rig_description(str(tmp_path / 'rig.json'), [guide('Bicep_L')],
+                                              {'Bicep_L': {'bulge': 1, 'sink': '1', 'triggerLength': 1}}, {})
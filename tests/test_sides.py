@@ -0,0 +1,58 @@
+import pytest
+
+import VT_SimpleMuscle.sides as sides
+
+
+@pytest.mark.parametrize('name, side, mirrored', [
+    ('Bicep_L', 'L', 'Bicep_R'),
+    ('Lat_L', 'L', 'Lat_R'),
+    ('Bicep_L_End', 'L', 'Bicep_R_End'),
+    ('Bicep_R', 'R', 'Bicep_L'),
+    ('bicep_l', 'L', 'bicep_r'),
+    # maya's numbered duplicates
+    ('elbow_L1', 'L', 'elbow_R1'),
+    ('elbow_L12_pushBase', 'L', 'elbow_R12_pushBase'),
+    ('rig|Bicep_L', 'L', 'rig|Bicep_R'),
+    ('ns:Bicep_L', 'L', 'ns:Bicep_R'),
+    # the token has to be a whole name segment
+    ('Arm_Lower', None, 'Arm_Lower'),
+    ('Arm_Rear', None, 'Arm_Rear'),
+    ('Lat_M', None, 'Lat_M'),
+    ('elbow_L1a', None, 'elbow_L1a'),
+    ('LBicep', None, 'LBicep'),
+])
+def test_default_rules(name, side, mirrored):
+    assert sides.DEFAULT_RULES.side(name) == side
+    assert sides.DEFAULT_RULES.mirror(name) == mirrored
+
+@pytest.mark.parametrize('name, side, mirrored', [
+    ('L_Bicep', 'L', 'R_Bicep'),
+    ('R_Bicep_End', 'R', 'L_Bicep_End'),
+    ('rig|L_Bicep', 'L', 'rig|R_Bicep'),
+    ('ns:L_Bicep', 'L', 'ns:R_Bicep'),
+    ('LL_Bicep', None, 'LL_Bicep'),
+    ('Bicep_L_End', 'L', 'Bicep_R_End'),
+    ('BicepL_End', None, 'BicepL_End'),
+])
+def test_prefix_tokens(name, side, mirrored):
+    rules = sides.SideRules([('L_', 'R_')])
+    assert rules.side(name) == side
+    assert rules.mirror(name) == mirrored
+
+def test_tokens_for():
+    assert sides.DEFAULT_RULES.tokens_for('Bicep_L') == ('_L', '_R')
+    assert sides.DEFAULT_RULES.tokens_for('bicep_r') == ('_l', '_r')
+    assert sides.DEFAULT_RULES.tokens_for('Arm_Lower') is None
+
+def test_pair_map():
+    names = ['Bicep_L', 'Bicep_R', 'elbow_L1', 'Arm_Lower', 'Lat_M']
+    assert sides.DEFAULT_RULES.pair_map(names) == {'Bicep_L': 'Bicep_R', 'elbow_L1': 'elbow_R1'}
+
+def test_mirror_round_trip():
+    for name in ['Bicep_L', 'elbow_L1', 'Bicep_L_End']:
+        assert sides.DEFAULT_RULES.mirror(sides.DEFAULT_RULES.mirror(name)) == name
+
+def test_get_rules():
+    rules = sides.SideRules([('Left', 'Right')])
+    assert sides.get_rules() is sides.DEFAULT_RULES
+    assert sides.get_rules(rules) is rules